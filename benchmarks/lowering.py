@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Lowers a story of a 9-line block repeated n times. The block has
+comparisons, argument shorthands, services, calls on dotted paths,
+string templates and nested blocks.
+
+    PYTHONPATH=. python benchmarks/lowering.py [lines ...]
+"""
+import sys
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.lowering.Lowering import Lowering
+
+from timing import best_of
+
+
+block = """a{i} = alpine echo message: "{i}"
+b{i} = a{i} != "x" and {i} < 2
+l{i} = [{i}, 1]
+if b{i} == true
+    d{i} = l{i}.length() + 1
+foreach l{i} as item
+    [{i}, 2] contains :item
+    e{i} = "{{item}} and {{a{i}}}"
+f{i} = (alpine echo message: a{i}) >= "y"
+"""
+
+
+def story(lines):
+    blocks = lines // block.count('\n')
+    return ''.join(block.format(i=i) for i in range(blocks))
+
+
+def main(sizes):
+    features = Features(None)
+    for lines in sizes:
+        source = story(lines)
+
+        def parse():
+            story = Story(source, features)
+            story.parse(None)
+            return story.tree
+
+        def lower(tree):
+            Lowering(tree.parser, features).process(tree)
+
+        best = best_of(lower, 3, setup=parse)
+        print(f'{lines} lines: {best * 1e3:.1f}ms')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [900, 3600, 14400])
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Resolves mutations in the MutationTable of a story, and runs the
+semantic analysis of a story with many mutation calls.
+
+    PYTHONPATH=. python benchmarks/mutations.py [calls]
+"""
+import sys
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.lowering.Lowering import Lowering
+from storyscript.compiler.semantics.Semantics import Semantics
+from storyscript.compiler.semantics.functions.MutationTable import \
+    MutationTable
+from storyscript.compiler.semantics.types.Types import AnyType, IntType, \
+    ListType, StringType
+
+from timing import best_of
+
+
+calls = [
+    'a{i} = l.length()',
+    'b{i} = s.replace(item: "a" by: "{i}")',
+    'c{i} = l contains item: {i}',
+]
+
+
+def story(count):
+    lines = ['l = [1, 2]', 's = "abc"']
+    lines.extend(calls[i % len(calls)].format(i=i) for i in range(count))
+    return '\n'.join(lines) + '\n'
+
+
+def resolve(table):
+    int_list = ListType(IntType.instance())
+    for _ in range(1000):
+        table.resolve(int_list, 'append').match(['item'])
+        table.resolve(StringType.instance(), 'replace').match(['item', 'by'])
+        table.resolve(AnyType.instance(), 'contains').all()
+
+
+def main(count):
+    table = MutationTable.init()
+    best = best_of(lambda: resolve(table), 20)
+    print(f'3000 resolutions: {best * 1e3:.1f}ms')
+
+    features = Features(None)
+    source = story(count)
+
+    def lower():
+        story = Story(source, features)
+        story.parse(None)
+        return Lowering(story.tree.parser, features).process(story.tree)
+
+    best = best_of(lambda tree: Semantics(features).process(tree), 3,
+                   setup=lower)
+    print(f'semantics of {count} mutation calls: {best:.2f}s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 12000)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Parses a generated story with the Transformer applied while parsing and
+with a separate transformation of the lark tree.
+
+    PYTHONPATH=. python benchmarks/parse.py [lines ...]
+"""
+import sys
+
+from storyscript.parser import Parser
+
+from timing import best_of
+
+
+block = """a{i} = alpine echo message: "{i}"
+b{i} = a{i} + "x"
+if b{i} >= "y"
+    c{i} = [1, 2, 3]
+    foreach c{i} as item
+        d{i} = item * 2
+else
+    e{i} = {{"k": "{{b{i}}}"}}
+while a{i} != "z"
+    break
+f{i} = "hello {{a{i}}} world {{b{i}}}"
+g{i} = (alpine echo message: f{i}) > 2
+"""
+
+
+class TwoPassParser(Parser):
+    """
+    Builds the lark tree first and transforms it afterwards.
+    """
+
+    def inline(self):
+        return False
+
+
+def story(lines):
+    blocks = lines // block.count('\n')
+    return ''.join(block.format(i=i) for i in range(blocks))
+
+
+def main(sizes):
+    parsers = {
+        'inline': Parser(cache=False, standalone=False),
+        'two-pass': TwoPassParser(cache=False, standalone=False),
+    }
+    for lines in sizes:
+        source = story(lines)
+        for name, parser in parsers.items():
+            best = best_of(lambda: parser.parse(source), 5)
+            print(f'{lines} lines, {name}: {best:.2f}s')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1800, 9000])
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the semantic analysis of a story of nested if, foreach, while and try
+blocks with an assignment at every level, s.t. the references resolve
+through long scope chains.
+
+    PYTHONPATH=. python benchmarks/scopes.py [levels ...]
+"""
+import sys
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.lowering.Lowering import Lowering
+from storyscript.compiler.semantics.Semantics import Semantics
+
+from timing import best_of
+
+
+heads = ['if x == {i}', 'foreach [1, 2] as i{i}', 'while x == {i}', 'try']
+
+
+def story(levels):
+    lines = ['x = 1']
+    for i in range(levels):
+        lines.append('    ' * i + heads[i % len(heads)].format(i=i))
+        lines.append('    ' * (i + 1) + f'v{i} = x + 1')
+    lines.append('    ' * levels + 'z = x + 1')
+    return '\n'.join(lines) + '\n'
+
+
+def main(sizes):
+    features = Features(None)
+    for levels in sizes:
+        source = story(levels)
+
+        def lower():
+            story = Story(source, features)
+            story.parse(None)
+            return Lowering(story.tree.parser, features).process(story.tree)
+
+        best = best_of(lambda tree: Semantics(features).process(tree), 3,
+                       setup=lower)
+        print(f'{levels} levels: {best:.2f}s')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [1000, 3000])
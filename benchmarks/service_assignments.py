@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Compiles a story of N service assignments and reports the total time and
+the time spent compiling the assignments, which check the variables
+assigned so far.
+
+    PYTHONPATH=. python benchmarks/service_assignments.py [assignments ...]
+"""
+import sys
+import time
+
+from storyscript.Api import Api
+from storyscript.compiler.json import JSONCompiler
+
+
+def story(count):
+    return ''.join(f'a{i} = alpine echo message: "{i}"\n'
+                   for i in range(count))
+
+
+def timed(method, spent):
+    """
+    Wraps a method, s.t. its time is added to spent[0]
+    """
+    def wrapper(*args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            spent[0] += time.perf_counter() - start
+    return wrapper
+
+
+def main(sizes):
+    method = JSONCompiler.base_expression_assignment
+    for count in sizes:
+        spent = [0.0]
+        JSONCompiler.base_expression_assignment = timed(method, spent)
+        try:
+            start = time.perf_counter()
+            Api.loads(story(count)).check_success()
+            total = time.perf_counter() - start
+        finally:
+            JSONCompiler.base_expression_assignment = method
+        print(f'{count} assignments: total {total:.2f}s, '
+              f'assignments {spent[0]:.2f}s')
+
+
+if __name__ == '__main__':
+    main([int(size) for size in sys.argv[1:]] or [10000, 20000])
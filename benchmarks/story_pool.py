@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Compiles a generated bundle of stories with different numbers of jobs.
+Every tenth story imports a shared module. The outputs of all job counts
+are checked to be identical.
+
+    PYTHONPATH=. python benchmarks/story_pool.py [stories] [jobs ...]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+from storyscript.App import App
+
+
+block = """a{i} = alpine echo message: "{n}-{i}"
+b{i} = [{i}, {n}]
+c{i} = b{i}.length() + {i}
+if c{i} > 1
+  d{i} = "{{a{i}}}"
+"""
+
+
+def write_bundle(directory, stories):
+    with io.open(os.path.join(directory, 'lib.story'), 'w') as f:
+        for i in range(20):
+            f.write(f'function f{i} a:int returns int\n  return a + {i}\n')
+    for n in range(stories):
+        lines = [block.format(i=i, n=n) for i in range(8)]
+        if n % 10 == 0:
+            # Story.modules drops the first and the last character of the
+            # parsed import path, hence lib.story is imported as "_lib_"
+            lines.insert(0, 'import "_lib_" as L\n')
+        path = os.path.join(directory, f's{n:04}.story')
+        with io.open(path, 'w') as f:
+            f.write(''.join(lines))
+
+
+def main(stories, jobs):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        write_bundle(directory, stories)
+        # imports are resolved relative to the working directory
+        os.chdir(directory)
+        try:
+            compile_bundle(jobs)
+        finally:
+            os.chdir(cwd)
+
+
+def compile_bundle(jobs):
+    expected = None
+    for count in jobs:
+        start = time.perf_counter()
+        result = App.compile('.', features={'jobs': count})
+        elapsed = time.perf_counter() - start
+        print(f'jobs={count}: {elapsed:.1f}s, {len(result)} bytes')
+        if expected is None:
+            expected = result
+        assert result == expected, 'the output depends on the jobs'
+
+
+if __name__ == '__main__':
+    stories = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    jobs = [int(count) for count in sys.argv[2:]] or [1, 2, 4]
+    main(stories, jobs)
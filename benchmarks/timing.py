@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+import time
+
+
+def best_of(run, repeat, setup=None):
+    """
+    Returns the fastest of `repeat` runs in seconds. `setup` is called
+    before each run and its result is passed to `run`, s.t. the input of a
+    run that changes it isn't reused.
+    """
+    best = None
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
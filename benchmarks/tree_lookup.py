@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Looks up the rule names of the children, and one absent rule name, on
+every node of the parsed e2e stories, like `tree.assignment_fragment`.
+
+    PYTHONPATH=. python benchmarks/tree_lookup.py
+"""
+import glob
+import io
+import os
+
+from storyscript.parser import Parser, Tree
+
+from timing import best_of
+
+
+e2e_dir = os.path.join(os.path.dirname(__file__), '..', 'tests', 'e2e')
+
+
+def trees(parser):
+    pattern = os.path.join(e2e_dir, '**', '*.story')
+    for path in sorted(glob.glob(pattern, recursive=True)):
+        with io.open(path, 'r') as f:
+            source = f.read()
+        try:
+            yield parser.parse(source)
+        except Exception:
+            # stories which test syntax errors
+            continue
+
+
+def lookups(parser):
+    result = []
+    for tree in trees(parser):
+        for node in tree.iter_subtrees():
+            names = [c.data for c in node.children if isinstance(c, Tree)]
+            result.append((node, names + ['else_block']))
+    return result
+
+
+def run(lookups):
+    for node, names in lookups:
+        for name in names:
+            getattr(node, name)
+
+
+def main():
+    items = lookups(Parser())
+    total = sum(len(names) for _, names in items)
+    best = best_of(lambda: run(items), 10)
+    print(f'{total} lookups: {best * 1e3:.1f}ms, '
+          f'{best / total * 1e9:.0f}ns per lookup')
+
+
+if __name__ == '__main__':
+    main()
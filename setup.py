@@ -4,8 +4,9 @@ import io
 import sys
 from os import getenv, path
 
-from setuptools import find_packages, setup
+from setuptools import Command, find_packages, setup
 from setuptools.command.bdist_egg import bdist_egg as _bdist_egg
+from setuptools.command.build_py import build_py as _build_py
 from setuptools.command.install import install as _install
 from setuptools.command.sdist import sdist as _sdist
 
@@ -97,6 +98,92 @@ class BdistEgg(_bdist_egg):
                      msg='Building the binary release')
 
 
+def generate_parser(cwd):
+    """
+    Writes the standalone parser tables of each start rule to
+    storyscript/parser/tables.py and storyscript/parser/template_tables.py.
+    Without them, the parsers are generated at runtime.
+    """
+    sys.path.insert(0, root_dir)
+    try:
+        from storyscript.parser import Parser, ParserGenerator
+    except ImportError as e:
+        print(f'skipping the parser generation: {e}')
+        return
+    finally:
+        sys.path.pop(0)
+    directory = path.join(cwd, name, 'parser')
+    if not path.isdir(directory):
+        return
+    for start, module in Parser.tables_modules.items():
+        tables = path.join(directory, module.rsplit('.', 1)[1] + '.py')
+        print(f'generating parser ({start}) -> {tables}')
+        ParserGenerator.write(tables, start=start)
+
+
+def generate_hub(cwd):
+    """
+    Writes the compiled mutations of the hub to
+    storyscript/compiler/semantics/functions/hub_spec.py.
+    Without them, the mutations are parsed at runtime.
+    """
+    sys.path.insert(0, root_dir)
+    try:
+        from storyscript.compiler.semantics.functions.HubMutations import hub
+        from storyscript.compiler.semantics.functions.HubSpec import HubSpec
+    except ImportError as e:
+        print(f'skipping the hub generation: {e}')
+        return
+    finally:
+        sys.path.pop(0)
+    spec = path.join(cwd, name, 'compiler', 'semantics', 'functions',
+                     'hub_spec.py')
+    if path.isdir(path.dirname(spec)):
+        print(f'generating hub mutations -> {spec}')
+        HubSpec.write(spec, hub)
+
+
+class BuildPy(_build_py):
+    def run(self):
+        _build_py.run(self)
+        self.execute(generate_parser, (self.build_lib,),
+                     msg='Generating the parser')
+        self.execute(generate_hub, (self.build_lib,),
+                     msg='Generating the hub mutations')
+
+
+class GenerateParser(Command):
+    """Generates the parser tables in the source tree"""
+    description = 'generate the standalone parser tables'
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        self.execute(generate_parser, (root_dir,),
+                     msg='Generating the parser')
+
+
+class GenerateHub(Command):
+    """Generates the compiled hub mutations in the source tree"""
+    description = 'generate the compiled hub mutations'
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        self.execute(generate_hub, (root_dir,),
+                     msg='Generating the hub mutations')
+
+
 class VerifyVersionCommand(_install):
     """Custom command to verify that the git tag matches our version"""
     description = 'verify that the git tag matches our version'
@@ -135,6 +222,9 @@ setup(name=name,
           'console_scripts': ['storyscript=storyscript.Cli:Cli.main']
       },
       cmdclass={
+        'build_py': BuildPy,
+        'generate_parser': GenerateParser,
+        'generate_hub': GenerateHub,
         'install': Install,
         'sdist': Sdist,
         'bdist_egg': BdistEgg,
@@ -71,7 +71,9 @@ class StoryscriptCompilationResult:
 
 class Api:
     """
-    Exposes functionalities for external use
+    Exposes functionalities for external use.
+    All methods are thread-safe: concurrent calls check their parsers out of
+    a shared ParserPool and compile into separate trees.
     """
     @staticmethod
     def loads(string, features=None):
@@ -111,13 +113,15 @@ class Api:
                 return StoryscriptCompilationResult.from_error(e)
 
     @staticmethod
-    def load_map(files, features=None):
+    def load_map(files, features=None, cache=None):
         """
-        Load multiple stories from a file mapping
+        Load multiple stories from a file mapping.
+        Stories which haven't changed are loaded from the StoryCache `cache`.
         """
         features = Features(features)
         try:
-            s = Bundle(story_files=files, features=features).bundle()
+            s = Bundle(story_files=files, features=features,
+                       cache=cache).bundle()
             return StoryscriptCompilationResult.from_result(s)
         except StoryError as e:
             return StoryscriptCompilationResult.from_error(e)
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 import json
+import os
 
+from .BinaryFormat import BinaryFormat
 from .Bundle import Bundle
+from .BundleWriter import BundleWriter, _clean_dict
+from .StoryCache import StoryCache
+from .Watcher import Watcher
+from .compiler.semantics.functions.HubMutations import Hub
 from .exceptions import StoryError
-from .parser import Grammar
+from .parser import Grammar, Parser, ParserCache
 
 
 class App:
@@ -22,12 +28,36 @@ class App:
 
     @staticmethod
     def compile(path, ignored_path=None, ebnf=None, concise=False,
-                first=False, features=None):
+                first=False, features=None, format='json', out=None,
+                cache=None):
         """
-        Parses and compiles stories found in path, returning JSON
+        Parses and compiles stories found in path, returning JSON.
+        The format can be 'json', 'compact' for JSON without whitespace or
+        'binary' for bytes of the BinaryFormat.
+        If a file `out` is given, the output is written to it instead and
+        JSON is written while the stories are compiled.
+        Stories which haven't changed are loaded from the StoryCache `cache`,
+        unless they are parsed with the grammar `ebnf`.
         """
         bundle = Bundle.from_path(path, ignored_path=ignored_path,
-                                  features=features)
+                                  features=features, cache=cache)
+        return App.compile_bundle(bundle, ebnf=ebnf, concise=concise,
+                                  first=first, format=format, out=out)
+
+    @staticmethod
+    def compile_bundle(bundle, ebnf=None, concise=False, first=False,
+                       format='json', out=None, memo=None):
+        """
+        Compiles a bundle like App.compile. Stories which are written to
+        `out` are kept in the BundleWriter memo `memo`.
+        """
+        assert format in ('json', 'compact', 'binary'), \
+            f'unknown format {format}'
+        if out is not None and format != 'binary' and not first:
+            writer = BundleWriter(out, concise=concise,
+                                  compact=format == 'compact', memo=memo)
+            writer.write(bundle, ebnf=ebnf)
+            return None
         result = bundle.bundle(ebnf=ebnf)
         if concise:
             result = _clean_dict(result)
@@ -35,7 +65,26 @@ class App:
             if len(result['stories']) != 1:
                 raise StoryError.create_error('first_option_more_stories')
             result = next(iter(result['stories'].values()))
-        return json.dumps(result, indent=2)
+        if format == 'binary':
+            result = BinaryFormat.dumps(result)
+        elif format == 'compact':
+            result = json.dumps(result, separators=(',', ':'))
+        else:
+            result = json.dumps(result, indent=2)
+        if out is not None:
+            out.write(result)
+            return None
+        return result
+
+    @staticmethod
+    def watch(path, ignored_path=None, features=None, cache=None):
+        """
+        Yields the bundle of the stories found in path and then again
+        whenever they change
+        """
+        watcher = Watcher(path, ignored_path=ignored_path, features=features,
+                          cache=cache)
+        return watcher.watch()
 
     @staticmethod
     def lex(path, features, ebnf=None):
@@ -51,11 +100,44 @@ class App:
         """
         return Grammar().build()
 
+    @staticmethod
+    def warm_cache(ebnf=None):
+        """
+        Builds the parser and the parser of string templates and stores
+        their tables in the parser cache. The generated parser tables are
+        ignored, s.t. the cache is written as well. Returns the directory of
+        the cache, or None if the tables couldn't be written.
+        """
+        cache = ParserCache()
+        parser = Parser(ebnf=ebnf, cache=cache, standalone=False)
+        for parser in (parser, parser.template_parser()):
+            if parser is None:
+                continue
+            fingerprint = cache.fingerprint(parser.grammar_key(), parser.algo,
+                                            parser.start)
+            if not os.path.isfile(cache.path(fingerprint)):
+                return None
+        return cache.directory
 
-def _clean_dict(d):
-    """
-    Removes all falsy elements from a nested dict
-    """
-    if not isinstance(d, dict):
-        return d
-    return {k: _clean_dict(v) for k, v in d.items() if v}
+    @staticmethod
+    def clear_cache():
+        """
+        Removes all cached parser tables
+        """
+        return ParserCache().clear()
+
+    @staticmethod
+    def clear_story_cache(directory=None):
+        """
+        Removes all compiled stories from the story cache
+        """
+        return StoryCache(directory).clear()
+
+    @staticmethod
+    def compile_hub(path, output):
+        """
+        Compiles the hub mutation specification at path into output
+        """
+        data = Hub.from_file(path).compile()
+        with open(output, 'wb') as f:
+            f.write(data)
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+import sys
+from array import array
+from functools import partial
+from itertools import accumulate, repeat
+
+
+def _array(typecode, data=b''):
+    """
+    Reads a little-endian array.
+    """
+    result = array(typecode)
+    result.frombytes(data)
+    if sys.byteorder == 'big':
+        result.byteswap()
+    return result
+
+
+def _bytes(values):
+    """
+    Writes an array little-endian.
+    """
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _Encoder:
+    """
+    Encodes JSON values into the columns of the BinaryFormat.
+    """
+
+    def __init__(self):
+        self.strings = {}
+        self.shapes = {}
+        self.tags = bytearray()
+        self.counts = array('I')
+        self.refs = array('I')
+        self.ints = array('q')
+        self.floats = array('d')
+
+    def string(self, s):
+        """
+        Returns the index of a string in the string table.
+        """
+        index = self.strings.get(s, None)
+        if index is None:
+            index = len(self.strings)
+            self.strings[s] = index
+        return index
+
+    def encode(self, v):
+        tags = self.tags
+        if v is None:
+            tags.append(0x4e)  # N
+        elif v is True:
+            tags.append(0x54)  # T
+        elif v is False:
+            tags.append(0x46)  # F
+        elif isinstance(v, str):
+            tags.append(0x73)  # s
+            self.refs.append(self.string(v))
+        elif isinstance(v, int):
+            if -2 ** 63 <= v < 2 ** 63:
+                tags.append(0x69)  # i
+                self.ints.append(v)
+            else:
+                tags.append(0x49)  # I
+                self.refs.append(self.string(str(int(v))))
+        elif isinstance(v, float):
+            tags.append(0x64)  # d
+            self.floats.append(v)
+        elif isinstance(v, dict):
+            self.encode_map(v)
+        elif isinstance(v, (list, tuple)):
+            tags.append(0x6c)  # l
+            self.counts.append(len(v))
+            for item in v:
+                self.encode(item)
+        else:
+            raise TypeError(f'{type(v).__name__} can not be encoded')
+
+    def encode_map(self, v):
+        shape = tuple(v)
+        index = self.shapes.get(shape, None)
+        if index is None:
+            self.shapes[shape] = len(self.shapes)
+            self.tags.append(0x6d)  # m
+            self.counts.append(len(shape))
+            for k in shape:
+                if not isinstance(k, str):
+                    raise TypeError(f'{k!r} is not a string key')
+                self.counts.append(self.string(k))
+        else:
+            self.tags.append(0x6f)  # o
+            self.counts.append(index)
+        for item in v.values():
+            self.encode(item)
+
+    def sections(self):
+        return [
+            _bytes(array('I', map(len, self.strings))),
+            ''.join(self.strings).encode('utf8'),
+            bytes(self.tags),
+            _bytes(self.counts),
+            _bytes(self.refs),
+            _bytes(self.ints),
+            _bytes(self.floats),
+        ]
+
+
+class BinaryFormat:
+    """
+    A compact binary encoding of JSON values, which is used for compiled
+    bundles.
+
+    Values are stored in columns, s.t. they can be read in bulk: the data
+    starts with the magic bytes and the version, followed by the u32 sizes
+    of seven sections:
+        lengths:  u32 length of every string in characters
+        strings:  all strings as UTF-8
+        tags:     a byte for every value
+        counts:   u32 counts of lists, map shapes and their key indices
+        refs:     u32 string indices of string values
+        ints:     int64 values
+        floats:   float64 values
+    A tag consumes from the columns:
+        N, F, T:  nothing (null, false, true)
+        i:        an int
+        I:        a ref to the digits of an integer out of the int64 range
+        d:        a float
+        s:        a ref
+        l:        a count and the list items
+        m:        a count, the key indices and the values of a map with a
+                  new shape, i.e. sequence of keys
+        o:        a shape index and the values of a map with a known shape
+    Maps are numbered by their shape in the order in which the shapes
+    appear. All numbers are little-endian.
+    """
+    magic = b'SSB'
+    version = 2
+    sections = 7
+
+    @classmethod
+    def dumps(cls, value):
+        """
+        Encodes a JSON value into bytes.
+        """
+        encoder = _Encoder()
+        encoder.encode(value)
+        sections = encoder.sections()
+        header = bytearray(cls.magic)
+        header.append(cls.version)
+        header.extend(_bytes(array('I', map(len, sections))))
+        return b''.join([header] + sections)
+
+    @classmethod
+    def _sections(cls, data):
+        """
+        Checks the header of the data and returns its sections.
+        """
+        data = memoryview(data)
+        if data[:len(cls.magic)] != cls.magic:
+            raise ValueError('not a compiled bundle')
+        pos = len(cls.magic)
+        if len(data) < pos + 1 + 4 * cls.sections:
+            raise ValueError('invalid bundle size')
+        if data[pos] != cls.version:
+            raise ValueError(f'unsupported bundle version {data[pos]}')
+        pos += 1
+        sizes = _array('I', data[pos:pos + 4 * cls.sections])
+        pos += 4 * cls.sections
+        if pos + sum(sizes) != len(data):
+            raise ValueError('invalid bundle size')
+        sections = []
+        for size in sizes:
+            sections.append(data[pos:pos + size])
+            pos += size
+        return sections
+
+    @staticmethod
+    def _decoders(strings, tags, counts, refs, ints, floats):
+        """
+        Returns the decoder of every tag, which reads a value from the
+        column iterators. Scalars are decoded by builtins, which are much
+        cheaper to call than functions.
+        """
+        next_tag = tags.__next__
+        next_count = counts.__next__
+        next_ref = refs.__next__
+        shapes = []
+
+        def decode_invalid(tag):
+            raise ValueError(f'invalid tag {tag}')
+
+        decoders = [partial(decode_invalid, tag) for tag in range(256)]
+
+        def decode_list():
+            result = []
+            append = result.append
+            for _ in range(next_count()):
+                append(decoders[next_tag()]())
+            return result
+
+        def decode_new_map():
+            keys = [strings[next_count()] for _ in range(next_count())]
+            shapes.append(keys)
+            result = {}
+            for key in keys:
+                result[key] = decoders[next_tag()]()
+            return result
+
+        def decode_known_map():
+            result = {}
+            for key in shapes[next_count()]:
+                result[key] = decoders[next_tag()]()
+            return result
+
+        def decode_big_int():
+            return int(next_ref())
+
+        decoders[0x4e] = repeat(None).__next__  # N
+        decoders[0x54] = repeat(True).__next__  # T
+        decoders[0x46] = repeat(False).__next__  # F
+        decoders[0x69] = ints.__next__  # i
+        decoders[0x49] = decode_big_int  # I
+        decoders[0x64] = floats.__next__  # d
+        decoders[0x73] = next_ref  # s
+        decoders[0x6c] = decode_list  # l
+        decoders[0x6d] = decode_new_map  # m
+        decoders[0x6f] = decode_known_map  # o
+        return decoders
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Decodes a JSON value from bytes written by `dumps`.
+        """
+        lengths, text, tags, counts, refs, ints, floats = cls._sections(data)
+
+        # the strings are decoded at once and sliced by their lengths
+        text = str(text, 'utf8')
+        offsets = array('q', [0])
+        offsets.extend(accumulate(_array('I', lengths)))
+        strings = [text[offsets[i]:offsets[i + 1]]
+                   for i in range(len(offsets) - 1)]
+
+        # string values are looked up in bulk
+        try:
+            refs = list(map(strings.__getitem__, _array('I', refs)))
+        except IndexError:
+            raise ValueError('invalid string index') from None
+        columns = [iter(bytes(tags)), iter(_array('I', counts)), iter(refs),
+                   iter(_array('q', ints)), iter(_array('d', floats))]
+        decoders = cls._decoders(strings, *columns)
+        try:
+            value = decoders[next(columns[0])]()
+        except (IndexError, StopIteration):
+            raise ValueError('truncated bundle') from None
+        for column in columns:
+            if next(column, None) is not None:
+                raise ValueError('trailing data after the bundle')
+        return value
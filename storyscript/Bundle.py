@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 import os
+import pickle
 import subprocess
 
 from .Features import Features
 from .Story import Story
+from .StoryCache import CachedStory
+from .StoryPool import StoryPool
+from .compiler.lowering import TemplateCache
+from .exceptions import StoryError
 from .parser import Parser
 
 
@@ -12,7 +17,7 @@ class Bundle:
     Bundles all stories that must be compiled together.
     """
 
-    def __init__(self, story_files=None, features=None):
+    def __init__(self, story_files=None, features=None, cache=None):
         self.stories = {}
         if isinstance(features, Features):
             self.features = features
@@ -21,6 +26,14 @@ class Bundle:
         if story_files is None:
             story_files = {}
         self.story_files = story_files
+        # the StoryCache of compiled stories, if any
+        self.cache = cache
+        self.features_key = None
+        self.source_keys = {}
+        # the parsers of custom grammars, which are only built once
+        self.parsers = {}
+        # the parsed code of the string templates of all stories
+        self.templates = TemplateCache()
 
     @staticmethod
     def gitignores():
@@ -74,13 +87,13 @@ class Bundle:
         return paths
 
     @classmethod
-    def from_path(cls, path, ignored_path=None, features=None):
+    def from_path(cls, path, ignored_path=None, features=None, cache=None):
         """
         Load a bundle of stories from the filesystem.
         If a directory is given. all `.story` files in the directory will be
         loaded.
         """
-        bundle = Bundle(features=features)
+        bundle = Bundle(features=features, cache=cache)
         if os.path.isdir(path):
             for story in cls.parse_directory(path, ignored_path=ignored_path):
                 bundle.load_story(story)
@@ -94,7 +107,8 @@ class Bundle:
         """
         if path not in self.story_files:
             self.story_files[path] = Story.read(path)
-        return Story(self.story_files[path], features=self.features)
+        return Story(self.story_files[path], features=self.features,
+                     templates=self.templates)
 
     def find_stories(self):
         """
@@ -112,30 +126,226 @@ class Bundle:
 
     def parser(self, ebnf):
         if ebnf is not None:
-            return Parser(ebnf=ebnf)
+            if ebnf not in self.parsers:
+                self.parsers[ebnf] = Parser(ebnf=ebnf)
+            return self.parsers[ebnf]
         return None
 
-    def parse(self, stories, parser, lower):
+    def parsed_story(self, storypath, parser, lower=False):
         """
-        Parse stories.
+        Reads and parses a story. Returns the story and its modules.
         """
-        for storypath in stories:
-            story = self.load_story(storypath)
-            story.parse(parser=parser, lower=lower)
-            self.parse(story.modules(), parser=parser, lower=lower)
-            self.stories[storypath] = story.tree
+        story = self.load_story(storypath)
+        story.parse(parser=parser, lower=lower)
+        return story, story.modules()
 
-    def compile(self, stories, parser):
+    def import_graph(self, stories, load):
         """
-        Reads and parses a story, then compiles its modules and finally
-        compiles the story itself.
+        Follows the imports of stories, where `load` returns a story and the
+        modules it imports. Returns the loaded stories by their path in
+        topological order, s.t. modules come before the stories importing
+        them. Every story is only loaded once.
         """
+        graph = {}
+        # the chain of imports which are being loaded
+        chain = []
+
+        def visit(storypath):
+            if storypath in graph:
+                return
+            if storypath in chain:
+                cycle = chain[chain.index(storypath):] + [storypath]
+                raise StoryError.create_error('import_cycle',
+                                              cycle=' -> '.join(cycle))
+            story, modules = load(storypath)
+            chain.append(storypath)
+            for module in modules:
+                visit(module)
+            chain.pop()
+            graph[storypath] = story
+
         for storypath in stories:
-            story = self.load_story(storypath)
-            story.parse(parser=parser)
-            self.compile(story.modules(), parser=parser)
+            visit(storypath)
+        return graph
+
+    def story_pool(self, stories, parser):
+        """
+        Returns a StoryPool if the stories are processed in parallel.
+        """
+        jobs = self.features.jobs
+        if jobs > 1 and len(stories) > 1:
+            return StoryPool(jobs, parser, self.features)
+        return None
+
+    def parse(self, stories, parser, lower):
+        """
+        Parse stories and their modules.
+        """
+        pooled = {}
+        pool = self.story_pool(stories, parser)
+        if pool is not None:
+            with pool:
+                pooled = pool.parse(self, stories, lower=lower)
+
+        def load(storypath):
+            result = pooled.get(storypath, None)
+            if result is None:
+                # raises the error of the story like a serial parse
+                story, modules = self.parsed_story(storypath, parser,
+                                                   lower=lower)
+                return story.tree, modules
+            modules, tree = result
+            return pickle.loads(tree), modules
+
+        for storypath, tree in self.import_graph(stories, load).items():
+            self.stories[storypath] = tree
+
+    def source_key(self, storypath):
+        """
+        Returns the key of the source of a story in the cache.
+        """
+        key = self.source_keys.get(storypath, None)
+        if key is None:
+            if self.features_key is None:
+                self.features_key = self.cache.features_key(self.features)
+            source = self.load_story(storypath).story
+            key = self.cache.source_key(source, self.features_key)
+            self.source_keys[storypath] = key
+        return key
+
+    def caches(self, parser):
+        """
+        Returns whether stories parsed with `parser` are cached. Stories
+        parsed with a custom grammar aren't, as their keys don't identify
+        the grammar.
+        """
+        return self.cache is not None and parser is None
+
+    def cached_story(self, storypath):
+        """
+        Returns the CachedStory of a story, which might be outdated, or None.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.load(self.source_key(storypath))
+
+    def cache_keys(self, graph, imports):
+        """
+        Computes the keys of the stories of an import graph in the cache,
+        where `imports` are the modules of every story.
+        """
+        keys = {}
+        if self.cache is not None:
+            for storypath in graph:
+                module_keys = [keys[module] for module in imports[storypath]]
+                keys[storypath] = self.cache.key(self.source_key(storypath),
+                                                 module_keys)
+        return keys
+
+    @staticmethod
+    def outdated(graph, keys):
+        """
+        Returns the stories of an import graph which have been loaded from
+        the cache, but whose modules have changed.
+        """
+        return [storypath for storypath, story in graph.items()
+                if isinstance(story, CachedStory) and
+                story.key != keys[storypath]]
+
+    def compiled_graph(self, stories, parser):
+        """
+        Loads the import graph of stories and their modules, which are
+        parsed, compiled in a StoryPool or loaded from the cache. Returns the
+        graph, the keys of its stories in the cache and the modules every
+        story imports.
+        """
+        pooled = None
+        imports = {}
+        cached = self.cached_story if self.caches(parser) else None
+
+        def load(storypath):
+            if pooled is None:
+                story = None if cached is None else cached(storypath)
+                result = None if story is None else (story.modules, story)
+            else:
+                result = pooled.get(storypath, None)
+            if result is None:
+                # raises the error of the story like a serial parse
+                story, modules = self.parsed_story(storypath, parser)
+            else:
+                modules, story = result
+            imports[storypath] = modules
+            return story, modules
+
+        def cache_keys(graph):
+            if cached is None:
+                return {}
+            return self.cache_keys(graph, imports)
+
+        pool = self.story_pool(stories, parser)
+        if pool is None:
+            graph = self.import_graph(stories, load)
+            return graph, cache_keys(graph), imports
+        with pool:
+            pooled = pool.compile(self, stories, cached=cached)
+            graph = self.import_graph(stories, load)
+            keys = cache_keys(graph)
+            # stories whose modules have changed are compiled again
+            outdated = self.outdated(graph, keys)
+            if outdated:
+                results = pool.compile(self, outdated, imports=False)
+                for storypath in outdated:
+                    result = results[storypath]
+                    if result is not None:
+                        result = result[1]
+                    graph[storypath] = result
+        return graph, keys, imports
+
+    def compiled_story(self, storypath, story, key, modules, parser):
+        """
+        Returns the compiled story of an import graph entry, which is its
+        Story, its compiled story, a CachedStory or None if it has to be
+        parsed again. Stories which had to be compiled are saved in the
+        cache, unless their `key` is None.
+        """
+        if isinstance(story, CachedStory):
+            if story.key == key:
+                return story.compiled
+            story = None
+        if story is None:
+            # the story couldn't be compiled by the pool or is outdated
+            story, _ = self.parsed_story(storypath, parser)
+        if isinstance(story, Story):
             story.compile()
-            self.stories[storypath] = story.compiled
+            story = story.compiled
+        if key is not None:
+            self.cache.save(self.source_key(storypath), key, modules, story)
+        return story
+
+    def compiled_stories(self, stories, parser):
+        """
+        Parses stories and their modules, then compiles every story after
+        the modules it imports. Stories are loaded from the cache if they
+        and their modules haven't changed. Yields every story with its path
+        as soon as it has been compiled.
+        """
+        graph, keys, imports = self.compiled_graph(stories, parser)
+        while graph:
+            # compiled stories are dropped together with their trees
+            storypath = next(iter(graph))
+            story = graph.pop(storypath)
+            yield storypath, self.compiled_story(
+                storypath, story, keys.get(storypath, None),
+                imports[storypath], parser)
+        if self.caches(parser):
+            self.cache.evict()
+
+    def compile(self, stories, parser):
+        """
+        Compiles stories and their modules into the bundle.
+        """
+        for storypath, compiled in self.compiled_stories(stories, parser):
+            self.stories[storypath] = compiled
 
     def bundle(self, ebnf=None):
         """
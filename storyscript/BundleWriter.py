@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import json
+from collections.abc import Iterator
+from itertools import chain, islice
+
+
+def _clean_dict(d):
+    """
+    Removes all falsy elements from a nested dict
+    """
+    if not isinstance(d, dict):
+        return d
+    return {k: _clean_dict(v) for k, v in d.items() if v}
+
+
+class _Encoded(str):
+    """
+    JSON which has already been encoded
+    """
+
+
+class BundleWriter:
+    """
+    Writes the JSON of a bundle while it is compiled. Every story is written
+    as soon as it has been compiled, s.t. only one compiled story is kept in
+    memory. The output is identical to json.dumps of the whole bundle.
+    Writers which share a `memo` dict keep the encoded stories in it, s.t.
+    stories which are still the same objects aren't encoded again when the
+    bundle is written again.
+    """
+
+    def __init__(self, out, concise=False, compact=False, memo=None):
+        self.out = out
+        self.concise = concise
+        self.memo = memo
+        if compact:
+            self.indent = None
+            self.encoder = json.JSONEncoder(separators=(',', ':'))
+        else:
+            self.indent = 2
+            self.encoder = json.JSONEncoder(indent=2)
+
+    def newline(self, level):
+        """
+        Returns the whitespace which starts a line at the nesting `level`.
+        """
+        if self.indent is None:
+            return ''
+        return '\n' + ' ' * (self.indent * level)
+
+    def encode(self, value, level):
+        """
+        Encodes a value nested at `level`.
+        """
+        data = self.encoder.encode(value)
+        if self.indent is not None and level > 0:
+            # newlines in strings are escaped, hence they are all indentation
+            data = data.replace('\n', self.newline(level))
+        return data
+
+    def value(self, value, level):
+        """
+        Writes a value nested at `level`.
+        """
+        if not isinstance(value, _Encoded):
+            value = self.encode(value, level)
+        self.out.write(value)
+
+    def object(self, items, level):
+        """
+        Writes the (key, value) pairs `items` as an object nested at `level`.
+        Values which are iterators are written as objects of their pairs,
+        which are only consumed while they are written.
+        """
+        out = self.out
+        empty = True
+        for key, value in items:
+            out.write('{' if empty else self.encoder.item_separator)
+            empty = False
+            out.write(self.newline(level + 1))
+            out.write(self.encoder.encode(key))
+            out.write(self.encoder.key_separator)
+            if isinstance(value, Iterator):
+                self.object(value, level + 1)
+            else:
+                self.value(value, level + 1)
+        if empty:
+            out.write('{}')
+        else:
+            out.write(self.newline(level))
+            out.write('}')
+
+    def stories(self, bundle, entrypoint, parser, services):
+        """
+        Compiles the stories of `bundle` and yields them with their path.
+        Collects the services of the stories into `services`.
+        """
+        written = set()
+        for path, story in bundle.compiled_stories(entrypoint, parser):
+            services.update(story['services'])
+            if self.concise and not story:
+                continue
+            written.add(path)
+            yield path, self.story(path, story)
+        if self.memo is not None:
+            # drops the stories which have been removed from the bundle
+            for path in [path for path in self.memo if path not in written]:
+                del self.memo[path]
+
+    def story(self, path, story):
+        """
+        Returns a compiled story as it is written. Stories are encoded when
+        a memo is used.
+        """
+        if self.memo is None:
+            if self.concise:
+                return _clean_dict(story)
+            return story
+        entry = self.memo.get(path, None)
+        if entry is None or entry[0] is not story:
+            value = story
+            if self.concise:
+                value = _clean_dict(story)
+            # stories are nested in the stories of the bundle
+            entry = story, _Encoded(self.encode(value, 2))
+            self.memo[path] = entry
+        return entry[1]
+
+    def items(self, bundle, ebnf):
+        """
+        Yields the items of the bundle like Bundle.bundle.
+        """
+        entrypoint = bundle.find_stories()
+        services = set()
+        # every entrypoint is compiled into a story
+        if entrypoint or not self.concise:
+            parser = bundle.parser(ebnf)
+            stories = self.stories(bundle, entrypoint, parser, services)
+            # nothing is written before the bundle has been parsed and its
+            # first story compiled, s.t. most errors leave no output behind
+            first = list(islice(stories, 1))
+            yield 'stories', chain(first, stories)
+        # the stories have been written when the next item is requested
+        if services or not self.concise:
+            yield 'services', sorted(services)
+        if entrypoint or not self.concise:
+            yield 'entrypoint', entrypoint
+
+    def write(self, bundle, ebnf=None):
+        """
+        Compiles a bundle and writes it.
+        """
+        self.object(self.items(bundle, ebnf), 0)
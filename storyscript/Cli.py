@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import io
 import os
+import stat
+import tempfile
+from functools import partial
 
 import click
 
@@ -9,11 +12,12 @@ from click_alias import ClickAliasedGroup
 from .App import App
 from .Features import Features
 from .Project import Project
+from .StoryCache import StoryCache
 from .Version import version as app_version
 from .exceptions import StoryError
 
 
-story_features = Features.all_feature_names()
+story_features = Features.preview_names()
 
 
 def preview_cb(ctx, param, values):
@@ -41,12 +45,75 @@ def preview_cb(ctx, param, values):
     return features
 
 
+def write_output(compile_to, output, json, silent, format):
+    """
+    Compiles stories with `compile_to`, which takes the `out` argument of
+    App.compile, and writes them to the file `output` or the standard output
+    """
+    if silent or not (json or format):
+        compile_to()
+        if not silent:
+            msg = 'Script syntax passed!'
+            click.echo(click.style(msg, fg='green'))
+        return
+    # the output is written while the stories are compiled
+    if output:
+        write_file(compile_to, output, 'wb' if format == 'binary' else 'w')
+        return
+    if format == 'binary':
+        # a trailing newline would corrupt the binary bundle
+        stdout = click.get_binary_stream('stdout')
+        compile_to(out=stdout)
+    else:
+        stdout = click.get_text_stream('stdout')
+        compile_to(out=stdout)
+        stdout.write('\n')
+    stdout.flush()
+
+
+def write_file(compile_to, output, mode):
+    """
+    Compiles stories with `compile_to` to a temporary file, which replaces
+    the file `output` once every story has compiled. Hence, an error leaves
+    a previous output in place.
+    """
+    directory = os.path.dirname(os.path.abspath(output))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.story-')
+    try:
+        with io.open(fd, mode) as f:
+            compile_to(out=f)
+        os.chmod(tmp, file_mode(output))
+        os.replace(tmp, output)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def file_mode(path):
+    """
+    Returns the permissions of the file `path`, or the default permissions
+    of a new file if it doesn't exist.
+    """
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
 class Cli:
 
     version_help = 'Prints Storyscript version'
     silent_help = 'Silent mode. Return syntax errors only.'
     ebnf_help = 'Load the grammar from a file. Useful for development'
     preview_help = 'Activate upcoming Storyscript features'
+    format_help = 'Output the stories as json, compact json or binary'
+    jobs_help = 'Compile stories or function bodies in N processes'
+    cache_help = 'Load unchanged stories from the story cache'
+    cache_dir_help = 'Directory of the story cache'
+    watch_help = 'Compile the stories again whenever they change'
+    formats = ['json', 'compact', 'binary']
 
     @click.group(invoke_without_command=True, cls=ClickAliasedGroup)
     @click.option('--version', '-v', is_flag=True, help=version_help)
@@ -74,11 +141,15 @@ class Cli:
                   multiple=True, help=preview_help)
     @click.option('--ignore', default=None,
                   help='Specify path of ignored files')
-    def parse(path, debug, ebnf, raw, ignore, lower, preview):
+    @click.option('--jobs', type=int, default=None,
+                  help='Parse stories in N processes')
+    def parse(path, debug, ebnf, raw, ignore, lower, preview, jobs):
         """
         Parses stories, producing the abstract syntax tree.
         """
         try:
+            if jobs is not None:
+                preview['jobs'] = jobs
             trees = App.parse(path, ignored_path=ignore, ebnf=ebnf,
                               lower=lower, features=preview)
             for story, tree in trees.items():
@@ -114,25 +185,49 @@ class Cli:
                   help='Specify path of ignored files')
     @click.option('--preview', callback=preview_cb, is_eager=True,
                   multiple=True, help=preview_help)
+    @click.option('--jobs', type=int, default=None, help=jobs_help)
+    @click.option('--hub', default=None,
+                  help='Specify path of the hub mutation specification')
+    @click.option('--format', type=click.Choice(formats), default=None,
+                  help=format_help)
+    @click.option('--cache', 'use_cache', is_flag=True, help=cache_help)
+    @click.option('--cache-dir', default=None,
+                  help=cache_dir_help + ', implies --cache')
+    @click.option('--watch', '-w', is_flag=True, help=watch_help)
     def compile(path, output, json, silent, debug, ebnf, ignore, concise,
-                first, preview):
+                first, preview, jobs, hub, format, use_cache, cache_dir,
+                watch):
         """
         Compiles stories and prints the resulting json
         """
         try:
-            results = App.compile(path, ignored_path=ignore,
-                                  ebnf=ebnf, concise=concise, first=first,
-                                  features=preview)
-            if not silent:
-                if json:
-                    if output:
-                        with io.open(output, 'w') as f:
-                            f.write(results)
-                        exit()
-                    click.echo(results)
-                else:
-                    msg = 'Script syntax passed!'
-                    click.echo(click.style(msg, fg='green'))
+            if jobs is not None:
+                preview['jobs'] = jobs
+            if hub is not None:
+                preview['hub'] = hub
+            cache = None
+            if use_cache or cache_dir:
+                cache = StoryCache(cache_dir)
+            options = dict(ebnf=ebnf, concise=concise, first=first,
+                           format=format or 'json')
+            if watch:
+                bundles = App.watch(path, ignored_path=ignore,
+                                    features=preview, cache=cache)
+                # unchanged stories are written without encoding them again
+                memo = {}
+                for bundle in bundles:
+                    compile_to = partial(App.compile_bundle, bundle,
+                                         memo=memo, **options)
+                    try:
+                        write_output(compile_to, output, json, silent, format)
+                    except StoryError as e:
+                        if debug:
+                            raise e.error
+                        e.echo()
+            else:
+                compile_to = partial(App.compile, path, ignored_path=ignore,
+                                     features=preview, cache=cache, **options)
+                write_output(compile_to, output, json, silent, format)
         except StoryError as e:
             if debug:
                 raise e.error
@@ -184,6 +279,40 @@ class Cli:
         """
         click.echo(App.grammar())
 
+    @staticmethod
+    @main.command()
+    @click.option('--clear', is_flag=True,
+                  help='Remove the cached parser and stories')
+    @click.option('--ebnf', help=ebnf_help)
+    @click.option('--cache-dir', default=None, help=cache_dir_help)
+    def cache(clear, ebnf, cache_dir):
+        """
+        Warms or clears the cache of the compiled parser and stories
+        """
+        if clear:
+            count = App.clear_cache()
+            stories = App.clear_story_cache(cache_dir)
+            click.echo('Removed {} cached parser(s) and {} cached story(s)'
+                       .format(count, stories))
+        else:
+            directory = App.warm_cache(ebnf=ebnf)
+            if directory is None:
+                click.echo(click.style('The parser could not be cached',
+                                       fg='red'))
+                exit(1)
+            click.echo('Parser cached in {}'.format(directory))
+
+    @staticmethod
+    @main.command()
+    @click.argument('path')
+    @click.argument('output')
+    def hub(path, output):
+        """
+        Compiles a hub mutation specification for faster loading
+        """
+        App.compile_hub(path, output)
+        click.echo('Hub compiled to {}'.format(output))
+
     @staticmethod
     @main.command(aliases=['n'])
     @click.argument('name')
@@ -200,6 +200,10 @@ class ErrorCodes:
         'E0128',
         '`{source}` is readonly and can not be returned.'
     )
+    import_cycle = (
+        'E0129',
+        'Stories can not import each other in a cycle: {cycle}'
+    )
 
     @staticmethod
     def is_error(error_name):
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 
 
 class Features:
@@ -9,7 +10,11 @@ class Features:
     defaults = {
         'globals': False,  # makes global variables writable
         'debug': False,    # enable debug output
+        'jobs': 1,         # compiles stories or functions in N processes
+        'hub': None,       # path of another hub mutation specification
     }
+    # features which take a value, hence they aren't preview flags
+    settings = ('jobs', 'hub')
 
     def __init__(self, features):
         self.features = self.defaults.copy()
@@ -25,6 +30,29 @@ class Features:
     def __getattr__(self, attribute):
         return self.features[attribute]
 
+    @staticmethod
+    def cpus():
+        """
+        Returns the number of CPUs this process can run on.
+        """
+        if hasattr(os, 'sched_getaffinity'):
+            return len(os.sched_getaffinity(0))
+        return os.cpu_count() or 1
+
+    def processes(self):
+        """
+        Returns the number of processes for `jobs`. More processes than CPUs
+        would only add the cost of sending the work to them.
+        """
+        return max(1, min(self.jobs, self.cpus()))
+
     @classmethod
     def all_feature_names(cls):
         return cls.defaults.keys()
+
+    @classmethod
+    def preview_names(cls):
+        """
+        Returns the features which can be enabled or disabled with --preview.
+        """
+        return [name for name in cls.defaults if name not in cls.settings]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from array import array
+from itertools import accumulate
+
+
+class LineIndex:
+    """
+    Indexes the offsets of all lines of a source, s.t. single lines can be
+    looked up without keeping a copy of every line.
+    Lines are separated like with str.splitlines.
+    """
+    separators = '\r\n\v\f\x1c\x1d\x1e\x85\u2028\u2029'
+
+    def __init__(self, source):
+        self.source = source
+        # the start of every line, followed by the end of the last line
+        offsets = array('q', [0])
+        offsets.extend(accumulate(map(len, source.splitlines(True))))
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def line(self, i):
+        """
+        Returns a line of the source without its line separator.
+        Line numbers start with 1.
+        """
+        assert 0 < i < len(self.offsets)
+        offsets = self.offsets
+        # lines only contain their own separator, e.g. '\r\n', at their end
+        return self.source[offsets[i - 1]:offsets[i]].rstrip(self.separators)
@@ -6,18 +6,19 @@ from functools import lru_cache
 
 from lark.exceptions import UnexpectedInput, UnexpectedToken
 
+from .LineIndex import LineIndex
 from .compiler import Compiler
 from .compiler.lowering import Lowering
 from .exceptions import CompilerError, StoryError, StorySyntaxError
-from .parser import Parser
+from .parser import ParserPool
 
 
 @lru_cache(maxsize=1)
 def _parser():
     """
-    Cached instance of the parser
+    Cached pool of parsers, which is shared by all threads
     """
-    return Parser()
+    return ParserPool()
 
 
 class Story:
@@ -26,11 +27,13 @@ class Story:
     compiling it.
     """
 
-    def __init__(self, story, features, path=None):
+    def __init__(self, story, features, path=None, templates=None):
         self.story = story
         self.path = path
-        self.lines = story.splitlines(keepends=False)
         self.features = features
+        # the TemplateCache of the bundle, if any
+        self.templates = templates
+        self._line_index = None
 
     @classmethod
     def read(cls, path):
@@ -79,7 +82,8 @@ class Story:
         try:
             self.tree = parser.parse(self.story)
             if lower:
-                proc = Lowering(parser, features=self.features)
+                proc = Lowering(parser, features=self.features,
+                                templates=self.templates)
                 self.tree = proc.process(self.tree)
         except (CompilerError, StorySyntaxError) as error:
             raise self.error(error) from error
@@ -106,7 +110,8 @@ class Story:
         """
         try:
             self.compiled = Compiler.compile(self.tree, story=self,
-                                             features=self.features)
+                                             features=self.features,
+                                             templates=self.templates)
         except (CompilerError, StorySyntaxError) as error:
             raise self.error(error) from error
 
@@ -130,18 +135,34 @@ class Story:
 
     def _parser(self):
         """
-        Returns the default Parser instance (cached)
+        Returns the default ParserPool instance (cached)
         """
         return _parser()
 
+    def line_index(self):
+        """
+        Returns the index of the lines of the story source (cached)
+        """
+        if self._line_index is None:
+            self._line_index = LineIndex(self.story)
+        return self._line_index
+
+    @property
+    def lines(self):
+        """
+        Returns the lines of the story source. They are cut out of the
+        source on every access, hence use Story.line for single lines.
+        """
+        index = self.line_index()
+        return [index.line(i) for i in range(1, len(index) + 1)]
+
     def line(self, i):
         """
         Returns a line from the story source.
-        Line numbers start with 1.
+        Line numbers start with 1. Fake lines, e.g. '12.1', have no source.
         """
-        if isinstance(i, str):
+        if type(i) is not int:
             if not i.isdigit():
                 return None
             i = int(i)
-        assert i <= len(self.lines)
-        return self.lines[i - 1]
+        return self.line_index().line(i)
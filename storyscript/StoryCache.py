@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+import glob
+import hashlib
+import io
+import marshal
+import os
+import platform
+import tempfile
+
+from .Version import version as compiler_version
+from .exceptions import StoryError
+from .parser import ParserCache
+
+
+def _plain(value):
+    """
+    Converts subclasses of str, e.g. the tokens of the parser, which
+    marshal can't store
+    """
+    if isinstance(value, dict):
+        return {_plain(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(_plain(v) for v in value)
+    if isinstance(value, str) and type(value) is not str:
+        return str(value)
+    return value
+
+
+class CachedStory:
+    """
+    A compiled story loaded from the StoryCache.
+    """
+
+    def __init__(self, key, modules, compiled):
+        self.key = key
+        self.modules = modules
+        self.compiled = compiled
+
+
+class StoryCache:
+    """
+    Persists compiled stories on disk, s.t. stories which haven't changed
+    aren't compiled again.
+    A story is stored by its source key, which hashes the source, the
+    compiler and the features. Its entry also holds the key of the story
+    including the keys of all modules it imports, which must still match
+    for the entry to be used. The least recently used entries are removed
+    once the cache exceeds `max_size` bytes.
+    """
+    prefix = 'story-'
+    suffix = '.marshal'
+    # bumped whenever the format of the entries changes
+    version = '1'
+    max_size = 256 * 2 ** 20
+    # features which don't change the compiled stories
+    ignored_features = ('jobs',)
+    _compiler = None
+
+    def __init__(self, directory=None, max_size=None):
+        if directory is None:
+            directory = self.default_directory()
+        self.directory = directory
+        if max_size is not None:
+            self.max_size = max_size
+
+    @staticmethod
+    def default_directory():
+        """
+        Returns the default cache directory, which is shared with the
+        ParserCache.
+        """
+        return os.path.join(ParserCache.default_directory(), 'stories')
+
+    @classmethod
+    def compiler(cls):
+        """
+        Identifies the compiler by its version and the files of the
+        package, s.t. changes of development builds aren't missed.
+        """
+        if cls._compiler is None:
+            package = os.path.dirname(os.path.abspath(__file__))
+            files = []
+            for root, subdirs, names in os.walk(package):
+                subdirs[:] = sorted(d for d in subdirs if d != '__pycache__')
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    stat = os.stat(path)
+                    files.append(f'{os.path.relpath(path, package)} '
+                                 f'{stat.st_size} {stat.st_mtime_ns}')
+            key = '\n'.join([compiler_version, platform.python_version()] +
+                            files)
+            cls._compiler = hashlib.sha256(key.encode('utf8')).hexdigest()
+        return cls._compiler
+
+    @classmethod
+    def features_key(cls, features):
+        """
+        Returns the features which change the compiled stories. The hub is
+        identified by the contents of its file.
+        """
+        items = []
+        for name, value in sorted(features.features.items()):
+            if name in cls.ignored_features:
+                continue
+            if name == 'hub' and value is not None:
+                value = cls.hub_key(value)
+            items.append(f'{name}={value}')
+        return ','.join(items)
+
+    @staticmethod
+    def hub_key(path):
+        """
+        Hashes the contents of the hub specification at `path`.
+        """
+        try:
+            with io.open(path, 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except FileNotFoundError:
+            raise StoryError.create_error('file_not_found', path=path,
+                                          abspath=os.path.abspath(path))
+
+    @classmethod
+    def source_key(cls, source, features_key):
+        """
+        Computes the key of a story source, where `features_key` are the
+        features returned by `features_key`.
+        """
+        key = '\n'.join([cls.version, cls.compiler(), features_key, source])
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
+
+    @staticmethod
+    def key(source_key, module_keys):
+        """
+        Computes the key of a story from its source key and the keys of the
+        modules it imports.
+        """
+        key = '\n'.join([source_key] + list(module_keys))
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
+
+    def path(self, source_key):
+        """
+        Returns the path of the cache file for a source key
+        """
+        name = f'{self.prefix}{source_key}{self.suffix}'
+        return os.path.join(self.directory, name)
+
+    def entries(self):
+        """
+        Returns the paths of all cached stories
+        """
+        pattern = os.path.join(self.directory, f'{self.prefix}*{self.suffix}')
+        return glob.glob(pattern)
+
+    def load(self, source_key):
+        """
+        Loads a cached story. Returns `None` if the story hasn't been cached
+        yet or the cache file can't be read.
+        """
+        path = self.path(source_key)
+        try:
+            with io.open(path, 'rb') as f:
+                key, modules, compiled = marshal.load(f)
+            # the modification time orders the entries for the eviction
+            os.utime(path)
+        except Exception:
+            return None
+        return CachedStory(key, modules, compiled)
+
+    def save(self, source_key, key, modules, compiled):
+        """
+        Saves a compiled story in the cache.
+        Failing to write the cache is not an error.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            try:
+                with io.open(fd, 'wb') as f:
+                    marshal.dump((key, modules, _plain(compiled)), f)
+                # an atomic rename prevents concurrent processes from
+                # reading partially written files
+                os.replace(tmp, self.path(source_key))
+            except Exception:
+                os.remove(tmp)
+        except OSError:
+            pass
+
+    def evict(self):
+        """
+        Removes the least recently used stories until the cache fits into
+        `max_size`. Returns the number of removed entries.
+        """
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        entries.sort()
+        size = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, entry_size, entry in entries:
+            if size <= self.max_size:
+                break
+            if ParserCache.remove(entry):
+                removed += 1
+            size -= entry_size
+        return removed
+
+    def clear(self):
+        """
+        Removes all cached stories and returns the number of removed entries.
+        """
+        return len([e for e in self.entries() if ParserCache.remove(e)])
+
+
+class MemoryCache:
+    """
+    Keeps compiled stories in memory, optionally in front of a StoryCache
+    `cache`. Its keys are the keys of the StoryCache, hence a story is only
+    compiled again once it or one of the modules it imports changes.
+    Stories which haven't been used since the last eviction are dropped.
+    """
+    # stories are stored by the keys of the StoryCache
+    features_key = StoryCache.features_key
+    source_key = StoryCache.source_key
+    key = staticmethod(StoryCache.key)
+
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.stories = {}
+        # the source keys which have been used since the last eviction
+        self.used = set()
+
+    def load(self, source_key):
+        """
+        Loads a story from memory or the underlying cache.
+        """
+        self.used.add(source_key)
+        story = self.stories.get(source_key, None)
+        if story is None and self.cache is not None:
+            story = self.cache.load(source_key)
+            if story is not None:
+                self.stories[source_key] = story
+        return story
+
+    def save(self, source_key, key, modules, compiled):
+        """
+        Keeps a compiled story in memory and saves it in the underlying
+        cache.
+        """
+        self.used.add(source_key)
+        self.stories[source_key] = CachedStory(key, modules, compiled)
+        if self.cache is not None:
+            self.cache.save(source_key, key, modules, compiled)
+
+    def evict(self):
+        """
+        Drops the stories which haven't been used since the last eviction
+        and evicts the underlying cache. Returns the number of dropped
+        stories.
+        """
+        unused = [key for key in self.stories if key not in self.used]
+        for key in unused:
+            del self.stories[key]
+        self.used = set()
+        if self.cache is not None:
+            self.cache.evict()
+        return len(unused)
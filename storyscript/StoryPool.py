@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+import gc
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .Features import Features
+from .Story import Story
+from .compiler.lowering import TemplateCache
+from .exceptions import StoryError
+from .parser import Parser, TreePickler
+
+
+# the parser, features and string templates of this worker
+_worker_parser = None
+_worker_features = None
+_worker_templates = None
+
+
+def _init_worker(ebnf, features):
+    global _worker_parser, _worker_features, _worker_templates
+    # forked workers inherit the heap of the compiler, which the garbage
+    # collector would otherwise scan again and again
+    if hasattr(gc, 'freeze'):  # Python 3.7+
+        gc.freeze()
+    if ebnf is not None:
+        _worker_parser = Parser(ebnf=ebnf)
+    # the stories are already compiled in parallel
+    _worker_features = Features(dict(features, jobs=1))
+    _worker_templates = TemplateCache()
+    # creates the parser before the first story arrives
+    Story('', _worker_features).parse(parser=_worker_parser)
+
+
+def parse_story(source, lower):
+    """
+    Parses a story in a worker process. Returns the modules of the story
+    and its pickled tree, or None if the story can't be parsed.
+    """
+    story = Story(source, _worker_features, templates=_worker_templates)
+    try:
+        story.parse(parser=_worker_parser, lower=lower)
+    except Exception:
+        return None
+    # the parser of the worker stays in the worker
+    story.tree.__dict__.pop('parser', None)
+    return story.modules(), TreePickler.dumps(story.tree)
+
+
+def compile_story(source):
+    """
+    Parses and compiles a story in a worker process. Returns the modules of
+    the story and its compiled story, which is None if the story can't be
+    compiled. Returns None if the story can't be parsed.
+    """
+    story = Story(source, _worker_features, templates=_worker_templates)
+    try:
+        story.parse(parser=_worker_parser)
+    except Exception:
+        return None
+    modules = story.modules()
+    try:
+        story.compile()
+    except Exception:
+        return modules, None
+    return modules, story.compiled
+
+
+class StoryPool:
+    """
+    Parses or compiles the stories of a bundle in a pool of processes.
+    Stories only depend on each other through their imports, hence every
+    story is processed on its own and the modules it imports are submitted
+    as soon as they are known. Stories which fail in the pool are left to
+    the Bundle, which processes them again to raise their errors in the
+    same order as a serial compilation.
+    """
+
+    def __init__(self, jobs, parser, features):
+        self.jobs = jobs
+        ebnf = None
+        if parser is not None:
+            ebnf = parser.ebnf
+        self.executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker,
+            initargs=(ebnf, features.features))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def map(self, bundle, stories, task, *args, cached=None, imports=True):
+        """
+        Runs `task` with the sources of stories and all modules they import,
+        unless `imports` is False. Stories for which `cached` returns a
+        CachedStory aren't processed again.
+        Returns the results by path, which are None for stories that
+        couldn't be read or processed.
+        """
+        results = {}
+        futures = {}
+        submitted = set()
+
+        def submit(storypath):
+            if storypath in submitted:
+                return
+            submitted.add(storypath)
+            try:
+                source = bundle.load_story(storypath).story
+                story = None
+                if cached is not None:
+                    story = cached(storypath)
+            except StoryError:
+                results[storypath] = None
+                return
+            if story is not None:
+                results[storypath] = story.modules, story
+                follow(story.modules)
+                return
+            futures[self.executor.submit(task, source, *args)] = storypath
+
+        def follow(modules):
+            if imports:
+                for module in modules:
+                    submit(module)
+
+        try:
+            for storypath in stories:
+                submit(storypath)
+            for storypath, result in self.completed(futures):
+                results[storypath] = result
+                if result is not None:
+                    follow(result[0])
+        finally:
+            # e.g. on interrupts, shutdown only cancels them since Python 3.9
+            for future in futures:
+                future.cancel()
+        return results
+
+    @staticmethod
+    def completed(futures):
+        """
+        Yields the path and result of the futures as they complete, where
+        `futures` maps every future to its path. Futures can be added while
+        the results are consumed. The result is None if the task failed.
+        """
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                storypath = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception:
+                    # e.g. too deeply nested to be sent back
+                    result = None
+                yield storypath, result
+
+    def parse(self, bundle, stories, lower):
+        """
+        Parses stories and their modules. Returns the modules of every story
+        and its pickled tree by path.
+        """
+        return self.map(bundle, stories, parse_story, lower)
+
+    def compile(self, bundle, stories, cached=None, imports=True):
+        """
+        Compiles stories and their modules. Returns the modules of every
+        story and its compiled story or CachedStory by path.
+        """
+        return self.map(bundle, stories, compile_story, cached=cached,
+                        imports=imports)
+
+    def close(self):
+        """
+        Shuts the workers down.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from .Bundle import Bundle
+from .Story import Story
+from .StoryCache import MemoryCache
+from .exceptions import StoryError
+
+
+class Watcher:
+    """
+    Watches the stories of a path and yields its bundle whenever they
+    change. The bundle, its parsers and the compiled stories stay in memory,
+    s.t. only changed stories and the stories which import them are
+    compiled again.
+    The stories are polled for changes every `interval` seconds.
+    """
+    interval = 0.25
+
+    def __init__(self, path, ignored_path=None, features=None, cache=None):
+        self.path = path
+        self.ignored_path = ignored_path
+        self.bundle = Bundle(features=features, cache=MemoryCache(cache))
+        # the stories found in the path, which are None before the first
+        # update
+        self.stories = None
+        # the modification time and size of every watched story
+        self.stats = {}
+        # the modification time and size of the hub specification
+        self.hub_stat = None
+
+    def files(self):
+        """
+        Returns the story files of the path.
+        """
+        if os.path.isdir(self.path):
+            return Bundle.parse_directory(self.path,
+                                          ignored_path=self.ignored_path)
+        return [self.path]
+
+    @staticmethod
+    def stat(path):
+        """
+        Returns the modification time and size of a story, or None if it
+        doesn't exist.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def update_hub(self):
+        """
+        Checks whether the hub specification has changed since the last
+        update. All stories are compiled again once it changes.
+        """
+        hub = self.bundle.features.hub
+        if hub is None:
+            return False
+        stat = self.stat(hub)
+        changed = self.hub_stat is not None and stat != self.hub_stat
+        self.hub_stat = stat
+        if changed:
+            self.bundle.features_key = None
+            self.bundle.source_keys = {}
+        return changed
+
+    def update(self):
+        """
+        Reads the stories which have changed since the last update into the
+        bundle. Modules which are imported from outside the path and the hub
+        specification are watched as well. Returns whether any story has
+        been added, changed or removed or the hub specification has changed.
+        """
+        bundle = self.bundle
+        files = self.files()
+        stats = {}
+        for path in set(files).union(bundle.story_files):
+            stats[path] = self.stat(path)
+        # modules imported since the last update have been read with their
+        # current stat, hence only known stories can have changed
+        changed = [path for path in stats
+                   if path in self.stats and stats[path] != self.stats[path]]
+        hub_changed = self.update_hub()
+        found = files != self.stories or hub_changed
+        self.stories = files
+        self.stats = stats
+        if not changed and not found:
+            return False
+        for path in changed:
+            bundle.source_keys.pop(path, None)
+        story_files = {}
+        for path in files:
+            source = bundle.story_files.get(path, None)
+            if source is None or path in changed:
+                try:
+                    source = Story.read(path)
+                except StoryError:
+                    # removed since it has been found
+                    continue
+            story_files[path] = source
+        # modules from outside the path are read again once they are
+        # imported, s.t. they don't become stories of the bundle
+        bundle.story_files = story_files
+        bundle.stories = {}
+        return True
+
+    def watch(self, interval=None):
+        """
+        Yields the bundle with the current stories and then whenever they
+        change.
+        """
+        if interval is None:
+            interval = self.interval
+        while True:
+            if self.update():
+                yield self.bundle
+            time.sleep(interval)
@@ -7,16 +7,17 @@ from storyscript.compiler.semantics.Semantics import Semantics
 class Compiler:
 
     @classmethod
-    def generate(cls, tree, features):
+    def generate(cls, tree, features, templates=None):
         """
         Parses an AST and checks it.
         """
-        tree = Lowering(parser=tree.parser, features=features).process(tree)
+        tree = Lowering(parser=tree.parser, features=features,
+                        templates=templates).process(tree)
         return Semantics(features=features).process(tree)
 
     @classmethod
-    def compile(cls, tree, story, features, backend='json'):
+    def compile(cls, tree, story, features, backend='json', templates=None):
         assert backend == 'json'
         compiler = JSONCompiler(story)
-        tree = cls.generate(tree, features)
+        tree = cls.generate(tree, features, templates)
         return compiler.compile(tree)
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from storyscript.Version import version
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
 from storyscript.exceptions import StorySyntaxError
 from storyscript.exceptions import internal_assert
 from storyscript.parser import Tree
@@ -12,6 +13,8 @@ class JSONCompiler:
 
     """
     Compiles Storyscript abstract syntax tree to JSON.
+    Blocks yield the compilation of their nested blocks, which is run on an
+    explicit stack by compile.
     """
     def __init__(self, story):
         self.lines = Lines(story)
@@ -171,13 +174,14 @@ class JSONCompiler:
         """
         Searches upword in the tree for a parent with an output field.
         """
-        tree.expect(parent is not None, 'when_no_output_parent')
-        parent = self.lines.lines[parent]
-        if parent['output'] is not None and len(parent['output']) > 0 and \
-                parent['service'] is not None:
-            return parent['output']
-
-        return self.find_parent_with_output(tree, parent['parent'])
+        while True:
+            tree.expect(parent is not None, 'when_no_output_parent')
+            parent = self.lines.lines[parent]
+            if parent['output'] is not None and \
+                    len(parent['output']) > 0 and \
+                    parent['service'] is not None:
+                return parent['output']
+            parent = parent['parent']
 
     def when(self, tree, nested_block, parent):
         """
@@ -211,11 +215,11 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('if', line, args=args, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         trees = tree.extract('elseif_block')
         if tree.else_block:
             trees.append(tree.else_block)
-        self.subtrees(*trees, parent=parent)
+        yield self.subtrees(*trees, parent=parent)
         if len(trees) == 0 and not tree.else_block:
             self.lines.finish_scope(line)
 
@@ -231,7 +235,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('elif', line, args=args, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def else_block(self, tree, parent):
@@ -244,7 +248,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('else', line, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def foreach_block(self, tree, parent):
@@ -256,7 +260,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent, output)
         self.lines.append('for', line, args=args, enter=nested_block.line(),
                           parent=parent, output=output)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def while_block(self, tree, parent):
@@ -267,7 +271,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('while', line, args=args, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def function_block(self, tree, parent):
@@ -284,7 +288,7 @@ class JSONCompiler:
         self.lines.append('function', line, function=function_name,
                           output=output, args=args, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def mutation_block(self, tree, parent):
@@ -331,11 +335,11 @@ class JSONCompiler:
 
         self.service(tree.service, tree.nested_block, parent)
         if tree.nested_block:
-            self.subtree(tree.nested_block, parent=tree.line())
+            yield self.subtree(tree.nested_block, parent=tree.line())
 
     def when_block(self, tree, parent):
         self.when(tree, tree.nested_block, parent)
-        self.subtree(tree.nested_block, parent=tree.line())
+        yield self.subtree(tree.nested_block, parent=tree.line())
 
     def try_block(self, tree, parent):
         """
@@ -346,11 +350,11 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('try', line, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         if tree.catch_block:
-            self.catch_block(tree.catch_block, parent=parent)
+            yield self.catch_block(tree.catch_block, parent=parent)
         if tree.finally_block:
-            self.finally_block(tree.finally_block, parent=parent)
+            yield self.finally_block(tree.finally_block, parent=parent)
         if not (tree.catch_block or tree.finally_block):
             self.lines.finish_scope(line)
 
@@ -375,7 +379,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent, output)
         self.lines.append('catch', line, enter=nested_block.line(),
                           output=output, parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def finally_block(self, tree, parent):
@@ -388,7 +392,7 @@ class JSONCompiler:
         self.lines.set_scope(line, parent)
         self.lines.append('finally', line, enter=nested_block.line(),
                           parent=parent)
-        self.subtree(nested_block, parent=line)
+        yield self.subtree(nested_block, parent=line)
         self.lines.finish_scope(line)
 
     def break_statement(self, tree, parent):
@@ -400,7 +404,7 @@ class JSONCompiler:
         Parses many subtrees
         """
         for tree in trees:
-            self.subtree(tree, parent=parent)
+            yield self.subtree(tree, parent=parent)
 
     def subtree(self, tree, parent=None):
         """
@@ -414,9 +418,9 @@ class JSONCompiler:
                          'imports', 'while_block', 'throw_statement',
                          'break_statement', 'mutation_block', 'indented_chain']
         if tree.data in allowed_nodes:
-            getattr(self, tree.data)(tree, parent)
+            return getattr(self, tree.data)(tree, parent)
         else:
-            self.parse_tree(tree, parent=parent)
+            return self.parse_tree(tree, parent=parent)
 
     def parse_tree(self, tree, parent=None):
         """
@@ -424,13 +428,13 @@ class JSONCompiler:
         """
         for item in tree.children:
             assert isinstance(item, Tree)
-            self.subtree(item, parent=parent)
+            yield self.subtree(item, parent=parent)
 
     def compile(self, tree, debug=False):
         """
         Compile an AST to JSON
         """
-        self.parse_tree(tree)
+        StackVisitor.run(self.parse_tree(tree))
         lines = self.lines
         return {'tree': lines.lines, 'services': lines.get_services(),
                 'entrypoint': lines.entrypoint(), 'modules': lines.modules,
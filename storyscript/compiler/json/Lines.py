@@ -6,16 +6,22 @@ class Lines:
     """
     Holds compiled lines and provides methods for operation on lines.
     """
+    # lines which are exited by the following elif/else/catch/finally
+    exit_methods = ('if', 'elif', 'try', 'catch')
+
     def __init__(self, story):
         self.story = story
         self.lines = {}
         self._lines = []  # sorted line nr (by insertion)
         self.variables = []
+        self.variable_names = set()  # all names of variables, frozen
         self.services = []
         self.functions = {}
         self.output_scopes = {}
         self.modules = {}
         self.finished_scopes = []
+        # the last line which takes an exit line
+        self.exit_line = None
 
     def entrypoint(self):
         """
@@ -51,6 +57,8 @@ class Lines:
             previous_line['name'] = name
 
         self.variables.append(name)
+        for n in name:
+            self.variable_names.add(self.freeze(n))
 
     def set_next(self, line_number):
         """
@@ -65,12 +73,9 @@ class Lines:
         Sets the current line as the exit line for a previous one, as needed
         in if/elif/else and try/catch/finally blocks.
         """
-        methods = ['if', 'elif', 'try', 'catch']
-        for line_number in self._lines[::-1]:
-            if self.lines[line_number]['method'] in methods:
-                self.finished_scopes = []
-                self.lines[line_number]['exit'] = line
-                break
+        if self.exit_line is not None:
+            self.finished_scopes = []
+            self.lines[self.exit_line]['exit'] = line
 
     def set_scope(self, line, parent, output=[]):
         """
@@ -124,6 +129,8 @@ class Lines:
         }
         # save insertion order
         self._lines.append(line)
+        if method in self.exit_methods:
+            self.exit_line = line
 
     def check_service_name(self, service, line):
         """
@@ -159,11 +166,21 @@ class Lines:
         """
         return list(sorted(set(self.services)))
 
+    @classmethod
+    def freeze(cls, value):
+        """
+        Converts compiled objects to hashable values, which are equal if the
+        objects are equal.
+        """
+        if isinstance(value, dict):
+            return dict, frozenset((k, cls.freeze(v))
+                                   for k, v in value.items())
+        if isinstance(value, list):
+            return list, tuple(cls.freeze(v) for v in value)
+        return value
+
     def is_variable_defined(self, variable_name):
         """
         Checks whether a variable has been defined so far
         """
-        for vs in self.variables:
-            if variable_name in vs:
-                return True
-        return False
+        return self.freeze(variable_name) in self.variable_names
@@ -128,12 +128,10 @@ class Objects:
         Builds the tree for a name or dotted name.
         """
         names = name.split('.')
-        tree = Tree('path', [Token('NAME', names[0])])
-        if len(names) > 1:
-            for name in names[1:]:
-                fragment = Tree('path_fragment', [Token('NAME', name)])
-                tree.children.append(fragment)
-        return tree
+        children = [Token('NAME', names[0])]
+        for name in names[1:]:
+            children.append(Tree('path_fragment', [Token('NAME', name)]))
+        return Tree('path', children)
 
     def string(self, tree):
         """
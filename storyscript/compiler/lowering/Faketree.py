@@ -62,11 +62,13 @@ class FakeTree:
         """
         Updates the line for all tokens of a given `node`.
         """
-        for child in node.children:
-            if isinstance(child, Token):
-                child.line = line
-            else:
-                self.mark_line(child, line)
+        stack = [node]
+        while stack:
+            for child in stack.pop().children:
+                if isinstance(child, Token):
+                    child.line = line
+                else:
+                    stack.append(child)
 
     def assignment(self, value):
         """
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 from enum import Enum
 
+from lark.exceptions import UnexpectedInput
 from lark.lexer import Token
 
 from storyscript.compiler.lowering.Faketree import FakeTree
+from storyscript.compiler.lowering.TemplateCache import TemplateCache
 from storyscript.compiler.lowering.utils import service_to_mutation, \
         unicode_escape
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
+from storyscript.exceptions import CompilerError, StorySyntaxError
 from storyscript.parser.Transformer import Transformer
 from storyscript.parser.Tree import Tree
 
@@ -22,13 +26,18 @@ class Lowering:
     too complicated for the Transformer, before the tree is compiled.
     """
 
-    def __init__(self, parser, features):
+    def __init__(self, parser, features, templates=None):
         """
         Saves the used parser as it might be used again for re-evaluation
-        of new statements (e.g. for string interpolation)
+        of new statements (e.g. for string interpolation). The parsed string
+        templates are kept in `templates`, which is shared by the stories of
+        a bundle.
         """
         self.parser = parser
         self.features = features
+        if templates is None:
+            templates = TemplateCache()
+        self.templates = templates
 
     @staticmethod
     def fake_tree(block):
@@ -72,6 +81,8 @@ class Lowering:
             # only generate a fake_block once for every line
             # node: block in which the fake assignments should be inserted
             block = cls.fake_tree(node)
+        elif node.data == 'call_expression':
+            cls.lower_function_dot(node)
         elif node.data == 'entity' or node.data == 'key_value':
             # set the parent where the inline_expression path should be
             # inserted
@@ -86,12 +97,15 @@ class Lowering:
         if node.data == 'base_expression' and \
                 node.child(0).data != 'expression' and \
                 parent.data != 'assignment_fragment':
+            # the expression is moved to a fake line, which isn't visited
+            yield cls.visit_function_dot(node)
             # replace base_expression too
             fun(node, block, node)
             node.children = [Tree('path', node.children)]
 
         for c in node.children:
-            cls.visit(c, block, entity, pred, fun, parent=node)
+            if not isinstance(c, Token):
+                yield cls.visit(c, block, entity, pred, fun, parent=node)
 
         if pred(node):
             assert entity is not None
@@ -134,7 +148,7 @@ class Lowering:
         if len(other_nodes) == 0:
             return base_tree.children[0]
 
-        base_tree.children.append(
+        base_tree.append(
             Tree('arith_operator', [Token('PLUS', '+')]),
         )
 
@@ -143,7 +157,7 @@ class Lowering:
         # directly flatten the tree and add all additional nodes as extra
         # mul_expressions
         for n2 in other_nodes:
-            base_tree.children.append(Tree('mul_expression', [
+            base_tree.append(Tree('mul_expression', [
                 Tree('unary_expression', [
                     n2
                 ])
@@ -235,28 +249,58 @@ class Lowering:
                 'string': buf
             }
 
-    def eval(self, orig_node, code_string, fake_tree):
+    def parse_template(self, code, column):
         """
-        Evaluates a string by parsing it to its AST representation.
-        Inserts the AST expression as fake_node and returns the path
-        reference to the inserted fake_node.
+        Parses the code of a string template with the template rule of the
+        grammar and moves its tokens to the column of the template. Returns
+        None if the code isn't an expression or a service call.
+        The parsed code is cached and shared, hence a copy is returned.
         """
-        line = orig_node.line()
-        column = int(orig_node.column()) + 1
+        if self.parser is None:
+            return None
+        key = (self.parser, code)
+        node = self.templates.load(key)
+        if node is None:
+            try:
+                tree = self.parser.parse_template(code)
+            except (CompilerError, StorySyntaxError, UnexpectedInput):
+                return None
+            if tree is None:
+                return None
+            node = tree.children[0]
+            self.templates.save(key, node)
+        return node.clone(column)
+
+    def parse_statement(self, orig_node, code, column):
+        """
+        Parses the code of a string template as a story, which raises its
+        syntax errors. Returns its only statement.
+        """
+        from storyscript.Story import Story
         # add whitespace as padding to fixup the column location of the
         # resulting tokens.
-        from storyscript.Story import Story
-        story = Story(' ' * column + code_string, features=self.features)
+        story = Story(' ' * column + code, features=self.features)
         story.parse(self.parser)
-        new_node = story.tree
-
-        new_node = new_node.block
+        new_node = story.tree.block
         orig_node.expect(new_node, 'string_templates_no_assignment')
         # go to the actual node -> jump into block.rules or block.service
         for i in range(2):
             orig_node.expect(len(new_node.children) == 1,
                              'string_templates_no_assignment')
             new_node = new_node.children[0]
+        return new_node
+
+    def eval(self, orig_node, code_string, fake_tree):
+        """
+        Evaluates a string by parsing it to its AST representation.
+        Inserts the AST expression as fake_node and returns the path
+        reference to the inserted fake_node.
+        """
+        line = orig_node.line()
+        column = int(orig_node.column()) + 1
+        new_node = self.parse_template(code_string, column)
+        if new_node is None:
+            new_node = self.parse_statement(orig_node, code_string, column)
         # for now only expressions or service_blocks are allowed inside string
         # templates
         if new_node.data == 'service_block' and \
@@ -447,7 +491,9 @@ class Lowering:
             self.inline_string_templates(node, block, parent, cmp_expr)
 
         for c in node.children:
-            self.visit_string_templates(c, block, node, cmp_expr=cmp_expr)
+            if not isinstance(c, Token):
+                yield self.visit_string_templates(c, block, node,
+                                                  cmp_expr=cmp_expr)
 
     def visit_concise_when(self, node):
         """
@@ -459,10 +505,12 @@ class Lowering:
         # concise_when_blocks can only occur at the root-level, hence we can
         # directly iterate here:
         if node.data == 'block':
-            fake_tree = self.fake_tree(node)
+            fake_tree = None
             for i, c in enumerate(node.children):
                 if c.data == 'concise_when_block':
-                    node.children[i] = self.process_concise_block(c, fake_tree)
+                    if fake_tree is None:
+                        fake_tree = self.fake_tree(node)
+                    node.replace(i, self.process_concise_block(c, fake_tree))
 
     def process_concise_block(self, node, fake_tree):
         """
@@ -516,71 +564,63 @@ class Lowering:
             ])
         ])
 
-    def visit_assignment(self, node, block, parent):
-        """
-        Visit assignments and lower destructors
-        """
-        if not hasattr(node, 'children') or len(node.children) == 0:
-            return
-
-        if node.data == 'block':
-            # only generate a fake_block once for every line
-            # node: block in which the fake assignments should be inserted
-            block = self.fake_tree(node)
-
-        if node.data == 'assignment':
-            c = node.children[0]
-            if c.data == 'types':
-                line = node.line()
-                base_expr = node.assignment_fragment.base_expression
-                orig_node = Tree('base_expression', base_expr.children)
-                orig_obj = block.add_assignment(orig_node, original_line=line)
-                base_expr.children = [
-                    Tree('expression', [
-                        Tree('as_expression', [
-                            orig_obj,
-                            Tree('as_operator', [c]),
-                        ])
+    def lower_assignment(self, node, block, parent):
+        """
+        Lowers typed assignments and destructors. The fake tree of the block
+        is only created if new lines are inserted.
+        """
+        fake_tree = None
+        c = node.children[0]
+        if c.data == 'types':
+            fake_tree = self.fake_tree(block)
+            line = node.line()
+            base_expr = node.assignment_fragment.base_expression
+            orig_node = Tree('base_expression', base_expr.children)
+            orig_obj = fake_tree.add_assignment(orig_node, original_line=line)
+            base_expr.children = [
+                Tree('expression', [
+                    Tree('as_expression', [
+                        orig_obj,
+                        Tree('as_operator', [c]),
                     ])
-                ]
-                # now process the rest of the assignment
-                node.children = node.children[1:]
-                c = node.children[0]
+                ])
+            ]
+            # now process the rest of the assignment
+            node.children = node.children[1:]
+            c = node.children[0]
 
-            if c.data == 'path':
-                # a path assignment -> no processing required
-                pass
+        if c.data == 'path':
+            # a path assignment -> no processing required
+            return
+
+        assert c.data == 'assignment_destructoring'
+        if fake_tree is None:
+            fake_tree = self.fake_tree(block)
+        line = node.line()
+        base_expr = node.assignment_fragment.base_expression
+        orig_node = Tree('base_expression', base_expr.children)
+        orig_obj = fake_tree.add_assignment(orig_node, original_line=line)
+        for i, n in enumerate(c.children):
+            new_line = fake_tree.line()
+            n.expect(len(n.children) == 1,
+                     'object_destructoring_invalid_path')
+            name = n.child(0)
+            name.line = new_line  # update token's line info
+            # <n> = <val>
+            val = self.create_entity(Tree('path', [
+                orig_obj.child(0),
+                Tree('path_fragment', [
+                    Tree('string', [name])
+                ])
+            ]))
+            if i + 1 == len(c.children):
+                # for the last entry, we can recycle the existing node
+                node.replace(0, n)
+                node.assignment_fragment.base_expression.children = [val]
             else:
-                assert c.data == 'assignment_destructoring'
-                line = node.line()
-                base_expr = node.assignment_fragment.base_expression
-                orig_node = Tree('base_expression', base_expr.children)
-                orig_obj = block.add_assignment(orig_node, original_line=line)
-                for i, n in enumerate(c.children):
-                    new_line = block.line()
-                    n.expect(len(n.children) == 1,
-                             'object_destructoring_invalid_path')
-                    name = n.child(0)
-                    name.line = new_line  # update token's line info
-                    # <n> = <val>
-                    val = self.create_entity(Tree('path', [
-                        orig_obj.child(0),
-                        Tree('path_fragment', [
-                            Tree('string', [name])
-                        ])
-                    ]))
-                    if i + 1 == len(c.children):
-                        # for the last entry, we can recycle the existing node
-                        node.children[0] = n
-                        node.assignment_fragment.base_expression.children = \
-                            [val]
-                    else:
-                        # insert new fake line
-                        a = block.assignment_path(n, val, new_line)
-                        parent.children.insert(0, a)
-        else:
-            for c in node.children:
-                self.visit_assignment(c, block, parent=node)
+                # insert new fake line
+                a = fake_tree.assignment_path(n, val, new_line)
+                parent.insert(a)
 
     @staticmethod
     def create_unary_operation(child):
@@ -625,108 +665,118 @@ class Lowering:
         ]))
         node.children = [unary_op]
 
-    def visit_cmp_expr(self, node):
+    @classmethod
+    def lower_cmp_expr(cls, node):
         """
-        Visit assignments and lower destructors
+        Rewrites `!=`, `>=` and `>` with the negated inverse comparison
         """
-        if not hasattr(node, 'children') or len(node.children) == 0:
-            return
-
-        if node.data == 'cmp_expression' and len(node.children) == 3:
+        if len(node.children) == 3:
             cmp_op = node.child(1)
             assert cmp_op.data == 'cmp_operator'
             cmp_tok = cmp_op.child(0)
             if cmp_tok.type == 'NOT_EQUAL' or \
                     cmp_tok.type == 'GREATER_EQUAL' or \
                     cmp_tok.type == 'GREATER':
-                self.rewrite_cmp_expr(node)
-
-        for c in node.children:
-            self.visit_cmp_expr(c)
+                cls.rewrite_cmp_expr(node)
 
-    def visit_arguments(self, node):
+    @staticmethod
+    def lower_as_expr(node, block):
         """
-        Transforms an argument tree. Short-hand argument (:foo) will be
-        expanded.
+        Moves the output names of an `as` up to the service or foreach block
         """
-        if not hasattr(node, 'children') or len(node.children) == 0:
-            return
-
-        if node.data == 'arguments':
-            Transformer.argument_shorthand(node)
+        as_op = node.as_operator
+        if as_op is not None and as_op.output_names is not None:
+            output = Tree('output', as_op.output_names.children)
+            node.expect(block is not None, 'service_no_inline_output')
+            block.append(output)
+            node.children = [node.children[0]]
 
-        for c in node.children:
-            self.visit_arguments(c)
+    @staticmethod
+    def lower_function_dot(node):
+        """
+        Lowers a function call with more than one path name into a mutation.
+        """
+        call_expr = node
+        if len(call_expr.path.children) > 1:
+            path_fragments = call_expr.path.children
+            if len(path_fragments) == 2:
+                # don't rewrite s.length.max() yet
+                call_expr.children = [
+                    Tree('primary_expression', [
+                        Tree('entity', [
+                            Tree('path', [call_expr.path.children[0]])
+                        ])
+                    ]),
+                    Tree('mutation_fragment', [
+                        path_fragments[-1].children[0],
+                        *call_expr.children[1:]
+                    ])
+                ]
+                call_expr.data = 'mutation'
 
-    def visit_as_expr(self, node, block):
+    @classmethod
+    def visit_function_dot(cls, node):
         """
-        Visit assignments and move 'as' up the tree if required
+        Lowers all function calls with more than one path name of a tree.
         """
         if not hasattr(node, 'children') or len(node.children) == 0:
             return
 
-        if node.data == 'foreach_block':
-            block = node.foreach_statement
-            assert block is not None
-        elif node.data == 'service_block' or node.data == 'when_block':
-            block = node.service.service_fragment
-            block = node.service.service_fragment
-            assert block is not None
-
-        if node.data == 'pow_expression':
-            as_op = node.as_operator
-            if as_op is not None and as_op.output_names is not None:
-                output = Tree('output', as_op.output_names.children)
-                node.expect(block is not None, 'service_no_inline_output')
-                block.children.append(output)
-                node.children = [node.children[0]]
+        if node.data == 'call_expression':
+            cls.lower_function_dot(node)
 
         for c in node.children:
-            self.visit_as_expr(c, block)
+            if not isinstance(c, Token):
+                yield cls.visit_function_dot(c)
 
-    def visit_function_dot(self, node, block):
+    def visit_rewrites(self, node, block, output_block, parent):
         """
-        Visit function call with more than one path anme and lower
-        them into mutations.
+        Applies the rewrites which only change their own subtree in a single
+        walk: comparisons and `as` outputs before their children, argument
+        shorthands and assignments after them.
+        `output_block` is the block `as` outputs are moved to.
         """
         if not hasattr(node, 'children') or len(node.children) == 0:
             return
 
-        if node.data == 'call_expression':
-            call_expr = node
-            if len(call_expr.path.children) > 1:
-                path_fragments = call_expr.path.children
-                if len(path_fragments) == 2:
-                    # don't rewrite s.length.max() yet
-                    call_expr.children = [
-                        Tree('primary_expression', [
-                            Tree('entity', [
-                                Tree('path', [call_expr.path.children[0]])
-                            ])
-                        ]),
-                        Tree('mutation_fragment', [
-                            path_fragments[-1].children[0],
-                            *call_expr.children[1:]
-                        ])
-                    ]
-                    call_expr.data = 'mutation'
+        data = node.data
+        if data == 'block':
+            block = node
+        elif data == 'cmp_expression':
+            self.lower_cmp_expr(node)
+        elif data == 'pow_expression':
+            self.lower_as_expr(node, output_block)
+        elif data == 'foreach_block':
+            output_block = node.foreach_statement
+            assert output_block is not None
+        elif data == 'service_block' or data == 'when_block':
+            output_block = node.service.service_fragment
+            assert output_block is not None
 
         for c in node.children:
-            self.visit_function_dot(c, block)
+            if not isinstance(c, Token):
+                yield self.visit_rewrites(c, block, output_block,
+                                          parent=node)
+
+        if data == 'arguments':
+            Transformer.argument_shorthand(node)
+        elif data == 'assignment':
+            self.lower_assignment(node, block, parent)
 
     def process(self, tree):
         """
         Applies several preprocessing steps to the existing AST.
+        String templates and inline expressions insert fake lines which are
+        numbered in the order of their statements, hence they are lowered in
+        their own walks. The walks are run on an explicit stack.
         """
         pred = Lowering.is_inline_expression
+        run = StackVisitor.run
         self.visit_concise_when(tree)
-        self.visit_cmp_expr(tree)
-        self.visit_as_expr(tree, block=None)
-        self.visit_arguments(tree)
-        self.visit_assignment(tree, block=None, parent=None)
-        self.visit_string_templates(tree, block=None, parent=None,
-                                    cmp_expr=None)
-        self.visit_function_dot(tree, block=None)
-        self.visit(tree, None, None, pred,
-                   self.replace_expression, parent=None)
+        run(self.visit_rewrites(tree, block=None, output_block=None,
+                                parent=None))
+        run(self.visit_string_templates(tree, block=None, parent=None,
+                                        cmp_expr=None))
+        run(self.visit(tree, None, None, pred,
+                       self.replace_expression, parent=None))
         return tree
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from collections import OrderedDict
+
+
+class TemplateCache:
+    """
+    Keeps the parsed code of string templates, s.t. identical templates of a
+    bundle are only parsed once. The least recently used templates are
+    dropped once more than `max_entries` are kept.
+    """
+    max_entries = 1024
+
+    def __init__(self, max_entries=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        self.templates = OrderedDict()
+
+    def load(self, key):
+        """
+        Returns the parsed template of a key, or None if it isn't cached.
+        """
+        tree = self.templates.get(key, None)
+        if tree is not None:
+            self.templates.move_to_end(key)
+        return tree
+
+    def save(self, key, tree):
+        """
+        Keeps a parsed template and drops the least recently used one if
+        there are too many.
+        """
+        self.templates[key] = tree
+        self.templates.move_to_end(key)
+        if len(self.templates) > self.max_entries:
+            self.templates.popitem(last=False)
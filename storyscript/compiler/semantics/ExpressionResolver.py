@@ -181,7 +181,7 @@ class SymbolExpressionVisitor(ExpressionVisitor):
                     element = Tree('arith_expression', [element])
                 if element.data == 'arith_expression':
                     element = Tree('cmp_expression', [element])
-                tree.children[i] = Tree('unary_expression', [
+                tree.replace(i, Tree('unary_expression', [
                     Tree('pow_expression', [
                         Tree('primary_expression', [
                             Tree('or_expression', [
@@ -196,18 +196,18 @@ class SymbolExpressionVisitor(ExpressionVisitor):
                             ])
                         ])
                     ])
-                ])
+                ]))
                 for e in ['mul_expression', 'arith_expression']:
                     if e == insert_tree_name:
                         break
                     else:
-                        tree.children[i] = Tree(e, [
+                        tree.replace(i, Tree(e, [
                             tree.children[i]
-                        ])
+                        ]))
                 if i == 0:
-                    tree.children[0] = Tree(insert_tree_name, [
+                    tree.replace(0, Tree(insert_tree_name, [
                         tree.children[0]
-                    ])
+                    ]))
 
 
 class ExpressionResolver:
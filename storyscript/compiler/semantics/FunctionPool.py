@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import gc
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from storyscript.Features import Features
+from storyscript.exceptions import CompilerError
+from storyscript.parser import Tree, TreePickler
+
+from .TypeResolver import TypeResolver
+
+
+# the tables of the story whose functions are checked by this worker
+_worker_tables = None
+
+
+def _init_worker(payload):
+    global _worker_tables
+    # forked workers inherit the heap of the compiler, which the garbage
+    # collector would otherwise scan again and again
+    if hasattr(gc, 'freeze'):  # Python 3.7+
+        gc.freeze()
+    _worker_tables = pickle.loads(payload)
+
+
+def outline(tree):
+    """
+    Returns a comparable outline of a tree with its rules and tokens.
+    """
+    children = []
+    for c in tree.children:
+        if isinstance(c, Tree):
+            children.append(outline(c))
+        else:
+            children.append((c.type, str(c), c.value))
+    return tree.data, tuple(children)
+
+
+def check_function(payload):
+    """
+    Type checks a pickled function block in a worker process.
+    The TypeResolver rewrites some expressions, hence the statements of the
+    function body which have been changed are returned. Returns the pickled
+    changed statements by their index and the scope of the function or the
+    compiler error.
+    """
+    tree = pickle.loads(payload)
+    function_table, mutation_table, features = _worker_tables
+    statements = tree.nested_block.children
+    outlines = [outline(statement) for statement in statements]
+    resolver = TypeResolver(function_table=function_table,
+                            mutation_table=mutation_table,
+                            features=Features(features))
+    resolver.update_scope(None)
+    try:
+        resolver.run(tree)
+    except CompilerError as e:
+        return TreePickler.dumps((None, None, e))
+    statements = tree.nested_block.children
+    assert len(statements) == len(outlines)
+    changed = {}
+    for i, statement in enumerate(statements):
+        if outline(statement) != outlines[i]:
+            changed[i] = statement
+    return TreePickler.dumps((changed, tree.scope, None))
+
+
+class FunctionPool:
+    """
+    Type checks the bodies of functions in a pool of processes.
+    Every function has its own root scope, hence its body only depends on
+    the function and mutation tables. The TypeResolver waits for a function
+    when it reaches it and puts the checked body back into the tree, s.t.
+    errors are raised in the same order as by a serial check.
+    """
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.executor = None
+        self.checks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def function_blocks(tree):
+        """
+        Returns all function blocks of a story.
+        """
+        blocks = []
+        for c in tree.children:
+            if isinstance(c, Tree) and c.function_block is not None:
+                blocks.append(c.function_block)
+        return blocks
+
+    def submit(self, tree, function_table, mutation_table, features):
+        """
+        Starts checking all function blocks of the story `tree`.
+        """
+        tables = TreePickler.dumps((function_table, mutation_table,
+                                    features.features))
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs,
+                                            initializer=_init_worker,
+                                            initargs=(tables,))
+        for block in self.function_blocks(tree):
+            try:
+                payload = TreePickler.dumps(block)
+            except RecursionError:
+                # too deeply nested to be pickled, checked in this process
+                continue
+            self.checks[id(block)] = self.executor.submit(check_function,
+                                                          payload)
+
+    def check(self, tree):
+        """
+        Waits for the check of the function block `tree` and puts the
+        changed statements into its body and its scope into the block.
+        Raises the error of the check. Returns False if the block isn't
+        checked by the pool.
+        """
+        check = self.checks.pop(id(tree), None)
+        if check is None:
+            return False
+        try:
+            result = check.result()
+        except RecursionError:
+            # too deeply nested for the worker, checked in this process
+            return False
+        changed, scope, error = pickle.loads(result)
+        if error is not None:
+            raise error
+        for i, statement in changed.items():
+            tree.nested_block.replace(i, statement)
+        tree.scope = scope
+        return True
+
+    def close(self):
+        """
+        Shuts the workers down, dropping all pending checks.
+        """
+        # checks which haven't started yet are cancelled by hand, as
+        # shutdown only cancels them since Python 3.9
+        for check in self.checks.values():
+            check.cancel()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.checks = {}
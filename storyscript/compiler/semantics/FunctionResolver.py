@@ -22,7 +22,7 @@ class FunctionResolver(ScopeSelectiveVisitor):
         )
 
     def block(self, tree, scope):
-        self.visit_children(tree, scope)
+        yield self.visit_children(tree, scope)
 
     def function_block(self, tree, scope):
         tree.scope, return_type = self.function_statement(
@@ -55,4 +55,4 @@ class FunctionResolver(ScopeSelectiveVisitor):
         return scope, return_type
 
     def start(self, tree, scope=None):
-        self.visit_children(tree, scope=tree.scope)
+        yield self.visit_children(tree, scope=tree.scope)
@@ -2,6 +2,7 @@
 
 from storyscript.compiler.semantics.symbols.Symbols import base_symbol
 from storyscript.compiler.semantics.types.Types import NoneType
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
 from storyscript.exceptions import CompilerError
 
 from .ExpressionResolver import ExpressionResolver
@@ -22,6 +23,12 @@ class ReturnVisitor:
         )
 
     def has_return(self, tree):
+        """
+        Checks whether every path through `tree` returns.
+        """
+        return StackVisitor.run(self.visit_return(tree))
+
+    def visit_return(self, tree):
         if tree.rules and tree.rules.return_statement:
             return True
 
@@ -33,7 +40,7 @@ class ReturnVisitor:
             # an if requires an else and all statements to have a return
             if tree.if_block.else_block:
                 for block in tree.if_block.children[1:]:
-                    if not self.has_return(block):
+                    if not (yield self.visit_return(block)):
                         return False
                 return True
             return False
@@ -41,7 +48,7 @@ class ReturnVisitor:
         nested_block = tree.nested_block or tree.child(0).nested_block
         if nested_block:
             for block in nested_block.children:
-                if self.has_return(block):
+                if (yield self.visit_return(block)):
                     return True
         return False
 
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from .FunctionPool import FunctionPool
 from .FunctionResolver import FunctionResolver
 from .TypeResolver import TypeResolver
 from .functions.FunctionTable import FunctionTable
@@ -14,14 +15,24 @@ class Semantics:
     def __init__(self, features):
         self.features = features
 
-    visitors = [FunctionResolver, TypeResolver]
+    def visitor(self, visitor):
+        return visitor(function_table=self.function_table,
+                       mutation_table=self.mutation_table,
+                       features=self.features)
 
     def process(self, tree):
         self.function_table = FunctionTable()
-        self.mutation_table = MutationTable.init()
-        for visitor in self.visitors:
-            v = visitor(function_table=self.function_table,
-                        mutation_table=self.mutation_table,
-                        features=self.features)
-            v.visit(tree)
+        self.mutation_table = MutationTable.init(self.features.hub)
+        self.visitor(FunctionResolver).run(tree)
+        type_resolver = self.visitor(TypeResolver)
+        jobs = self.features.processes()
+        if jobs > 1 and len(FunctionPool.function_blocks(tree)) > 1:
+            # function bodies are checked in parallel
+            with FunctionPool(jobs) as function_pool:
+                function_pool.submit(tree, self.function_table,
+                                     self.mutation_table, self.features)
+                type_resolver.function_pool = function_pool
+                type_resolver.run(tree)
+        else:
+            type_resolver.run(tree)
         return tree
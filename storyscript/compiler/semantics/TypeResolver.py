@@ -54,6 +54,7 @@ class TypeResolver(ScopeSelectiveVisitor):
         self.path_resolver = PathResolver(self.path_symbol_resolver)
         self.in_service_block = False
         self.in_when_block = False
+        self.function_pool = None
         if self.features.globals:
             self.storage_class_scope = StorageClass.write
         else:
@@ -91,16 +92,16 @@ class TypeResolver(ScopeSelectiveVisitor):
                         target=target_symbol._type,
                         source=expr_type)
 
-        self.visit_children(tree, scope)
+        yield self.visit_children(tree, scope)
 
     def rules(self, tree, scope):
-        self.visit_children(tree, scope)
+        yield self.visit_children(tree, scope)
 
     def block(self, tree, scope):
-        self.visit_children(tree, scope)
+        yield self.visit_children(tree, scope)
 
     def nested_block(self, tree, scope):
-        self.visit_children(tree, scope)
+        yield self.visit_children(tree, scope)
 
     def mutation_block(self, tree, scope):
         # resolve to perform checks
@@ -124,7 +125,7 @@ class TypeResolver(ScopeSelectiveVisitor):
             else:
                 command = tree.service.path.child(0)
             output = Tree('output', [command])
-            fragment.children.append(output)
+            fragment.append(output)
 
     def foreach_block(self, tree, scope):
         """
@@ -152,13 +153,13 @@ class TypeResolver(ScopeSelectiveVisitor):
                 tree.scope.insert(sym)
 
             for c in tree.nested_block.children:
-                self.visit_children(c, scope=tree.scope)
+                yield self.visit_children(c, scope=tree.scope)
 
     def while_block(self, tree, scope):
         self.while_statement(tree.while_statement, scope)
         tree.scope = Scope(parent=scope)
         with self.create_scope(tree.scope):
-            self.visit_children(tree.nested_block, scope=tree.scope)
+            yield self.visit_children(tree.nested_block, scope=tree.scope)
 
     def while_statement(self, tree, scope):
         """
@@ -186,7 +187,7 @@ class TypeResolver(ScopeSelectiveVisitor):
             tree.expect(not self.in_when_block, 'nested_when_block')
             self.in_when_block = True
             for c in tree.nested_block.children:
-                self.visit_children(c, scope=tree.scope)
+                yield self.visit_children(c, scope=tree.scope)
             self.in_when_block = False
 
     def service_block(self, tree, scope):
@@ -222,7 +223,7 @@ class TypeResolver(ScopeSelectiveVisitor):
                 tree.expect(not self.in_service_block, 'nested_service_block')
                 self.in_service_block = True
                 for c in tree.nested_block.children:
-                    self.visit_children(c, scope=tree.scope)
+                    yield self.visit_children(c, scope=tree.scope)
                 self.in_service_block = False
 
     def concise_when_block(self, tree, scope):
@@ -233,10 +234,10 @@ class TypeResolver(ScopeSelectiveVisitor):
         with self.create_scope(tree.scope):
             self.if_statement(tree.if_statement, tree.scope)
 
-            self.visit_children(tree.nested_block, scope=tree.scope)
+            yield self.visit_children(tree.nested_block, scope=tree.scope)
 
             for c in tree.children[2:]:
-                self.visit(c, tree.scope)
+                yield self.visit(c, tree.scope)
 
     def if_statement(self, tree, scope):
         """
@@ -249,33 +250,36 @@ class TypeResolver(ScopeSelectiveVisitor):
         Else if blocks don't create a new scope.
         """
         self.resolver.base_expression(tree.elseif_statement.base_expression)
-        self.visit_children(tree.nested_block, scope=scope)
+        yield self.visit_children(tree.nested_block, scope=scope)
 
     def else_block(self, tree, scope):
         """
         Else blocks don't create a new scope.
         """
-        self.visit_children(tree.nested_block, scope=scope)
+        yield self.visit_children(tree.nested_block, scope=scope)
 
     def try_block(self, tree, scope):
         tree.scope = Scope(parent=scope)
         with self.create_scope(tree.scope):
-            self.visit_children(tree.nested_block, scope=tree.scope)
+            yield self.visit_children(tree.nested_block, scope=tree.scope)
             for c in tree.children[2:]:
-                self.visit(c, tree.scope)
+                yield self.visit(c, tree.scope)
 
     def catch_block(self, tree, scope):
-        self.visit_children(tree, scope=scope)
+        yield self.visit_children(tree, scope=scope)
 
     def finally_block(self, tree, scope):
-        self.visit_children(tree, scope=scope)
+        yield self.visit_children(tree, scope=scope)
 
     def function_block(self, tree, scope):
+        if self.function_pool is not None and self.function_pool.check(tree):
+            # the pool has put the checked body and its scope into the tree
+            return
         tree.scope, return_type = self.function_statement(
             tree.function_statement, scope
         )
         with self.create_scope(tree.scope, storage_class=StorageClass.write):
-            self.visit_children(tree.nested_block, scope=tree.scope)
+            yield self.visit_children(tree.nested_block, scope=tree.scope)
             ReturnVisitor.check(tree, tree.scope, return_type,
                                 self.function_table, self.mutation_table)
 
@@ -306,4 +310,4 @@ class TypeResolver(ScopeSelectiveVisitor):
         # create the root scope
         tree.scope = Scope.root()
         self.update_scope(tree.scope)
-        self.visit_children(tree, scope=tree.scope)
+        yield self.visit_children(tree, scope=tree.scope)
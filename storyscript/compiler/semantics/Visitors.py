@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
 from storyscript.parser import Tree
 
 
@@ -14,7 +15,12 @@ class SelectiveVisitor(BaseVisitor):
     """
     A selective visitor which only visits defined nodes.
     visit_children must be called explicitly.
+    Visits are run on an explicit stack: visit methods yield the visits of
+    their children, and run starts a visit.
     """
+    def run(self, tree):
+        return StackVisitor.run(self.visit(tree))
+
     def visit(self, tree):
         if hasattr(self, tree.data):
             return getattr(self, tree.data)(tree)
@@ -22,14 +28,19 @@ class SelectiveVisitor(BaseVisitor):
     def visit_children(self, tree):
         for c in tree.children:
             if isinstance(c, Tree):
-                self.visit(c)
+                yield self.visit(c)
 
 
 class ScopeSelectiveVisitor(BaseVisitor):
     """
     A selective visitor which only visits defined nodes.
     visit_children must be called explicitly.
+    Visits are run on an explicit stack: visit methods yield the visits of
+    their children, and run starts a visit.
     """
+    def run(self, tree, scope=None):
+        return StackVisitor.run(self.visit(tree, scope))
+
     def visit(self, tree, scope=None):
         if hasattr(self, tree.data):
             return getattr(self, tree.data)(tree, scope)
@@ -37,4 +48,4 @@ class ScopeSelectiveVisitor(BaseVisitor):
     def visit_children(self, tree, scope):
         for c in tree.children:
             if isinstance(c, Tree):
-                self.visit(c, scope)
+                yield self.visit(c, scope)
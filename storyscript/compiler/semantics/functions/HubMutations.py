@@ -1,3 +1,7 @@
+import importlib
+import io
+
+from storyscript.compiler.semantics.functions.HubSpec import HubSpec
 from storyscript.compiler.semantics.functions.MutationBuilder import \
     mutation_builder
 
@@ -74,18 +78,77 @@ class Hub:
     A representation of a Storyscript Engine and Hub.
     Assumed to be Asyncy Engine for now.
     """
-    def __init__(self):
-        self._mutations = []
-        for m in mutations.split('\n'):
-            if len(m.strip()) == 0 or m.startswith('#'):
-                continue
-            self._mutations.append(mutation_builder(m))
+    # generated at build time by HubSpec.write
+    spec_module = 'storyscript.compiler.semantics.functions.hub_spec'
+
+    def __init__(self, source=mutations, spec=None):
+        self._source = source
+        self._spec = spec
+        self._mutations = None
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads a hub from a mutation specification or a specification file
+        compiled with `compile`.
+        """
+        with io.open(path, 'rb') as f:
+            data = f.read()
+        spec = HubSpec.loads(data)
+        if spec is not None:
+            return cls(source=None, spec=spec)
+        return cls(source=data.decode('utf8'))
+
+    def source(self):
+        """
+        Returns the mutation specification of this hub.
+        """
+        return self._source
+
+    def precompiled(self):
+        """
+        Returns the encoded mutations of this hub if they have been compiled
+        before, otherwise `None`.
+        """
+        if self._spec is not None:
+            return self._spec
+        try:
+            module = importlib.import_module(self.spec_module)
+        except ImportError:
+            return None
+        if module.FINGERPRINT != HubSpec.fingerprint(self._source):
+            return None
+        return module.MUTATIONS
+
+    def parse(self):
+        """
+        Parses the mutation specification of this hub.
+        """
+        return [
+            mutation_builder(m) for m in self._source.split('\n')
+            if len(m.strip()) > 0 and not m.startswith('#')
+        ]
 
     def mutations(self):
         """
         Return all mutations supported by this hub.
+        The mutations are only loaded on first use and the specification is
+        only parsed if it hasn't been compiled.
         """
+        if self._mutations is None:
+            spec = self.precompiled()
+            if spec is None:
+                self._mutations = self.parse()
+            else:
+                self._mutations = HubSpec.decode(spec)
         return self._mutations
 
+    def compile(self):
+        """
+        Compiles the mutations of this hub into a specification file, which
+        can be loaded with `from_file`.
+        """
+        return HubSpec.dumps(self.mutations())
+
 
 hub = Hub()
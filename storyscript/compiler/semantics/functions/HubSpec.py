@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import marshal
+from pprint import pformat
+
+from storyscript.compiler.semantics.functions.Mutation import Mutation
+from storyscript.compiler.semantics.types import Types
+from storyscript.compiler.semantics.types.GenericTypes import \
+    GenericType, ListGenericType, MapGenericType, TypeSymbol
+from storyscript.compiler.semantics.types.Types import BaseType
+
+
+class HubSpec:
+    """
+    Converts the mutations of a hub to nested tuples of constants, s.t.
+    they can be loaded without parsing the mutation specification.
+    The mutations of the default hub are written to a generated module at
+    build time, other hubs are stored in compiled specification files.
+    """
+    # bumped whenever the encoding of the mutations changes
+    version = 1
+    # marks compiled specification files
+    magic = b'storyscript-hub\n'
+    header = ('# -*- coding: utf-8 -*-\n'
+              '# Generated by storyscript.compiler.semantics.functions.'
+              'HubSpec. Do not edit.\n')
+    generics = {
+        'List': ListGenericType,
+        'Map': MapGenericType,
+    }
+
+    @classmethod
+    def fingerprint(cls, source):
+        """
+        Identifies a mutation specification and the encoding it was
+        compiled with.
+        """
+        key = '\n'.join([str(cls.version), source])
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
+
+    @classmethod
+    def encode_type(cls, t):
+        """
+        Converts a type to ('type', name), ('symbol', name) or
+        (generic name, symbols).
+        """
+        if isinstance(t, BaseType):
+            return 'type', type(t).__name__
+        if isinstance(t, TypeSymbol):
+            return 'symbol', t.name()
+        assert isinstance(t, GenericType)
+        return t.base_type_name(), tuple(cls.encode_type(s)
+                                         for s in t.symbols)
+
+    @classmethod
+    def decode_type(cls, t):
+        """
+        Restores a type converted by encode_type.
+        """
+        kind, value = t
+        if kind == 'type':
+            return getattr(Types, value).instance()
+        if kind == 'symbol':
+            return TypeSymbol(value)
+        return cls.generics[kind]([cls.decode_type(s) for s in value])
+
+    @classmethod
+    def encode(cls, mutations):
+        """
+        Converts mutations to (type, name, ((arg, type), ...), output)
+        Equal types share their tuples, which marshal only stores once.
+        """
+        types = {}
+
+        def encode_type(t):
+            t = cls.encode_type(t)
+            return types.setdefault(t, t)
+
+        return tuple((encode_type(m.type()), m.name(),
+                      tuple((name, encode_type(t))
+                            for name, t in m.args().items()),
+                      encode_type(m.output()))
+                     for m in mutations)
+
+    @classmethod
+    def decode(cls, spec):
+        """
+        Restores the mutations converted by encode.
+        Types are immutable, hence equal types are only decoded once.
+        """
+        types = {}
+
+        def decode_type(t):
+            decoded = types.get(t, None)
+            if decoded is None:
+                decoded = cls.decode_type(t)
+                types[t] = decoded
+            return decoded
+
+        return [Mutation(ti=decode_type(ti), name=name,
+                         args={arg: decode_type(t) for arg, t in args},
+                         output=decode_type(output))
+                for ti, name, args, output in spec]
+
+    @classmethod
+    def dumps(cls, mutations):
+        """
+        Compiles mutations into the bytes of a specification file.
+        """
+        return cls.magic + marshal.dumps((cls.version, cls.encode(mutations)))
+
+    @classmethod
+    def loads(cls, data):
+        """
+        Returns the encoded mutations of a compiled specification file or
+        `None` if `data` isn't compiled. Raises a ValueError for invalid
+        files and files compiled by another version.
+        """
+        if not data.startswith(cls.magic):
+            return None
+        try:
+            version, spec = marshal.loads(data[len(cls.magic):])
+        except (EOFError, TypeError, ValueError):
+            raise ValueError('invalid hub specification file')
+        if version != cls.version:
+            raise ValueError('the hub specification was compiled by '
+                             f'another version ({version})')
+        return spec
+
+    @staticmethod
+    def assign(name, value):
+        return f'{name} = {pformat(value)}\n'
+
+    @classmethod
+    def generate(cls, source, mutations):
+        """
+        Generates the source code of a module with the encoded mutations of
+        the specification `source`.
+        """
+        return ''.join([
+            cls.header,
+            cls.assign('FINGERPRINT', cls.fingerprint(source)),
+            cls.assign('MUTATIONS', cls.encode(mutations)),
+        ])
+
+    @classmethod
+    def write(cls, path, hub):
+        """
+        Writes the module of the mutations of `hub` to path
+        """
+        with io.open(path, 'w', encoding='utf8') as f:
+            f.write(cls.generate(hub.source(), hub.parse()))
@@ -17,11 +17,26 @@ class Mutation:
         self._base_type = base_type(ti)
         self._arg_names = self.compute_arg_names_hash(args.keys())
         self._cmp_name = name + ','.join(sorted(args.keys()))
+        self._instances = {}
 
     def instantiate(self, type_):
         """
         Instantiate a mutation and resolve all symbols with their actual types.
-        Returns an instantiated function.
+        Returns an instantiated function, which is shared by all
+        instantiations with an equal type.
+        """
+        # types are interned, hence equal types are the same key. A
+        # non-generic mutation has only one instantiation.
+        key = type_ if isinstance(self._ti, GenericType) else None
+        fn = self._instances.get(key, None)
+        if fn is None:
+            fn = self._instantiate(type_)
+            self._instances[key] = fn
+        return fn
+
+    def _instantiate(self, type_):
+        """
+        Builds a new instantiation of this mutation for `type_`.
         """
         # resolve all input symbols
         if not isinstance(self._ti, GenericType):
@@ -49,6 +64,18 @@ class Mutation:
         """
         return self._ti
 
+    def args(self):
+        """
+        The arguments of this mutation with their types.
+        """
+        return self._args
+
+    def output(self):
+        """
+        The output type of this mutation.
+        """
+        return self._output
+
     def base_type(self):
         """
         The base type that this mutation can mutation, e.g. IntType or ListType
@@ -1,6 +1,8 @@
+import os
+import threading
 from itertools import chain
 
-from storyscript.compiler.semantics.functions.HubMutations import hub
+from storyscript.compiler.semantics.functions.HubMutations import Hub, hub
 from storyscript.compiler.semantics.functions.Mutation import Mutation
 from storyscript.compiler.semantics.types.Types import AnyType
 
@@ -8,12 +10,16 @@ from storyscript.compiler.semantics.types.Types import AnyType
 class MutationOverloads:
     """
     Contains all overloads for a mutation of a specific name and type.
+    Resolved overloads are shared between lookups and must not be changed.
     """
 
-    def __init__(self, name, type_):
-        self._obj = {}
+    def __init__(self, name, type_, obj=None):
+        if obj is None:
+            obj = {}
+        self._obj = obj
         self._name = name
         self._type = type_
+        self._all = None
 
     def add_overloads(self, overloads):
         for name, overload in overloads.items():
@@ -23,13 +29,25 @@ class MutationOverloads:
         if name not in self._obj:
             self._obj[name] = []
         self._obj[name].append(overload)
+        self._all = None
 
     def all(self):
         """
-        Builds a sorted list of all available overloads.
+        Builds a sorted tuple of all available overloads.
         """
-        overloads = chain.from_iterable(self._obj.values())
-        return list(sorted(overloads, key=lambda m: m.cmp_name()))
+        if self._all is None:
+            overloads = chain.from_iterable(self._obj.values())
+            self._all = tuple(sorted(overloads, key=lambda m: m.cmp_name()))
+        return self._all
+
+    def for_type(self, type_):
+        """
+        Returns these overloads for the concrete type `type_`. The overloads
+        themselves are shared.
+        """
+        mo = MutationOverloads(self._name, type_, self._obj)
+        mo._all = self.all()
+        return mo
 
     def single(self):
         """
@@ -74,29 +92,71 @@ class MutationOverloads:
 class MutationTable:
     """
     A table of all available mutation inside a story.
+    The mutations of a Hub are built once into a frozen table, which is
+    shared between all stories. A story only gets an overlay table on top of
+    it, which holds its own mutations.
     """
-    def __init__(self):
+    # frozen tables of the hubs by the path of their specification
+    _hub_tables = {}
+    _hub_lock = threading.Lock()
+
+    def __init__(self, parent=None, hub_path=None, hub_stat=None):
         self.mutations = {}
+        self.parent = parent
+        self.hub_path = hub_path
+        # the modification time and size of the specification the table has
+        # been built from
+        self.hub_stat = hub_stat
+        self.frozen = False
+        self.resolved = {}
+
+    def __reduce__(self):
+        # hub tables are shared, hence only referenced
+        if MutationTable._hub_tables.get(self.hub_path) is self:
+            return MutationTable.hub_table, (self.hub_path,)
+        return type(self), (self.parent,), {
+            'mutations': self.mutations,
+            'frozen': self.frozen,
+        }
+
+    def freeze(self):
+        """
+        Forbids further insertions into this table.
+        """
+        self.frozen = True
+        return self
+
+    def _lookup(self, name):
+        """
+        Yields the mutations named `name` of this table and its parents,
+        starting with the outermost table.
+        """
+        if self.parent is not None:
+            yield from self.parent._lookup(name)
+        muts = self.mutations.get(name, None)
+        if muts is not None:
+            yield muts
 
     def insert(self, mutation):
         """
         Insert a new mutation into the mutation table.
         """
         assert isinstance(mutation, Mutation)
+        assert not self.frozen, 'mutation table is frozen'
         name = mutation.name()
-        if mutation.name() not in self.mutations:
-            self.mutations[name] = {}
-        muts = self.mutations[name]
         t = self.type_key(mutation.base_type())
         arg_names = mutation.arg_names_hash()
-        match = muts.get(t, None)
-        if match is not None:
-            assert arg_names not in match, \
+        for muts in self._lookup(name):
+            assert arg_names not in muts.get(t, ()), \
                     (f'mutation {name} for {t} already exists with the '
                      'same overload')
-        else:
+        if name not in self.mutations:
+            self.mutations[name] = {}
+        muts = self.mutations[name]
+        if t not in muts:
             muts[t] = {}
         muts[t][arg_names] = mutation
+        self.resolved.clear()
 
     @staticmethod
     def type_key(type_):
@@ -105,41 +165,93 @@ class MutationTable:
         """
         return type_.__name__
 
-    def _resolve_any(self, muts, name):
+    def _resolve_any(self, tables, name):
         """
         Searches for all potential type overloads on mutation.
         """
         mo = MutationOverloads(name, AnyType.instance())
-        for overloads in muts.values():
-            mo.add_overloads(overloads)
+        for muts in tables:
+            for overloads in muts.values():
+                mo.add_overloads(overloads)
         return mo
 
     def resolve(self, type_, name):
         """
         Returns the mutation `name` or `None`.
+        Lookups are cached per type and name.
         """
-        muts = self.mutations.get(name, None)
-        if muts is None:
-            return None
+        if self.parent is not None and name not in self.mutations:
+            return self.parent.resolve(type_, name)
 
         if type_ == AnyType.instance():
-            return self._resolve_any(muts, name)
+            key = (None, name)
+        else:
+            key = (self.type_key(type(type_)), name)
+        try:
+            mo = self.resolved[key]
+        except KeyError:
+            mo = self._resolve(key[0], name)
+            self.resolved[key] = mo
+        if mo is None:
+            return None
+        return mo.for_type(type_)
 
-        t = self.type_key(type(type_))
-        overloads = muts.get(t, None)
-        if overloads is None:
+    def _resolve(self, t, name):
+        """
+        Collects the overloads of the mutation `name` for the type key `t`.
+        A type key of `None` collects the overloads of all types.
+        """
+        tables = list(self._lookup(name))
+        if len(tables) == 0:
             return None
 
-        mo = MutationOverloads(name, type_)
-        mo.add_overloads(overloads)
+        if t is None:
+            return self._resolve_any(tables, name)
+
+        mo = None
+        for muts in tables:
+            overloads = muts.get(t, None)
+            if overloads is not None:
+                if mo is None:
+                    mo = MutationOverloads(name, None)
+                mo.add_overloads(overloads)
         return mo
 
+    @staticmethod
+    def hub_stat(path):
+        """
+        Returns the modification time and size of the hub specification at
+        `path`, which is None for the Hub.
+        """
+        if path is None:
+            return None
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @classmethod
+    def hub_table(cls, path=None):
+        """
+        Returns the frozen table of all mutations of the Hub or of the hub
+        specification at `path`. It is built on first use and built again
+        once the specification changes.
+        """
+        stat = cls.hub_stat(path)
+        table = cls._hub_tables.get(path, None)
+        if table is None or table.hub_stat != stat:
+            with cls._hub_lock:
+                table = cls._hub_tables.get(path, None)
+                if table is None or table.hub_stat != stat:
+                    table = cls(hub_path=path, hub_stat=stat)
+                    source = hub if path is None else Hub.from_file(path)
+                    for m in source.mutations():
+                        table.insert(m)
+                    cls._hub_tables[path] = table.freeze()
+        return table
+
     @classmethod
-    def init(cls):
+    def init(cls, path=None):
         """
-        Builds a list of all mutations of the Hub.
+        Creates a mutation table for a story on top of the mutations of the
+        Hub or of the hub specification at `path`.
         """
-        mi = cls()
-        for m in hub.mutations():
-            mi.insert(m)
-        return mi
+        return cls(parent=cls.hub_table(path))
@@ -7,21 +7,48 @@ from .Symbols import StorageClass, Symbol, Symbols
 
 class Scope:
     """
-    Manages an individual scope
+    Manages an individual scope.
+    A scope and all its descendants share the versions of their symbol
+    names, which are bumped on every insertion of a name. Resolutions are
+    cached per scope and stay valid while the version of their name is
+    unchanged, hence a lookup only walks up to the nearest scope which
+    defines or has already resolved the name.
     """
 
     def __init__(self, parent=None):
         self._parent = parent
-        self._symbols = Symbols()
+        if parent is None:
+            self._versions = {}
+        else:
+            self._versions = parent._versions
+        self._symbols = Symbols(self._versions)
+        self._resolved = {}
 
     def insert(self, sym):
         self._symbols.insert(sym)
 
     def resolve(self, path):
-        for scope in self.scopes():
-            p = scope._symbols.resolve(path)
-            if p:
-                return p
+        assert len(path) > 0
+        version = self._versions.get(path, None)
+        if version is None:
+            # the name has never been inserted
+            return None
+        cached = self._resolved.get(path, None)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        symbol = None
+        scope = self
+        while scope is not None:
+            symbol = scope._symbols.resolve(path)
+            if symbol is not None:
+                break
+            cached = scope._resolved.get(path, None)
+            if cached is not None and cached[0] == version:
+                symbol = cached[1]
+                break
+            scope = scope._parent
+        self._resolved[path] = (version, symbol)
+        return symbol
 
     def symbols(self):
         """
@@ -39,9 +66,10 @@ class Scope:
         """
         Iterator over this and all its parent scopes
         """
-        yield self
-        if self._parent is not None:
-            yield from self._parent.scopes()
+        scope = self
+        while scope is not None:
+            yield scope
+            scope = scope._parent
 
     def pretty(self):
         indent = '\t'
@@ -75,8 +75,11 @@ class Symbols:
     Represents all symbols in a scope
     """
 
-    def __init__(self):
+    def __init__(self, versions=None):
         self._symbols = {}
+        if versions is None:
+            versions = {}
+        self._versions = versions
 
     def resolve(self, name):
         assert len(name) > 0
@@ -84,7 +87,10 @@ class Symbols:
             return self._symbols[name]
 
     def insert(self, symbol):
-        self._symbols[symbol.name()] = symbol
+        name = symbol.name()
+        self._symbols[name] = symbol
+        # invalidates all cached resolutions of this name
+        self._versions[name] = self._versions.get(name, 0) + 1
 
     def pretty(self, indent=''):
         result = ''
@@ -1,5 +1,25 @@
 # -*- coding: utf-8 -*-
 
+# canonical instances of all types, keyed by their class and fields
+_interned = {}
+
+
+def interned(cls, *fields):
+    """
+    Returns the canonical instance of the type `cls` with `fields`.
+    Types are interned, hence equal types are identical and are compared and
+    hashed by identity. The fields are assigned to the slots of `cls` in
+    order.
+    """
+    key = (cls, *fields)
+    t = _interned.get(key, None)
+    if t is None:
+        t = object.__new__(cls)
+        for name, field in zip(cls.__slots__, fields):
+            object.__setattr__(t, name, field)
+        t = _interned.setdefault(key, t)
+    return t
+
 
 def singleton(fn):
     """
@@ -76,7 +96,21 @@ def implicit_cast(t1, t2):
 class BaseType:
     """
     Base class of a type.
+    Types are immutable and interned: constructing a type returns its
+    canonical instance.
     """
+    __slots__ = ()
+
+    def __new__(cls):
+        return interned(cls)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        # copies and unpickled types are interned again
+        return type(self), tuple(getattr(self, name)
+                                 for name in self.__slots__)
 
     def binary_op(self, other, op):
         """
@@ -164,13 +198,11 @@ class BooleanType(BaseType):
     """
     Represents an boolean.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'boolean'
 
-    def __eq__(self, other):
-        return isinstance(other, BooleanType)
-
     def op(self, op):
         return IntType.instance()
 
@@ -206,13 +238,11 @@ class NoneType(BaseType):
     """
     Represents an none-representable type
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'none'
 
-    def __eq__(self, other):
-        return isinstance(other, NoneType)
-
     def can_be_assigned(self, other):
         return False
 
@@ -246,13 +276,11 @@ class IntType(BaseType):
     """
     Represents an integer.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'int'
 
-    def __eq__(self, other):
-        return isinstance(other, IntType)
-
     def op(self, op):
         return self
 
@@ -293,13 +321,11 @@ class FloatType(BaseType):
     """
     Represents a float.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'float'
 
-    def __eq__(self, other):
-        return isinstance(other, FloatType)
-
     def op(self, op):
         return self
 
@@ -329,13 +355,11 @@ class StringType(BaseType):
     """
     Represents a string.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'string'
 
-    def __eq__(self, other):
-        return isinstance(other, StringType)
-
     def op(self, op):
         if op.type == 'PLUS':
             return self
@@ -368,13 +392,11 @@ class TimeType(BaseType):
     """
     Represents a time duration.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'time'
 
-    def __eq__(self, other):
-        return isinstance(other, TimeType)
-
     def op(self, op):
         if op.type == 'PLUS' or op.type == 'DASH':
             return self
@@ -401,13 +423,11 @@ class RegExpType(BaseType):
     """
     Represents a regular expression.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'regexp'
 
-    def __eq__(self, other):
-        return isinstance(other, RegExpType)
-
     def op(self, op):
         # no operations allowed on RegExp
         return None
@@ -439,13 +459,11 @@ class RangeType(BaseType):
     """
     Represents a range.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'range'
 
-    def __eq__(self, other):
-        return isinstance(other, RangeType)
-
     @singleton
     def instance():
         """
@@ -458,17 +476,15 @@ class ListType(BaseType):
     """
     Represents a List.
     """
-    def __init__(self, inner):
+    __slots__ = ('inner',)
+
+    def __new__(cls, inner):
         assert isinstance(inner, BaseType)
-        self.inner = inner
+        return interned(cls, inner)
 
     def __str__(self):
         return f'List[{self.inner}]'
 
-    def __eq__(self, other):
-        return isinstance(other, ListType) and \
-            self.inner == other.inner
-
     def op(self, op):
         if op.type == 'PLUS':
             return self
@@ -524,20 +540,16 @@ class MapType(BaseType):
     """
     Represents a Map
     """
-    def __init__(self, key, value):
+    __slots__ = ('key', 'value')
+
+    def __new__(cls, key, value):
         assert isinstance(key, BaseType)
         assert isinstance(value, BaseType)
-        self.key = key
-        self.value = value
+        return interned(cls, key, value)
 
     def __str__(self):
         return f'Map[{self.key},{self.value}]'
 
-    def __eq__(self, other):
-        return isinstance(other, MapType) and \
-               self.key == other.key and \
-               self.value == other.value
-
     def op(self, op):
         return None
 
@@ -590,12 +602,11 @@ class ObjectType(BaseType):
     """
     Represents an object
     """
+    __slots__ = ()
+
     def __str__(self):
         return f'Object'
 
-    def __eq__(self, other):
-        return isinstance(other, ObjectType)
-
     def op(self, op):
         return None
 
@@ -625,13 +636,11 @@ class AnyType(BaseType):
     """
     Represents any possible type.
     """
+    __slots__ = ()
 
     def __str__(self):
         return 'any'
 
-    def __eq__(self, other):
-        return isinstance(other, AnyType)
-
     def can_be_assigned(self, other):
         return True
 
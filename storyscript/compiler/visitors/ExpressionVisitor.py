@@ -63,79 +63,97 @@ class ExpressionVisitor:
                     tree, op,
                     [self.unary_expression(tree.child(1))])
 
+    @staticmethod
+    def left_chain(tree):
+        """
+        Returns the left-recursive chain of a binary expression, e.g. the
+        trees of `a + b + c` down to the tree of `a`. Long chains are
+        compiled from their innermost tree in a loop, s.t. they don't hit
+        the recursion limit.
+        """
+        chain = [tree]
+        while len(tree.children) > 1:
+            tree = tree.child(0)
+            chain.append(tree)
+        return chain
+
     def mul_expression(self, tree):
         """
         Compiles a mul_expression object with the given tree.
         """
-        if len(tree.children) == 1:
-            assert tree.child(0).data == 'unary_expression'
-            return self.unary_expression(tree.child(0))
-
-        assert tree.child(1).data == 'mul_operator'
-        op = tree.child(1).child(0)
-        values = [self.mul_expression(tree.child(0)),
-                  self.unary_expression(tree.child(2))]
-        return self.nary_expression(tree, op, values)
+        chain = self.left_chain(tree)
+        tree = chain.pop()
+        assert tree.child(0).data == 'unary_expression'
+        expr = self.unary_expression(tree.child(0))
+        for tree in reversed(chain):
+            assert tree.child(1).data == 'mul_operator'
+            op = tree.child(1).child(0)
+            values = [expr, self.unary_expression(tree.child(2))]
+            expr = self.nary_expression(tree, op, values)
+        return expr
 
     def arith_expression(self, tree):
         """
         Compiles a binary expression object with the given tree.
         """
-        if len(tree.children) == 1:
-            assert tree.child(0).data == 'mul_expression'
-            return self.mul_expression(tree.child(0))
-
-        assert len(tree.children) >= 3
-        assert tree.child(1).data == 'arith_operator'
-        op = tree.child(1).child(0)
-
-        c0 = self.arith_expression(tree.child(0))
-        cs = [self.mul_expression(n) for n in tree.children[2:]]
-        return self.nary_expression(
-            tree, op, values=[c0, *cs]
-        )
+        chain = self.left_chain(tree)
+        tree = chain.pop()
+        assert tree.child(0).data == 'mul_expression'
+        expr = self.mul_expression(tree.child(0))
+        for tree in reversed(chain):
+            assert len(tree.children) >= 3
+            assert tree.child(1).data == 'arith_operator'
+            op = tree.child(1).child(0)
+            cs = [self.mul_expression(n) for n in tree.children[2:]]
+            expr = self.nary_expression(
+                tree, op, values=[expr, *cs]
+            )
+        return expr
 
     def cmp_expression(self, tree):
         """
         Compiles a comparison expression object with the given tree.
         """
-        if len(tree.children) == 1:
-            assert tree.child(0).data == 'arith_expression'
-            return self.arith_expression(tree.child(0))
-
-        assert tree.child(1).data == 'cmp_operator'
-        op = tree.child(1).child(0)
-        values = [self.cmp_expression(tree.child(0)),
-                  self.arith_expression(tree.child(2))]
-        return self.nary_expression(tree, op, values)
+        chain = self.left_chain(tree)
+        tree = chain.pop()
+        assert tree.child(0).data == 'arith_expression'
+        expr = self.arith_expression(tree.child(0))
+        for tree in reversed(chain):
+            assert tree.child(1).data == 'cmp_operator'
+            op = tree.child(1).child(0)
+            values = [expr, self.arith_expression(tree.child(2))]
+            expr = self.nary_expression(tree, op, values)
+        return expr
 
     def and_expression(self, tree):
         """
         Compiles an AND expression object with the given tree.
         """
-        if len(tree.children) == 1:
-            assert tree.child(0).data == 'cmp_expression'
-            return self.cmp_expression(tree.child(0))
-
-        assert tree.child(1).type == 'AND'
-        op = tree.child(1)
-        values = [self.and_expression(tree.child(0)),
-                  self.cmp_expression(tree.child(2))]
-        return self.nary_expression(tree, op, values)
+        chain = self.left_chain(tree)
+        tree = chain.pop()
+        assert tree.child(0).data == 'cmp_expression'
+        expr = self.cmp_expression(tree.child(0))
+        for tree in reversed(chain):
+            assert tree.child(1).type == 'AND'
+            op = tree.child(1)
+            values = [expr, self.cmp_expression(tree.child(2))]
+            expr = self.nary_expression(tree, op, values)
+        return expr
 
     def or_expression(self, tree):
         """
         Compiles an OR expression object with the given tree.
         """
-        if len(tree.children) == 1:
-            assert tree.child(0).data == 'and_expression'
-            return self.and_expression(tree.child(0))
-
-        assert tree.child(1).type == 'OR'
-        op = tree.child(1)
-        values = [self.or_expression(tree.child(0)),
-                  self.and_expression(tree.child(2))]
-        return self.nary_expression(tree, op, values)
+        chain = self.left_chain(tree)
+        tree = chain.pop()
+        assert tree.child(0).data == 'and_expression'
+        expr = self.and_expression(tree.child(0))
+        for tree in reversed(chain):
+            assert tree.child(1).type == 'OR'
+            op = tree.child(1)
+            values = [expr, self.and_expression(tree.child(2))]
+            expr = self.nary_expression(tree, op, values)
+        return expr
 
     def expression(self, tree):
         """
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from types import GeneratorType
+
+
+class StackVisitor:
+    """
+    Runs visits on an explicit stack instead of the Python call stack, s.t.
+    deeply nested trees don't hit the recursion limit.
+    A visit is a generator which yields the visits it depends on and is sent
+    their results:
+
+        def block(self, tree):
+            for c in tree.children:
+                yield self.visit(c)
+
+    Values which aren't generators are sent back as they are, hence plain
+    methods can be yielded as well.
+    """
+
+    @staticmethod
+    def run(visit):
+        """
+        Runs a visit to its end and returns its result. Errors are thrown
+        into the visits which are waiting for the failed visit.
+        """
+        if type(visit) is not GeneratorType:
+            return visit
+        stack = [visit]
+        result = None
+        error = None
+        while stack:
+            try:
+                if error is None:
+                    child = stack[-1].send(result)
+                else:
+                    child = stack[-1].throw(error)
+                    error = None
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            except BaseException as e:
+                stack.pop()
+                if not stack:
+                    raise
+                error = e
+                continue
+            if type(child) is GeneratorType:
+                stack.append(child)
+                result = None
+            else:
+                result = child
+        return result
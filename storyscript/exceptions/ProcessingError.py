@@ -11,6 +11,9 @@ class ConstDict:
         self._data = data
 
     def __getattr__(self, attr):
+        if attr.startswith('_'):
+            # unset attributes and special methods, e.g. while unpickling
+            raise AttributeError(attr)
         return self._data[attr]
 
     def __getitem__(self, item):
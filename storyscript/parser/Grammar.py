@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+
 from .Ebnf import Ebnf
 
 
@@ -9,9 +12,30 @@ class Grammar:
     EBNF grammar for it.
     """
 
+    # the modules which define the grammar
+    modules = ('Ebnf.py', 'Grammar.py')
+
     def __init__(self):
         self.ebnf = Ebnf()
 
+    @classmethod
+    def sources(cls):
+        """
+        Returns the source code of the modules defining the grammar, which
+        identifies the grammar without building it. Falls back to the built
+        grammar when the sources aren't available.
+        """
+        directory = os.path.dirname(os.path.abspath(__file__))
+        sources = []
+        try:
+            for module in cls.modules:
+                with io.open(os.path.join(directory, module), 'r',
+                             encoding='utf8') as f:
+                    sources.append(f.read())
+        except OSError:
+            return cls().build()
+        return ''.join(sources)
+
     def macros(self):
         """
         Define the macros
@@ -288,6 +312,8 @@ class Grammar:
         self.throw_statement()
         self.block()
         self.ebnf.start = 'nl? block*'
+        # the code of string templates is parsed on its own
+        self.ebnf.template = 'absolute_expression nl, service nl'
         self.ebnf.ignore('_WS')
         self.ebnf.SINGLE_LINE_COMMENT = r'/(\r?\n)?\s*#[^\n\r]*/'
         self.ebnf.ignore('SINGLE_LINE_COMMENT')
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from .Transformer import Transformer
+from .Tree import Tree
+
+
+class InlineCallback:
+    """
+    Applies a rule of the Transformer when the parser reduces it.
+    """
+
+    def __init__(self, transformer, rule):
+        self.transformer = transformer
+        self.rule = rule
+        self.callback = getattr(transformer.transformer, rule)
+
+    def __call__(self, matches):
+        if self.transformer.error is not None:
+            return Tree(self.rule, matches)
+        try:
+            return self.callback(matches)
+        except Exception as e:
+            self.transformer.error = e
+            return Tree(self.rule, matches)
+
+
+class InlineTransformer:
+    """
+    Provides the rules of Transformer as callbacks of the LALR parser, s.t.
+    the tree is transformed while it's built instead of in a second pass.
+    Errors raised by the rules are deferred until the whole source has been
+    parsed, so that syntax errors are still reported first.
+    """
+
+    def __init__(self, transformer=None):
+        if transformer is None:
+            transformer = Transformer()
+        self.transformer = transformer
+        self.error = None
+
+    def reset(self):
+        self.error = None
+
+    def check(self):
+        """
+        Raises the first error of the last parse, if any.
+        """
+        if self.error is not None:
+            error = self.error
+            self.error = None
+            raise error
+
+    def __getattr__(self, rule):
+        if rule.startswith('__'):
+            raise AttributeError(rule)
+        return InlineCallback(self, rule)
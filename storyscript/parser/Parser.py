@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
+import importlib
 import io
 
+import lark
 from lark import Lark
 
 from .Grammar import Grammar
 from .Indenter import CustomIndenter
+from .InlineTransformer import InlineTransformer
+from .ParserCache import ParserCache
+from .ParserGenerator import ParserGenerator
+from .StandaloneLark import StandaloneLark
 from .Transformer import Transformer
 from .Tree import Tree
 
@@ -14,10 +20,33 @@ class Parser:
     Wraps up the parser submodule and exposes parsing and lexing
     functionalities.
     """
-    def __init__(self, algo='lalr', ebnf=None):
+    # modules generated at build time with ParserGenerator, by start rule
+    tables_modules = {'start': 'storyscript.parser.tables',
+                      'template': 'storyscript.parser.template_tables'}
+    # the rule the code of string templates starts with
+    template_rule = 'template'
+
+    def __init__(self, algo='lalr', ebnf=None, cache=True, standalone=True,
+                 start='start'):
         self.algo = algo
         self.ebnf = ebnf
+        self.cache = self._cache(cache)
+        self.standalone = standalone
+        self.start = start
+        # the parser of string templates, which is created on first use
+        self.template = None
         self.lark = self._lark()
+        Tree.child_attributes(rule.origin.name for rule in self.lark.rules)
+
+    def _cache(self, cache):
+        """
+        Returns the ParserCache to use, if any. Only LALR parsers are cached.
+        """
+        if cache is False or self.algo != 'lalr':
+            return None
+        if cache is True:
+            return ParserCache()
+        return cache
 
     @staticmethod
     def indenter():
@@ -39,11 +68,74 @@ class Parser:
                 return f.read()
         return Grammar().build()
 
+    def grammar_key(self):
+        """
+        Identifies the grammar for the generated and cached parser tables.
+        The default grammar is identified by its sources, s.t. it only needs
+        to be built when lark has to analyse it.
+        """
+        if self.ebnf:
+            return self.grammar()
+        return Grammar.sources()
+
+    def inline(self):
+        """
+        Whether the transformer is applied while parsing. Lark only supports
+        this for LALR.
+        """
+        return self.algo == 'lalr'
+
+    def _build_lark(self, grammar):
+        """
+        Initialize Lark from a grammar.
+        """
+        if self.inline():
+            return Lark(grammar, parser=self.algo, postlex=self.indenter(),
+                        tree_class=Tree, transformer=InlineTransformer(),
+                        start=self.start)
+        return Lark(grammar, parser=self.algo, postlex=self.indenter(),
+                    start=self.start)
+
+    def tables(self, key):
+        """
+        Returns the generated parser tables if they can be used for the
+        grammar identified by key.
+        """
+        if not self.standalone or self.ebnf or self.algo != 'lalr':
+            return None
+        module = self.tables_modules.get(self.start)
+        if module is None:
+            return None
+        try:
+            tables = importlib.import_module(module)
+        except ImportError:
+            return None
+        if tables.LARK_VERSION != lark.__version__:
+            return None
+        if tables.START != self.start:
+            return None
+        if tables.FINGERPRINT != ParserGenerator.fingerprint(key):
+            return None
+        return tables
+
     def _lark(self):
         """
-        Get the grammar and initialize Lark.
+        Get the grammar and initialize Lark, using the generated or cached
+        parser tables when available.
         """
-        return Lark(self.grammar(), parser=self.algo, postlex=self.indenter())
+        key = self.grammar_key()
+        tables = self.tables(key)
+        if tables is not None:
+            return StandaloneLark(tables, postlex=self.indenter(),
+                                  transformer=InlineTransformer())
+        if self.cache is None:
+            return self._build_lark(self.grammar())
+        fingerprint = self.cache.fingerprint(key, self.algo, self.start)
+        lark = self.cache.load(fingerprint)
+        if lark is None:
+            lark = self._build_lark(self.grammar())
+            self.cache.save(fingerprint, lark)
+        return lark
 
     def parse(self, source):
         """
@@ -52,12 +144,42 @@ class Parser:
         if source == '':
             return Tree('empty', [])
         source = '{}\n'.format(source)
-        lark = self.lark
-        tree = lark.parse(source)
-        result = self.transformer().transform(tree)
+        if self.inline():
+            transformer = self.lark.options.transformer
+            transformer.reset()
+            result = self.lark.parse(source)
+            transformer.check()
+        else:
+            tree = self.lark.parse(source)
+            result = self.transformer().transform(tree)
         result.parser = self
         return result
 
+    def template_parser(self):
+        """
+        Returns the parser of the code of string templates, which is None if
+        the grammar has no template rule.
+        """
+        if self.template is None:
+            rules = {rule.origin.name for rule in self.lark.rules}
+            self.template = False
+            if self.template_rule in rules:
+                self.template = Parser(algo=self.algo, ebnf=self.ebnf,
+                                       cache=self.cache,
+                                       standalone=self.standalone,
+                                       start=self.template_rule)
+        return self.template or None
+
+    def parse_template(self, source):
+        """
+        Parses the code of a string template with the template rule.
+        Returns None if the grammar has no template rule.
+        """
+        parser = self.template_parser()
+        if parser is None:
+            return None
+        return parser.parse(source)
+
     def lex(self, source):
         """
         Lexes the source string
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import glob
+import hashlib
+import io
+import os
+import pickle
+import platform
+import tempfile
+
+import lark
+from lark.parsers.lalr_analysis import Reduce, Shift
+
+
+class _Pickler(pickle.Pickler):
+    """
+    Lark compares LALR actions by identity, hence the Shift and Reduce
+    singletons are stored as references instead of copies.
+    """
+    actions = {'Shift': Shift, 'Reduce': Reduce}
+
+    def persistent_id(self, obj):
+        if obj is Shift or obj is Reduce:
+            return obj.name
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    """
+    Restores the Shift and Reduce references to lark's singletons.
+    """
+
+    def persistent_load(self, pid):
+        return _Pickler.actions[pid]
+
+
+class ParserCache:
+    """
+    Persists compiled parsers on disk, s.t. short-lived processes don't need
+    to regenerate the parser tables on every run.
+    """
+    prefix = 'parser-'
+    suffix = '.pickle'
+    # bumped whenever the pickled parser changes for the same grammar
+    version = '2'
+    # the number of parsers kept, s.t. alternating grammars (e.g. with
+    # --ebnf) and their template parsers don't evict each other
+    max_entries = 8
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = self.default_directory()
+        self.directory = directory
+
+    @staticmethod
+    def default_directory():
+        """
+        Returns the default cache directory. It can be overwritten with
+        STORYSCRIPT_CACHE_DIR.
+        """
+        directory = os.getenv('STORYSCRIPT_CACHE_DIR')
+        if directory:
+            return directory
+        base = os.getenv('XDG_CACHE_HOME')
+        if not base:
+            base = os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(base, 'storyscript')
+
+    @classmethod
+    def fingerprint(cls, grammar_key, algo, start):
+        """
+        Computes the cache key of a grammar, which is identified by the key
+        given by Parser.grammar_key. Any change in the grammar, its start
+        rule, the parsing algorithm, the cache version, lark or Python
+        results in a new key.
+        """
+        key = '\n'.join([cls.version, lark.__version__,
+                         platform.python_version(), algo, start,
+                         grammar_key])
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
+
+    def path(self, fingerprint):
+        """
+        Returns the path of the cache file for a fingerprint
+        """
+        name = f'{self.prefix}{fingerprint}{self.suffix}'
+        return os.path.join(self.directory, name)
+
+    def entries(self):
+        """
+        Returns the paths of all cached parsers
+        """
+        pattern = os.path.join(self.directory, f'{self.prefix}*{self.suffix}')
+        return glob.glob(pattern)
+
+    def load(self, fingerprint):
+        """
+        Loads a cached parser. Returns `None` if the parser hasn't been
+        cached yet or the cache file can't be read.
+        """
+        path = self.path(fingerprint)
+        try:
+            with io.open(path, 'rb') as f:
+                parser = _Unpickler(f).load()
+        except Exception:
+            return None
+        # marks the entry as recently used for the eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return parser
+
+    def save(self, fingerprint, parser):
+        """
+        Saves a parser in the cache and evicts the least recently used
+        entries. Failing to write the cache is not an error.
+        """
+        path = self.path(fingerprint)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory)
+            try:
+                with io.open(fd, 'wb') as f:
+                    _Pickler(f, protocol=pickle.HIGHEST_PROTOCOL).dump(parser)
+                # an atomic rename prevents concurrent processes from
+                # reading partially written files
+                os.replace(tmp, path)
+            except Exception:
+                os.remove(tmp)
+                return
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used parsers exceeding max_entries and
+        returns the number of removed entries.
+        """
+        entries = []
+        for entry in self.entries():
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, entry))
+        entries.sort(reverse=True)
+        stale = entries[self.max_entries:]
+        return len([e for _, e in stale if self.remove(e)])
+
+    @staticmethod
+    def remove(path):
+        """
+        Removes a cache file, ignoring files that are already gone.
+        """
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        """
+        Removes all cached parsers and returns the number of removed entries.
+        """
+        return len([e for e in self.entries() if self.remove(e)])
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+from pprint import pformat
+
+import lark
+from lark.parsers.lalr_analysis import Reduce
+
+from .Grammar import Grammar
+
+
+class ParserGenerator:
+    """
+    Generates a Python module holding the tables of a LALR parser (rules,
+    parse table and lexers), s.t. the parser can be loaded without analysing
+    the grammar. The module is loaded with StandaloneLark.
+    """
+    header = ('# -*- coding: utf-8 -*-\n'
+              '# Generated by storyscript.parser.ParserGenerator. '
+              'Do not edit.\n')
+
+    def __init__(self, lark_instance):
+        self.lark = lark_instance
+        self.frontend = lark_instance.parser
+
+    @staticmethod
+    def fingerprint(key):
+        """
+        Identifies the grammar and the lark version a module was generated
+        with. The grammar key is given by Parser.grammar_key.
+        """
+        key = '\n'.join([lark.__version__, key])
+        return hashlib.sha256(key.encode('utf8')).hexdigest()
+
+    @staticmethod
+    def symbol(symbol):
+        """
+        Converts a grammar symbol to (name, is_term, filter_out)
+        """
+        if symbol.is_term:
+            return symbol.name, True, symbol.filter_out
+        return symbol.name, False, False
+
+    def rules(self):
+        """
+        Converts the grammar rules to (origin, expansion, alias, options)
+        """
+        aliases = self.lark._parse_tree_builder.user_aliases
+        rules = []
+        for rule in self.lark.rules:
+            options = None
+            if rule.options is not None:
+                options = (rule.options.keep_all_tokens, rule.options.expand1,
+                           rule.options.priority)
+            expansion = tuple(self.symbol(s) for s in rule.expansion)
+            rules.append((rule.origin.name, expansion, aliases[rule],
+                          options))
+        return tuple(rules)
+
+    def states(self):
+        """
+        Converts the parse table to a list of tokens and a tuple of actions
+        for each state. The actions of a state are flattened to
+        (token index, is_reduce, arg, ...), where arg is either the next
+        state or the index of the rule to reduce.
+        Only tuples of constants are used, as Python loads them directly
+        from the compiled module.
+        """
+        rule_ids = {rule: i for i, rule in enumerate(self.lark.rules)}
+        table = self.frontend.parser._parse_table.states
+        assert sorted(table.keys()) == list(range(len(table)))
+        tokens = {}
+        states = []
+        for state in range(len(table)):
+            actions = []
+            for token, (action, arg) in table[state].items():
+                token_id = tokens.setdefault(token, len(tokens))
+                if action is Reduce:
+                    actions.extend((token_id, 1, rule_ids[arg]))
+                else:
+                    actions.extend((token_id, 0, arg))
+            states.append(tuple(actions))
+        return tuple(tokens.keys()), tuple(states)
+
+    @staticmethod
+    def mres(mres):
+        """
+        Converts compiled lexer regular expressions to
+        (pattern, flags, ((group index, token), ...))
+        """
+        return tuple((p.pattern, p.flags, tuple(types.items()))
+                     for p, types in mres)
+
+    def lexer(self, lexer):
+        """
+        Converts a lexer to (mres, callbacks, newline_types, ignore_types)
+        """
+        callbacks = tuple((name, self.mres(callback.mres))
+                          for name, callback in lexer.callback.items())
+        return (self.mres(lexer.mres), callbacks,
+                tuple(lexer.newline_types), tuple(lexer.ignore_types))
+
+    def lexers(self):
+        """
+        Converts the contextual lexer to a tuple of unique lexers, the lexer
+        index for each parser state and the index of the root lexer.
+        """
+        lexers = []
+        indices = {}
+
+        def index(lexer):
+            if id(lexer) not in indices:
+                indices[id(lexer)] = len(lexers)
+                lexers.append(self.lexer(lexer))
+            return indices[id(lexer)]
+
+        contextual = self.frontend.lexer
+        states = tuple(index(contextual.lexers[state])
+                       for state in range(len(contextual.lexers)))
+        root = index(contextual.root_lexer)
+        return tuple(lexers), states, root
+
+    @staticmethod
+    def assign(name, value):
+        return f'{name} = {pformat(value)}\n'
+
+    def generate(self, key):
+        """
+        Generates the source code of the module for the grammar identified by
+        key
+        """
+        table = self.frontend.parser._parse_table
+        tokens, states = self.states()
+        lexers, state_lexers, root_lexer = self.lexers()
+        return ''.join([
+            self.header,
+            self.assign('LARK_VERSION', lark.__version__),
+            self.assign('FINGERPRINT', self.fingerprint(key)),
+            self.assign('START', self.frontend.parser.parser_conf.start),
+            self.assign('RULES', self.rules()),
+            self.assign('TOKENS', tokens),
+            self.assign('STATES', states),
+            self.assign('START_STATE', table.start_state),
+            self.assign('END_STATE', table.end_state),
+            self.assign('LEXERS', lexers),
+            self.assign('STATE_LEXERS', state_lexers),
+            self.assign('ROOT_LEXER', root_lexer),
+            self.assign('IGNORE', tuple(self.lark.ignore_tokens)),
+        ])
+
+    @staticmethod
+    def build(start='start'):
+        """
+        Builds the parser of the Storyscript grammar from scratch
+        """
+        from .Parser import Parser
+        return Parser(cache=False, standalone=False, start=start).lark
+
+    @classmethod
+    def write(cls, path, start='start'):
+        """
+        Writes the module of the Storyscript parser for a start rule to path
+        """
+        key = Grammar.sources()
+        with io.open(path, 'w', encoding='utf8') as f:
+            f.write(cls(cls.build(start)).generate(key))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+from contextlib import contextmanager
+
+from .Parser import Parser
+
+
+class ParserPool:
+    """
+    A bounded pool of parsers, which can be shared between threads.
+    A Parser keeps the state of the current parse (indentation, lexer state,
+    transformer errors), hence a parser is checked out for every call.
+    Parsers are created on demand and callers block once all of them are in
+    use. The pool exposes parse, parse_template and lex like a Parser.
+    """
+
+    def __init__(self, size=None, factory=Parser):
+        if size is None:
+            size = os.cpu_count() or 1
+        self.size = size
+        self.factory = factory
+        self.parsers = []
+        self.created = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Checks a parser out of the pool, creating it if needed.
+        """
+        with self.condition:
+            while not self.parsers and self.created >= self.size:
+                self.condition.wait()
+            if self.parsers:
+                return self.parsers.pop()
+            self.created += 1
+        try:
+            return self.factory()
+        except BaseException:
+            with self.condition:
+                self.created -= 1
+                self.condition.notify()
+            raise
+
+    def release(self, parser):
+        """
+        Returns a parser to the pool.
+        """
+        with self.condition:
+            self.parsers.append(parser)
+            self.condition.notify()
+
+    @contextmanager
+    def parser(self):
+        """
+        Checks a parser out of the pool for the duration of a with block.
+        """
+        parser = self.acquire()
+        try:
+            yield parser
+        finally:
+            self.release(parser)
+
+    def parse(self, source):
+        """
+        Parses the source string with a parser of the pool. The tree refers
+        to the pool, s.t. its lowering doesn't share the parser either.
+        """
+        with self.parser() as parser:
+            tree = parser.parse(source)
+        tree.parser = self
+        return tree
+
+    def parse_template(self, source):
+        """
+        Parses the code of a string template with a parser of the pool.
+        """
+        with self.parser() as parser:
+            return parser.parse_template(source)
+
+    def lex(self, source):
+        """
+        Lexes the source string. The tokens are read before the parser is
+        returned to the pool.
+        """
+        with self.parser() as parser:
+            return list(parser.lex(source))
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import re
+
+from lark.common import LexerConf, ParserConf
+from lark.grammar import NonTerminal, Rule, RuleOptions, Terminal
+from lark.lark import LarkOptions
+from lark.lexer import ContextualLexer, TraditionalLexer, UnlessCallback
+from lark.parse_tree_builder import ParseTreeBuilder
+from lark.parser_frontends import LALR_ContextualLexer
+from lark.parsers import lalr_parser
+from lark.parsers.lalr_analysis import ParseTable, Reduce, Shift
+
+from .Tree import Tree
+
+
+class _Lexers(dict):
+    """
+    Maps parser states to their lexers. The regular expressions of a lexer
+    are only compiled once the parser reaches one of its states.
+    """
+
+    def __init__(self, lexers, states, build):
+        super().__init__()
+        self.lexers = lexers
+        self.states = states
+        self.build = build
+        self.built = {}
+
+    def __missing__(self, state):
+        index = self.states[state]
+        if index not in self.built:
+            self.built[index] = self.build(*self.lexers[index])
+        self[state] = self.built[index]
+        return self[state]
+
+
+class StandaloneLark:
+    """
+    Loads a LALR parser from the tables of a module generated by
+    ParserGenerator. It provides the parse and lex methods of lark's Lark
+    without analysing the grammar.
+    """
+
+    def __init__(self, tables, postlex=None, transformer=None):
+        self.tables = tables
+        self.postlex = postlex
+        self.options = LarkOptions({'parser': 'lalr', 'postlex': postlex,
+                                    'transformer': transformer,
+                                    'tree_class': Tree})
+        self.rules = self.build_rules()
+        self.lexer = self.build_lexer()
+        self.parser = self.build_frontend()
+
+    @staticmethod
+    def symbol(name, is_term, filter_out):
+        if is_term:
+            return Terminal(name, filter_out=filter_out)
+        return NonTerminal(name)
+
+    def build_rules(self):
+        rules = []
+        for origin, expansion, alias, options in self.tables.RULES:
+            if options is not None:
+                options = RuleOptions(*options)
+            expansion = [self.symbol(*s) for s in expansion]
+            rules.append(Rule(NonTerminal(origin), expansion, alias, options))
+        return rules
+
+    @staticmethod
+    def mres(mres):
+        return [(re.compile(p, flags), dict(types))
+                for p, flags, types in mres]
+
+    @classmethod
+    def traditional_lexer(cls, mres, callbacks, newline_types, ignore_types):
+        lexer = TraditionalLexer.__new__(TraditionalLexer)
+        lexer.mres = cls.mres(mres)
+        lexer.callback = {name: UnlessCallback(cls.mres(callback))
+                          for name, callback in callbacks}
+        lexer.newline_types = list(newline_types)
+        lexer.ignore_types = list(ignore_types)
+        return lexer
+
+    def build_lexer(self):
+        lexer = ContextualLexer.__new__(ContextualLexer)
+        lexer.lexers = _Lexers(self.tables.LEXERS, self.tables.STATE_LEXERS,
+                               self.traditional_lexer)
+        lexer.root_lexer = lexer.lexers.build(
+            *self.tables.LEXERS[self.tables.ROOT_LEXER])
+        lexer.set_parser_state(None)
+        return lexer
+
+    def build_table(self):
+        tokens = self.tables.TOKENS
+        states = {}
+        for state, actions in enumerate(self.tables.STATES):
+            states[state] = {}
+            for i in range(0, len(actions), 3):
+                token, is_reduce, arg = actions[i:i + 3]
+                if is_reduce:
+                    action = (Reduce, self.rules[arg])
+                else:
+                    action = (Shift, arg)
+                states[state][tokens[token]] = action
+        return ParseTable(states, self.tables.START_STATE,
+                          self.tables.END_STATE)
+
+    def build_parser(self):
+        table = self.build_table()
+        builder = ParseTreeBuilder(self.rules, Tree)
+        callback = builder.create_callback(self.options.transformer)
+        callbacks = {rule: getattr(callback, rule.alias, None)
+                     for rule in self.rules}
+        parser = lalr_parser.Parser.__new__(lalr_parser.Parser)
+        parser._parse_table = table
+        parser.parser_conf = ParserConf(self.rules, callback,
+                                        self.tables.START)
+        parser.parser = lalr_parser._Parser(table, callbacks)
+        parser.parse = parser.parser.parse
+        return parser
+
+    def build_frontend(self):
+        frontend = LALR_ContextualLexer.__new__(LALR_ContextualLexer)
+        frontend.lexer_conf = LexerConf([], ignore=list(self.tables.IGNORE),
+                                        postlex=self.postlex)
+        frontend.lexer = self.lexer
+        frontend.parser = self.build_parser()
+        return frontend
+
+    def parse(self, text):
+        return self.parser.parse(text)
+
+    def lex(self, text):
+        stream = self.lexer.root_lexer.lex(text)
+        if self.postlex:
+            return self.postlex.process(stream)
+        return stream
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from functools import partial
+
 from lark import Transformer as LarkTransformer
 from lark.lexer import Token
 
@@ -97,7 +99,7 @@ class Transformer(LarkTransformer):
             )]
             if len(args) > 0:
                 for arg in args:
-                    matches[0].service_fragment.children.append(arg)
+                    matches[0].service_fragment.append(arg)
                 return Tree('service_block', [matches[0]])
 
         return Tree('service_block', matches)
@@ -120,11 +122,11 @@ class Transformer(LarkTransformer):
         if command:
             assert isinstance(command, Token)
             assert command.type == 'NAME'
-            service_fragment.children.append(Tree('command', [command]))
+            service_fragment.append(Tree('command', [command]))
 
         if output:
             assert output.data == 'output'
-            service_fragment.children.append(output)
+            service_fragment.append(output)
         return Transformer.create_when_block_tree(
             service_name=service_name,
             fragment=service_fragment,
@@ -195,15 +197,15 @@ class Transformer(LarkTransformer):
                 first_arg.children = [path_token, first_arg.last_child()]
             else:
                 command = Tree('command', [path_token])
-                when.service_fragment.children.insert(0, command)
+                when.service_fragment.insert(command)
             return cls.create_when_block(
                 service_name=name_token,
                 fragment=when.service_fragment,
                 block=nested_block)
 
         # concise when which needs to wrapped in a service block
-        when.children.pop(0)
-        when.data = 'service'
+        when.children = when.children[1:]
+        when.rename('service')
         return Tree('concise_when_block', [
             name_token, path_token,
             Tree('when_block', [when, nested_block]),
@@ -236,7 +238,7 @@ class Transformer(LarkTransformer):
         if len(matches) > 1:
             if matches[1].data == 'indented_typed_arguments':
                 for argument in matches.pop(1).find_data('typed_argument'):
-                    matches[0].children.append(argument)
+                    matches[0].append(argument)
                 matches[-1] = Tree('nested_block', [matches[-1]])
 
         return Tree('function_block', matches)
@@ -300,4 +302,5 @@ class Transformer(LarkTransformer):
                 tree.children = [path.child(0), tree.children[0]]
 
     def __getattr__(self, attribute, *args):
-        return lambda matches: Tree(attribute, matches)
+        # a partial can be pickled with the parser, unlike a lambda
+        return partial(Tree, attribute)
@@ -1,15 +1,150 @@
 # -*- coding: utf-8 -*-
+import weakref
+
 from lark.lexer import Token
 from lark.tree import Tree as LarkTree
 
 from ..exceptions import CompilerError
 
 
+class _Child:
+    """
+    Looks up the child tree named after the attribute. Installed on Tree
+    for the rule names of the grammar, s.t. their lookups skip the failed
+    attribute lookup before __getattr__.
+    """
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, tree, owner=None):
+        if tree is None:
+            return self
+        return tree.child_index().get(self.name)
+
+
+class _Children(list):
+    """
+    The children of a tree, which hold the caches derived from them: the
+    first and last token and the index of the child trees. Any change drops
+    these caches and the caches of the trees which have been derived from
+    this tree, i.e. the caches of its ancestors.
+    """
+    # _dependents are the children of the trees whose caches depend on
+    # this tree
+    __slots__ = ('_tokens', '_index', '_dependents', '__weakref__')
+
+    def __reduce__(self):
+        # the caches aren't kept
+        return list, (list(self),)
+
+    def add_dependent(self, ref):
+        """
+        Registers the children of a tree whose caches depend on this tree by
+        a weak reference, which avoids cycles between trees and their
+        parents.
+        """
+        dependents = self._dependents
+        if dependents is None:
+            # most trees have a single parent
+            self._dependents = ref
+        elif type(dependents) is not list:
+            # weakref.ref returns the same reference for the same object
+            if dependents is not ref:
+                self._dependents = [dependents, ref]
+        elif dependents[-1] is not ref:
+            dependents.append(ref)
+
+    def changed(self):
+        """
+        Drops the caches of the tree and of the trees depending on it.
+        """
+        stack = [self]
+        while stack:
+            children = stack.pop()
+            if children is None:
+                # the dependent tree is gone
+                continue
+            children._tokens = None
+            children._index = None
+            dependents = children._dependents
+            if dependents is None:
+                continue
+            children._dependents = None
+            if type(dependents) is list:
+                stack.extend(ref() for ref in dependents)
+            else:
+                stack.append(dependents())
+
+
+def _children(items):
+    """
+    Creates the children of a tree. Unlike an __init__ method, this doesn't
+    add a Python call to the creation of every tree.
+    """
+    children = _Children(items)
+    children._tokens = None
+    children._index = None
+    children._dependents = None
+    return children
+
+
+def _changing(method):
+    """
+    Wraps a list method, s.t. it drops the caches before changing the list.
+    """
+    def change(self, *args, **kwargs):
+        self.changed()
+        return method(self, *args, **kwargs)
+
+    change.__name__ = method.__name__
+    return change
+
+
+for _method in ('__setitem__', '__delitem__', '__iadd__', '__imul__',
+                'append', 'extend', 'insert', 'pop', 'remove', 'clear',
+                'reverse', 'sort'):
+    setattr(_Children, _method, _changing(getattr(list, _method)))
+
+
 class Tree(LarkTree):
     """
     Wraps the original Tree class from lark, providing many useful
     enhancements.
+    Positions and children are indexed. The caches are dropped whenever the
+    children of the tree or of any of its subtrees change, or a child is
+    renamed.
     """
+    # attributes which are set by __init__, hence aren't pickled
+    _transient = frozenset(('data', 'children', '_meta'))
+
+    def __init__(self, data, children, meta=None):
+        # bypasses __setattr__, as new trees don't invalidate any cache
+        _setattr(self, 'data', data)
+        _setattr(self, 'children', _children(children))
+        _setattr(self, '_meta', meta)
+
+    def __setattr__(self, name, value):
+        if name == 'children':
+            self.children.changed()
+            value = _children(value)
+        elif name == 'data':
+            # the child indexes of the parents use the name
+            self.children.changed()
+        super().__setattr__(name, value)
+
+    @classmethod
+    def child_attributes(cls, names):
+        """
+        Installs the lookups of child trees for the rule names `names`.
+        Private names and names of existing attributes are skipped.
+        """
+        for name in names:
+            if name.startswith('_') or not name.isidentifier():
+                continue
+            if name not in cls._transient and not hasattr(cls, name):
+                setattr(cls, name, _Child(name))
 
     @staticmethod
     def walk(tree, path):
@@ -18,6 +153,24 @@ class Tree(LarkTree):
                 if item.data == path:
                     return item
 
+    def child_index(self):
+        """
+        Maps the names of the child trees to the first child with that name.
+        The index is built lazily and dropped when the children change or
+        a child is renamed.
+        """
+        children = self.children
+        index = children._index
+        if index is None:
+            index = {}
+            ref = weakref.ref(children)
+            for item in reversed(children):
+                if isinstance(item, Tree):
+                    index[item.data] = item
+                    item.children.add_dependent(ref)
+            children._index = index
+        return index
+
     def node(self, path):
         """
         Finds a subtree or a nested subtree, using path
@@ -26,9 +179,9 @@ class Tree(LarkTree):
         current = None
         for shard in shards:
             if current is None:
-                current = self.walk(self, shard)
+                current = self.child_index().get(shard)
             else:
-                current = self.walk(current, shard)
+                current = current.child_index().get(shard)
         return current
 
     def first_child(self):
@@ -81,17 +234,78 @@ class Tree(LarkTree):
 
     def find_first_token(self, reverse=False):
         """
-        Finds the first token in a tree
-        """
-        childs = self.children
-        if reverse:
-            childs = reversed(childs)
-        for child in childs:
+        Finds the first token in a tree. The result is cached until the tree
+        or one of its subtrees changes.
+        """
+        children = self.children
+        tokens = children._tokens
+        if tokens is None:
+            tokens = children._tokens = {}
+        elif reverse in tokens:
+            return tokens[reverse]
+        if not reverse:
+            return self._first_token()
+        ref = weakref.ref(children)
+        token = None
+        for child in reversed(children):
             if isinstance(child, Token):
-                return child
-            t = child.find_first_token(reverse=False)
-            if t is not None:
-                return t
+                token = child
+                break
+            child.children.add_dependent(ref)
+            token = child._first_token()
+            if token is not None:
+                break
+        tokens[reverse] = token
+        return token
+
+    def _cached_tokens(self):
+        """
+        Returns the cached first and last token of the tree, which are
+        dropped whenever the tree or one of its subtrees changes.
+        """
+        children = self.children
+        tokens = children._tokens
+        if tokens is None:
+            tokens = children._tokens = {}
+        return tokens
+
+    def _first_token(self):
+        """
+        Searches the first token depth-first on an explicit stack and caches
+        it for all trees on the way down to it.
+        """
+        self._cached_tokens()
+        trees = [self]
+        children = [iter(self.children)]
+        refs = [weakref.ref(self.children)]
+        token = None
+        while children:
+            for child in children[-1]:
+                if isinstance(child, Token):
+                    token = child
+                    break
+                child.children.add_dependent(refs[-1])
+                tokens = child._cached_tokens()
+                if False in tokens:
+                    token = tokens[False]
+                    if token is not None:
+                        break
+                else:
+                    trees.append(child)
+                    children.append(iter(child.children))
+                    refs.append(weakref.ref(child.children))
+                    break
+            else:
+                # the last tree has no tokens
+                trees.pop().children._tokens[False] = None
+                children.pop()
+                refs.pop()
+                continue
+            if token is not None:
+                break
+        for tree in trees:
+            tree.children._tokens[False] = token
+        return token
 
     def line(self):
         """
@@ -117,6 +331,12 @@ class Tree(LarkTree):
         """
         self.children.insert(0, item)
 
+    def append(self, item):
+        """
+        Appends an item to the current tree.
+        """
+        self.children.append(item)
+
     def rename(self, new_name):
         """
         Renames the current tree
@@ -129,6 +349,31 @@ class Tree(LarkTree):
         """
         self.children[index] = item
 
+    def clone(self, columns=0):
+        """
+        Copies the tree, its subtrees and its tokens. Unlike deepcopy, the
+        end positions of the tokens are kept. The tokens of the first line are
+        moved by `columns`.
+        """
+        children = []
+        for child in self.children:
+            if isinstance(child, Tree):
+                child = child.clone(columns)
+            elif isinstance(child, Token):
+                pos, column = child.pos_in_stream, child.column
+                if child.line == 1:
+                    pos += columns
+                    column += columns
+                token = Token(child.type, child.value, pos, child.line,
+                              column)
+                token.end_line = child.end_line
+                token.end_column = child.end_column
+                if child.end_line == 1:
+                    token.end_column += columns
+                child = token
+            children.append(child)
+        return Tree(self.data, children)
+
     def extract_path(self):
         """
         Extracts the path name from a path tree
@@ -156,21 +401,21 @@ class Tree(LarkTree):
         """
         if len(self.children) != 1:
             return None
-        it = self.iter_subtrees()
-        exp = reversed(expected_nodes)
-        # save path for efficiency
-        path = next(it)
-        if path.data != next(exp):
-            return None
-        while True:
-            p = next(it, None)
-            e = next(exp, None)
-            if p is None and e is None:
-                return path
-            if p is None or e is None:
+        # stops as soon as there are more trees than expected nodes
+        trees = []
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            trees.append(tree)
+            if len(trees) > len(expected_nodes):
                 return None
-            if p.data != e:
+            stack.extend(c for c in tree.children if isinstance(c, LarkTree))
+        if len(trees) != len(expected_nodes):
+            return None
+        for tree, expected in zip(trees, expected_nodes):
+            if tree.data != expected:
                 return None
+        return trees[-1]
 
     def child_token(self, index, name):
         """
@@ -210,5 +455,20 @@ class Tree(LarkTree):
 
         return tree
 
+    def __reduce__(self):
+        # cached positions and indexes aren't kept
+        state = {k: v for k, v in self.__dict__.items()
+                 if k not in self._transient}
+        return type(self), (self.data, self.children, self._meta), \
+            state or None
+
     def __getattr__(self, attribute):
-        return self.node(attribute)
+        if attribute.startswith('_'):
+            # special methods, e.g. while copying
+            raise AttributeError(attribute)
+        return self.child_index().get(attribute)
+
+
+# Sets attributes without Tree.__setattr__, which only needs to see changes
+# of existing trees.
+_setattr = object.__setattr__
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+import copyreg
+import io
+import pickle
+
+from lark.lexer import Token
+
+
+def _token(type_, text, value, pos_in_stream, line, column, end_line,
+           end_column):
+    token = Token(type_, text, pos_in_stream, line, column)
+    token.value = value
+    token.end_line = end_line
+    token.end_column = end_column
+    return token
+
+
+def _reduce_token(token):
+    return _token, (token.type, str(token), token.value, token.pos_in_stream,
+                    token.line, token.column, token.end_line,
+                    token.end_column)
+
+
+class TreePickler(pickle.Pickler):
+    """
+    Pickles trees and their tokens. Lark only keeps the start positions of
+    pickled tokens, hence tokens are stored with all their positions.
+    """
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[Token] = _reduce_token
+
+    @classmethod
+    def dumps(cls, obj):
+        """
+        Pickles `obj` into bytes, which can be loaded with pickle.loads.
+        """
+        f = io.BytesIO()
+        cls(f, protocol=pickle.HIGHEST_PROTOCOL).dump(obj)
+        return f.getvalue()
@@ -1,10 +1,17 @@
 from .Ebnf import Ebnf
 from .Grammar import Grammar
 from .Indenter import CustomIndenter
+from .InlineTransformer import InlineTransformer
 from .Parser import Parser
+from .ParserCache import ParserCache
+from .ParserGenerator import ParserGenerator
+from .ParserPool import ParserPool
+from .StandaloneLark import StandaloneLark
 from .Transformer import Transformer
 from .Tree import Tree
+from .TreePickler import TreePickler
 
 
-__all__ = ['CustomIndenter', 'Ebnf', 'Grammar', 'Parser', 'Transformer',
-           'Tree']
+__all__ = ['CustomIndenter', 'Ebnf', 'Grammar', 'InlineTransformer',
+           'Parser', 'ParserCache', 'ParserGenerator', 'ParserPool',
+           'StandaloneLark', 'Transformer', 'Tree', 'TreePickler']
@@ -11,6 +11,7 @@ from pytest import mark
 
 from storyscript.Api import Api
 from storyscript.App import _clean_dict
+from storyscript.BinaryFormat import BinaryFormat
 
 from utils import parse_features
 
@@ -26,6 +27,9 @@ features = {'globals': True}
 def run_test_story(source, expected_story, features):
     s = Api.loads(source, features)
     s.check_success()
+    # the binary format holds the same structure as json
+    binary = BinaryFormat.loads(BinaryFormat.dumps(s.result()))
+    assert binary == json.loads(json.dumps(s.result()))
     result = _clean_dict(s.result())
     del result['version']
     assert expected_story == result
@@ -1,4 +1,8 @@
 # -*- coding: utf-8 -*-
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
 from pytest import raises
@@ -6,6 +10,7 @@ from pytest import raises
 from storyscript.Api import Api
 from storyscript.Bundle import Bundle
 from storyscript.Story import Story
+from storyscript.compiler.semantics.functions.HubMutations import Hub
 from storyscript.exceptions import StoryError
 
 
@@ -100,3 +105,135 @@ def test_compiler_only_comments():
     result = api_result['stories']['a.story']
     assert result['tree'] == {}
     assert result['entrypoint'] is None
+
+
+def compile_story(path):
+    with io.open(path, 'r') as f:
+        result = Api.loads(f.read())
+    errors = [e.short_message() for e in result.errors()]
+    return result.result(), errors
+
+
+def test_api_loads_threads():
+    """
+    Ensures stories compiled concurrently match the serial compilation
+    """
+    paths = []
+    for root, dirs, files in os.walk(os.path.join('tests', 'e2e')):
+        paths.extend(os.path.join(root, f) for f in files
+                     if f.endswith('.story'))
+    paths.sort()
+    expected = [compile_story(path) for path in paths]
+    # switch threads often, s.t. parses interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(compile_story, paths * 2))
+    finally:
+        sys.setswitchinterval(interval)
+    assert results == expected * 2
+
+
+def test_api_loads_string_templates_cached():
+    """
+    Ensures repeated string templates compile like the first one
+    """
+    tree = Api.loads('a = 1\nb = "{a + 1}"\nc = "{a + 1}"').result()['tree']
+    assert tree['2.1']['args'] == tree['3.1']['args']
+    assert tree['2.1']['name'] == ['__p-2.1']
+    assert tree['3.1']['name'] == ['__p-3.1']
+    assert tree['3']['args'][0]['value']['paths'] == ['__p-3.1']
+
+
+def test_api_loads_string_templates_error_repeated():
+    """
+    Ensures errors of string templates are raised again
+    """
+    for i in range(2):
+        e = Api.loads('c = "{ $ }"').errors()[0]
+        assert e.short_message() == 'E0041: `$` is not allowed here'
+
+
+def test_api_loads_deeply_nested():
+    """
+    Ensures deeply nested stories compile without hitting the recursion limit
+    """
+    depth = 5000
+    lines = [f'{"    " * i}if {i} == 1' for i in range(depth)]
+    lines.append(f'{"    " * depth}x = 1')
+    limit = sys.getrecursionlimit()
+    result = Api.loads('\n'.join(lines))
+    result.check_success()
+    assert sys.getrecursionlimit() == limit
+    tree = result.result()['tree']
+    assert len(tree) == depth + 1
+    assert tree[str(depth + 1)]['method'] == 'expression'
+    assert tree[str(depth + 1)]['parent'] == str(depth)
+
+
+def test_api_loads_long_expression():
+    """
+    Ensures long expression chains compile without hitting the recursion limit
+    """
+    terms = 50000
+    limit = sys.getrecursionlimit()
+    result = Api.loads('a = ' + ' + '.join(['1'] * terms))
+    result.check_success()
+    assert sys.getrecursionlimit() == limit
+    expr = result.result()['tree']['1']['args'][0]
+    count = 1
+    while expr['$OBJECT'] == 'expression':
+        assert expr['expression'] == 'sum'
+        assert expr['values'][1] == {'$OBJECT': 'int', 'int': 1}
+        expr = expr['values'][0]
+        count += 1
+    assert count == terms
+
+
+def test_api_loads_jobs(cpus):
+    """
+    Ensures function bodies checked in parallel compile like serial ones
+    """
+    source = ''.join(
+        f'function f{i} a:int returns int\n'
+        f'  b = [a, {i}]\n'
+        f'  c = b.length() + a\n'
+        f'  return c\n'
+        for i in range(4)
+    ) + 'x = f3(a: 1)\n'
+    result = Api.loads(source, features={'jobs': 2})
+    result.check_success()
+    assert result.result() == Api.loads(source).result()
+
+
+def test_api_loads_jobs_error(cpus):
+    """
+    Ensures the first error of parallel checks is the error of the first
+    function
+    """
+    source = ('function f0 returns int\n  return 0\n'
+              'function f1 returns int\n  return "a"\n'
+              'function f2 returns int\n  return [1]\n')
+    e = Api.loads(source, features={'jobs': 2}).errors()[0]
+    assert e.short_message() == Api.loads(source).errors()[0].short_message()
+    assert e.error.line == '4'
+
+
+def test_api_loads_hub(tmpdir):
+    """
+    Ensures stories can be compiled with the mutations of another hub
+    """
+    spec = tmpdir.join('hub.spec')
+    spec.write('int triple -> int\n')
+    compiled = tmpdir.join('hub.bin')
+    compiled.write_binary(Hub.from_file(str(spec)).compile())
+    source = 'a = 1\nb = a.triple()\n'
+    for path in (spec, compiled):
+        result = Api.loads(source, features={'hub': str(path)})
+        result.check_success()
+    e = Api.loads(source).errors()[0]
+    assert e.error.error == 'mutation_invalid_name'
+    e = Api.loads('a = 1\nb = a.increment()\n',
+                  features={'hub': str(spec)}).errors()[0]
+    assert e.error.error == 'mutation_invalid_name'
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from pytest import mark, raises
+
+from storyscript.Bundle import Bundle
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.StoryCache import StoryCache
+from storyscript.exceptions import StoryError
+
+
+stories = {
+    'one.story': 'a = 1\nb = a + 1\n',
+    'two.story': 'function f returns int\n  return 1\nx = f()\n',
+    'three.story': 'x = alpine echo message: "a"\n',
+    'four.story': 'y = [1, 2]\nz = y.length()\n',
+}
+
+
+def bundle(story_files, jobs, cache=None):
+    return Bundle(story_files=dict(story_files), features={'jobs': jobs},
+                  cache=cache)
+
+
+def test_bundle_jobs():
+    """
+    Ensures stories compiled in parallel are bundled like serial ones
+    """
+    result = bundle(stories, jobs=2).bundle()
+    expected = bundle(stories, jobs=1).bundle()
+    assert result == expected
+    assert list(result['stories']) == list(expected['stories'])
+
+
+def test_bundle_trees_jobs():
+    result = bundle(stories, jobs=2).bundle_trees(lower=True)
+    expected = bundle(stories, jobs=1).bundle_trees(lower=True)
+    assert result == expected
+
+
+def test_bundle_templates():
+    """
+    Ensures the stories of a bundle share their string templates, which
+    are placed at the column of every use
+    """
+    templates = {'one.story': 'a = 1\nb = "{a + 1}"\n',
+                 'two.story': 'a = 2\nlong = "...{a + 1}"\n'}
+    result = bundle(templates, jobs=1)
+    compiled = result.bundle()
+    assert len(result.templates.templates) == 1
+    for story in templates:
+        assert compiled['stories'][story] == \
+            Story(templates[story], Features(None)).process()
+
+
+def test_bundle_jobs_errors():
+    """
+    Ensures stories compiled in parallel raise the error of a serial
+    compilation
+    """
+    story_files = dict(stories)
+    story_files['two.story'] = 'a = 1\na = "b"\n'
+    story_files['three.story'] = 'function f returns int\n  return "a"\n'
+    story_files['five.story'] = 'x = = 1\n'
+    for files in (story_files, dict(story_files, **{'five.story': ''})):
+        with raises(StoryError) as e:
+            bundle(files, jobs=2).bundle()
+        with raises(StoryError) as expected:
+            bundle(files, jobs=1).bundle()
+        assert e.value.message() == expected.value.message()
+
+
+@mark.parametrize('jobs', [1, 2])
+def test_bundle_cache(tmpdir, jobs):
+    """
+    Ensures cached stories are bundled like fresh ones and are compiled
+    again once a module they import changes
+    """
+    cache = StoryCache(directory=str(tmpdir))
+    story_files = dict(stories)
+    story_files['one.story'] = 'import "lib" as lib\na = 1\n'
+    story = Story(story_files['one.story'], Features(None))
+    story.parse(parser=None)
+    module, = story.modules()
+    story_files[module] = 'function f returns int\n  return 1\n'
+    expected = bundle(story_files, jobs=1).bundle()
+    assert bundle(story_files, jobs, cache).bundle() == expected
+    assert len(cache.entries()) == len(story_files)
+    assert bundle(story_files, jobs, cache).bundle() == expected
+    key = bundle(story_files, jobs, cache).cached_story('one.story').key
+    story_files[module] = 'function f returns string\n  return "a"\n'
+    expected = bundle(story_files, jobs=1).bundle()
+    cached = bundle(story_files, jobs, cache)
+    assert cached.bundle() == expected
+    assert cached.cached_story('one.story').key != key
+
+
+@mark.parametrize('jobs', [1, 2])
+def test_bundle_cache_ebnf(tmpdir, jobs):
+    """
+    Ensures that stories aren't loaded from the cache when they are parsed
+    with a custom grammar
+    """
+    cache = StoryCache(directory=str(tmpdir.mkdir('cache')))
+    bundle(stories, jobs, cache).bundle()
+    ebnf = tmpdir.join('grammar.ebnf')
+    ebnf.write('start: "x"\n')
+    with raises(StoryError):
+        bundle(stories, jobs, cache).bundle(ebnf=str(ebnf))
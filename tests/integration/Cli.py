@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 import io
+import json
 from unittest import mock
 
 from click.testing import CliRunner
 
 from pytest import fixture
 
+from storyscript.App import App
+from storyscript.BinaryFormat import BinaryFormat
 from storyscript.Cli import Cli
 
 
@@ -146,3 +149,16 @@ def test_cli_lex(mocker, runner):
 0 NAME foo
 """
     assert e.exit_code == 0
+
+
+def test_cli_compile_binary_stdout(runner, tmpdir):
+    """
+    Ensures that a binary bundle written to the standard output can be
+    loaded again
+    """
+    story = tmpdir.join('hello.story')
+    story.write('a = [1, 2.5, "hello"]\n')
+    e = runner.invoke(Cli.compile, [str(story), '--format=binary'])
+    assert e.exit_code == 0
+    result = BinaryFormat.loads(e.stdout_bytes)
+    assert result == json.loads(App.compile(str(story)))
@@ -1,10 +1,31 @@
 # -*- coding: utf-8 -*-
 from io import StringIO
 
+from storyscript.Features import Features
 from storyscript.Story import Story
+from storyscript.compiler.semantics.FunctionPool import FunctionPool
 
 
 def test_story_from_stream():
     stream = StringIO('x = 0')
     story = Story.from_stream(stream, features=None)
     assert story.story == 'x = 0'
+
+
+def test_story_compile_jobs_scopes(cpus):
+    """
+    Ensures that function blocks checked in parallel get the scope of a
+    serial check
+    """
+    source = ''.join(f'function f{i} a:int returns int\n'
+                     f'  b = [a, {i}]\n'
+                     f'  return a\n' for i in range(3))
+    scopes = []
+    for jobs in (1, 2):
+        story = Story(source, Features({'jobs': jobs}))
+        story.parse(parser=None)
+        story.compile()
+        blocks = FunctionPool.function_blocks(story.tree)
+        scopes.append([block.scope.pretty() for block in blocks])
+    assert scopes[0] == scopes[1]
+    assert 'b: List[int]' in scopes[1][0]
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+from pytest import raises
+
+from storyscript.App import App
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.Watcher import Watcher
+from storyscript.exceptions import StoryError
+
+
+def write(path, source):
+    with open(path, 'w') as f:
+        f.write(source)
+
+
+def test_watcher_compile(monkeypatch, tmpdir):
+    """
+    Ensures that the watched bundle is compiled like a fresh one and that
+    only changed stories and the stories importing them are compiled again
+    """
+    importer = 'import "lib" as lib\nb = 2\n'
+    story = Story(importer, Features(None))
+    story.parse(parser=None)
+    module, = story.modules()
+    compiled = []
+    compile = Story.compile
+
+    def spy(story):
+        compiled.append(story.story)
+        return compile(story)
+
+    monkeypatch.setattr(Story, 'compile', spy)
+    with tmpdir.as_cwd():
+        write(module, 'a = 1\n')
+        write('one.story', importer)
+        write('two.story', 'x = [1, 2]\n')
+        bundles = Watcher('.').watch(interval=0)
+        memo = {}
+
+        def watch():
+            compiled.clear()
+            out = io.StringIO()
+            App.compile_bundle(next(bundles), out=out, memo=memo)
+            result = sorted(compiled)
+            assert out.getvalue() == App.compile('.')
+            return result
+
+        assert watch() == sorted(['a = 1\n', importer, 'x = [1, 2]\n'])
+        # every change also changes the size of the story
+        write(module, 'a = 1\nc = 3\n')
+        assert watch() == sorted(['a = 1\nc = 3\n', importer])
+        write('two.story', 'x = [1, 2, 3]\n')
+        assert watch() == ['x = [1, 2, 3]\n']
+        os.remove('two.story')
+        assert watch() == []
+
+
+def test_watcher_compile_hub(tmpdir):
+    """
+    Ensures that the stories are compiled again with the mutations of a
+    changed hub specification
+    """
+    with tmpdir.as_cwd():
+        write('hub.spec', 'int triple -> int\n')
+        write('one.story', 'a = 1\nb = a.triple()\n')
+        watcher = Watcher('one.story', features={'hub': 'hub.spec'})
+        assert watcher.update() is True
+        assert App.compile_bundle(watcher.bundle) is not None
+        assert watcher.update() is False
+        write('hub.spec', 'int double -> int\n')
+        assert watcher.update() is True
+        with raises(StoryError) as e:
+            App.compile_bundle(watcher.bundle)
+        assert e.value.error.error == 'mutation_invalid_name'
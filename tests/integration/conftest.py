@@ -1 +1,13 @@
 # -*- coding: utf-8 -*-
+from pytest import fixture
+
+from storyscript.Features import Features
+
+
+@fixture
+def cpus(monkeypatch):
+    """
+    Runs the process pools of the `jobs` feature on machines with fewer
+    CPUs as well.
+    """
+    monkeypatch.setattr(Features, 'cpus', staticmethod(lambda: 4))
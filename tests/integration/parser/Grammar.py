@@ -20,3 +20,17 @@ def test_grammar():
     with io.open(grammar_file, 'r') as f:
         expected = f.read().strip()
     assert result == expected
+
+
+def test_grammar_sources():
+    """
+    Ensures the grammar is identified by the modules defining it
+    """
+    sources = Grammar.sources()
+    assert 'class Grammar:' in sources
+    assert 'class Ebnf:' in sources
+
+
+def test_grammar_sources_missing(monkeypatch):
+    monkeypatch.setattr(Grammar, 'modules', ('missing.py',))
+    assert Grammar.sources() == Grammar().build()
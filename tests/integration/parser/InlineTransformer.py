@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+
+from lark import Lark
+
+from pytest import fixture, mark
+
+from storyscript.parser import CustomIndenter, Grammar, Parser, Transformer
+
+
+e2e_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'e2e')
+stories = sorted(os.path.relpath(os.path.join(root, f), e2e_dir)
+                 for root, dirs, files in os.walk(e2e_dir)
+                 for f in files if f.endswith('.story'))
+
+
+@fixture(scope='module')
+def lark():
+    return Lark(Grammar().build(), parser='lalr', postlex=CustomIndenter())
+
+
+@fixture(scope='module')
+def parser():
+    return Parser(cache=False, standalone=False)
+
+
+def outcome(parse, source):
+    try:
+        return parse(source)
+    except Exception as e:
+        return type(e), getattr(e, 'error', None), getattr(e, 'line', None)
+
+
+@mark.parametrize('story', stories)
+def test_inline_transformer(lark, parser, story):
+    """
+    Ensures transforming while parsing gives the same trees and errors as
+    transforming the parsed tree
+    """
+    with io.open(os.path.join(e2e_dir, story), 'r') as f:
+        source = f.read()
+
+    def two_pass(source):
+        return Transformer().transform(lark.parse(f'{source}\n'))
+
+    expected = outcome(two_pass, source)
+    assert outcome(parser.parse, source) == expected
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
+from lark.exceptions import UnexpectedToken
 from lark.lexer import Token
 
-from pytest import mark
+from pytest import mark, raises
 
 from storyscript.Story import _parser
 from storyscript.compiler.lowering.Lowering import Lowering
@@ -278,3 +279,21 @@ def test_parser_string_single_quoted():
     ar_exp = arith_exp(result)
     lhs = get_entity(ar_exp.child(0)).values.string.child(0)
     assert lhs == r"""'b.\n.\\.\'.c'"""
+
+
+def test_parser_parse_template():
+    result = _parser().parse_template('a + 1')
+    assert result.data == 'template'
+    ar_exp = arith_exp(result.absolute_expression)
+    assert get_entity(ar_exp.child(0)).path.child(0) == Token('NAME', 'a')
+
+
+def test_parser_parse_template_service():
+    result = _parser().parse_template('my_service cmd')
+    assert result.service.path.child(0) == Token('NAME', 'my_service')
+    assert result.service.service_fragment.command.child(0) == 'cmd'
+
+
+def test_parser_parse_template_statement():
+    with raises(UnexpectedToken):
+        _parser().parse_template('a = 1')
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from storyscript.parser import Parser, ParserCache
+
+
+def test_parser_cache_roundtrip(tmpdir):
+    """
+    Ensures a cached parser produces the same trees as a fresh parser
+    """
+    cache = ParserCache(directory=str(tmpdir))
+    source = 'a = 1 + 2\nif a > 2\n    b = "{a}"\n'
+    expected = Parser(cache=False, standalone=False).parse(source)
+    assert Parser(cache=cache, standalone=False).parse(source) == expected
+    assert len(cache.entries()) == 1
+    assert Parser(cache=cache, standalone=False).parse(source) == expected
+
+
+def test_parser_cache_invalidation(tmpdir):
+    """
+    Ensures a changed grammar doesn't use stale parser tables
+    """
+    cache = ParserCache(directory=str(tmpdir))
+    parser = Parser(cache=cache, standalone=False)
+    fingerprint = cache.fingerprint(parser.grammar_key(), 'lalr', 'start')
+    assert cache.entries() == [cache.path(fingerprint)]
+    assert cache.load(cache.fingerprint('grammar', 'lalr', 'start')) is None
+
+
+def test_parser_cache_clear(tmpdir):
+    cache = ParserCache(directory=str(tmpdir))
+    Parser(cache=cache, standalone=False)
+    assert cache.clear() == 1
+    assert cache.entries() == []
+
+
+def test_parser_cache_ebnf(tmpdir):
+    """
+    Ensures parsers of alternating grammars don't evict each other
+    """
+    ebnf = tmpdir.join('grammar.ebnf')
+    ebnf.write(Parser(cache=False).grammar())
+    cache = ParserCache(directory=str(tmpdir.mkdir('cache')))
+    Parser(cache=cache, standalone=False)
+    Parser(cache=cache, ebnf=str(ebnf))
+    assert len(cache.entries()) == 2
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+from importlib import util
+
+from lark import Lark
+
+from pytest import fixture, mark
+
+from storyscript.parser import (CustomIndenter, Grammar, Parser,
+                                ParserGenerator, StandaloneLark)
+
+
+e2e_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'e2e')
+stories = sorted(os.path.relpath(os.path.join(root, f), e2e_dir)
+                 for root, dirs, files in os.walk(e2e_dir)
+                 for f in files if f.endswith('.story'))
+
+
+@fixture(scope='module')
+def lark():
+    return Lark(Grammar().build(), parser='lalr', postlex=CustomIndenter())
+
+
+@fixture(scope='module')
+def standalone(tmpdir_factory):
+    """
+    Generates the parser module and loads it as the build does
+    """
+    path = str(tmpdir_factory.mktemp('parser').join('tables.py'))
+    ParserGenerator.write(path)
+    spec = util.spec_from_file_location('tables', path)
+    tables = util.module_from_spec(spec)
+    spec.loader.exec_module(tables)
+    return StandaloneLark(tables, postlex=CustomIndenter())
+
+
+def outcome(parse, source):
+    try:
+        return parse(source)
+    except Exception as e:
+        return type(e), getattr(e, 'line', None), getattr(e, 'column', None)
+
+
+@mark.parametrize('story', stories)
+def test_standalone_lark_parse(lark, standalone, story):
+    """
+    Ensures the generated parser produces the same trees and errors as lark
+    """
+    with io.open(os.path.join(e2e_dir, story), 'r') as f:
+        source = f.read() + '\n'
+    expected = outcome(lark.parse, source)
+    assert outcome(standalone.parse, source) == expected
+
+
+def test_standalone_lark_lex(lark, standalone):
+    source = 'a = 1\nif a\n    b = "{a}"\n'
+    expected = [(t.type, t.value) for t in lark.lex(source)]
+    assert [(t.type, t.value) for t in standalone.lex(source)] == expected
+
+
+def test_standalone_lark_template(tmpdir, monkeypatch):
+    """
+    Ensures the parser of string templates loads its generated tables
+    """
+    ParserGenerator.write(str(tmpdir.join('template_tables.py')),
+                          start='template')
+    monkeypatch.syspath_prepend(str(tmpdir))
+    monkeypatch.setitem(Parser.tables_modules, 'template', 'template_tables')
+    template = Parser(cache=False).template_parser()
+    assert isinstance(template.lark, StandaloneLark)
+    expected = Parser(cache=False, standalone=False, start='template')
+    assert template.parse('a + 1') == expected.parse('a + 1')
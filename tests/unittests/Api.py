@@ -48,12 +48,20 @@ def test_api_load_map(patch, magic):
     patch.object(Bundle, 'bundle')
     files = {'a.story': "import 'b' as b", 'b.story': 'x = 0'}
     result = Api.load_map(files).result()
-    Bundle.__init__.assert_called_with(story_files=files, features=ANY)
+    Bundle.__init__.assert_called_with(story_files=files, features=ANY,
+                                       cache=None)
     assert isinstance(Bundle.__init__.call_args[1]['features'], Features)
     Bundle.bundle.assert_called()
     assert result == Bundle.bundle()
 
 
+def test_api_load_map_cache(patch):
+    patch.init(Bundle)
+    patch.object(Bundle, 'bundle')
+    Api.load_map({}, cache='cache')
+    assert Bundle.__init__.call_args[1]['cache'] == 'cache'
+
+
 def test_api_loads_internal_error(patch):
     """
     Ensures Api.loads handles unknown errors
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 import json
+import os
 
 from pytest import fixture, raises
 
 import storyscript.App as AppModule
 from storyscript.App import App
+from storyscript.BinaryFormat import BinaryFormat
 from storyscript.Bundle import Bundle
+from storyscript.BundleWriter import BundleWriter
+from storyscript.StoryCache import StoryCache
+from storyscript.Watcher import Watcher
+from storyscript.compiler.semantics.functions.HubMutations import Hub
 from storyscript.exceptions import StoryError
-from storyscript.parser import Grammar
+from storyscript.parser import Grammar, Parser, ParserCache
 
 
 @fixture
@@ -60,18 +66,85 @@ def test_app_compile(patch, bundle):
     patch.object(json, 'dumps')
     result = App.compile('path')
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
     json.dumps.assert_called_with(Bundle.from_path().bundle(), indent=2)
     assert result == json.dumps()
 
 
+def test_app_compile_compact(patch, bundle):
+    patch.object(json, 'dumps')
+    result = App.compile('path', format='compact')
+    json.dumps.assert_called_with(Bundle.from_path().bundle(),
+                                  separators=(',', ':'))
+    assert result == json.dumps()
+
+
+def test_app_compile_binary(patch, bundle):
+    patch.object(BinaryFormat, 'dumps')
+    result = App.compile('path', format='binary')
+    BinaryFormat.dumps.assert_called_with(Bundle.from_path().bundle())
+    assert result == BinaryFormat.dumps()
+
+
+def test_app_compile_format_unknown(patch, bundle):
+    with raises(AssertionError):
+        App.compile('path', format='yaml')
+
+
+def test_app_compile_out(patch, magic, bundle):
+    patch.init(BundleWriter)
+    patch.object(BundleWriter, 'write')
+    out = magic()
+    assert App.compile('path', concise=True, out=out) is None
+    BundleWriter.__init__.assert_called_with(out, concise=True,
+                                             compact=False, memo=None)
+    BundleWriter.write.assert_called_with(Bundle.from_path(), ebnf=None)
+    assert Bundle.from_path().bundle.call_count == 0
+
+
+def test_app_compile_out_compact(patch, magic, bundle):
+    patch.init(BundleWriter)
+    patch.object(BundleWriter, 'write')
+    out = magic()
+    App.compile('path', format='compact', out=out)
+    BundleWriter.__init__.assert_called_with(out, concise=False,
+                                             compact=True, memo=None)
+
+
+def test_app_compile_bundle_memo(patch, magic):
+    patch.init(BundleWriter)
+    patch.object(BundleWriter, 'write')
+    bundle = magic()
+    out = magic()
+    App.compile_bundle(bundle, out=out, memo='memo')
+    BundleWriter.__init__.assert_called_with(out, concise=False,
+                                             compact=False, memo='memo')
+    BundleWriter.write.assert_called_with(bundle, ebnf=None)
+
+
+def test_app_compile_out_binary(patch, magic, bundle):
+    patch.object(BinaryFormat, 'dumps')
+    out = magic()
+    assert App.compile('path', format='binary', out=out) is None
+    out.write.assert_called_with(BinaryFormat.dumps())
+
+
+def test_app_compile_out_first(patch, magic, bundle):
+    patch.object(json, 'dumps')
+    Bundle.from_path().bundle.return_value = {'stories': {'a': 'story'}}
+    out = magic()
+    App.compile('path', first=True, out=out)
+    json.dumps.assert_called_with('story', indent=2)
+    out.write.assert_called_with(json.dumps())
+
+
 def test_app_compile_concise(patch, bundle):
     patch.object(json, 'dumps')
     patch.object(AppModule, '_clean_dict')
     result = App.compile('path', concise=True)
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
     AppModule._clean_dict.assert_called_with(Bundle.from_path().bundle())
     json.dumps.assert_called_with(AppModule._clean_dict(), indent=2)
@@ -82,7 +155,14 @@ def test_app_compile_ignored_path(patch, bundle):
     patch.object(json, 'dumps')
     App.compile('path', ignored_path='ignored')
     Bundle.from_path.assert_called_with('path', ignored_path='ignored',
-                                        features=None)
+                                        features=None, cache=None)
+
+
+def test_app_compile_cache(patch, bundle):
+    patch.object(json, 'dumps')
+    App.compile('path', cache='cache')
+    Bundle.from_path.assert_called_with('path', ignored_path=None,
+                                        features=None, cache='cache')
 
 
 def test_app_compile_ebnf(patch, bundle):
@@ -102,7 +182,7 @@ def test_app_compile_first(patch, bundle):
     patch.object(json, 'dumps')
     result = App.compile('path', first=True)
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
     json.dumps.assert_called_with(42, indent=2)
     assert result == json.dumps()
@@ -122,10 +202,20 @@ def test_app_compile_first_error(patch, bundle):
         'E0055: The option `--first`/-`f` can only be used ' \
         'if one story is complied.'
     Bundle.from_path.assert_called_with('path', ignored_path=None,
-                                        features=None)
+                                        features=None, cache=None)
     Bundle.from_path().bundle.assert_called_with(ebnf=None)
 
 
+def test_app_watch(patch):
+    patch.init(Watcher)
+    patch.object(Watcher, 'watch')
+    result = App.watch('path', ignored_path='ignored', features='features',
+                       cache='cache')
+    Watcher.__init__.assert_called_with('path', ignored_path='ignored',
+                                        features='features', cache='cache')
+    assert result == Watcher.watch()
+
+
 def test_app_lex(bundle):
     result = App.lex('/path', features=None)
     Bundle.from_path.assert_called_with('/path', features=None)
@@ -144,6 +234,63 @@ def test_app_grammar(patch):
     assert App.grammar() == Grammar().build()
 
 
+def test_app_warm_cache(tmpdir, monkeypatch):
+    """
+    Ensures the parser and the parser of string templates are cached, even
+    though the generated parser tables exist
+    """
+    monkeypatch.setenv('STORYSCRIPT_CACHE_DIR', str(tmpdir))
+    assert App.warm_cache() == str(tmpdir)
+    cache = ParserCache()
+    grammar = Parser(cache=False).grammar_key()
+    for start in ('start', 'template'):
+        fingerprint = cache.fingerprint(grammar, 'lalr', start)
+        assert cache.path(fingerprint) in cache.entries()
+
+
+def test_app_warm_cache_ebnf(patch):
+    patch.init(ParserCache)
+    patch.many(ParserCache, ['fingerprint', 'path'])
+    patch.object(AppModule, 'Parser')
+    patch.object(os.path, 'isfile', return_value=True)
+    ParserCache.directory = 'cache'
+    assert App.warm_cache(ebnf='my.ebnf') == 'cache'
+    kwargs = AppModule.Parser.call_args[1]
+    assert kwargs['ebnf'] == 'my.ebnf'
+    assert kwargs['standalone'] is False
+    assert isinstance(kwargs['cache'], ParserCache)
+    AppModule.Parser().template_parser.assert_called_with()
+
+
+def test_app_warm_cache_not_written(tmpdir, monkeypatch, patch):
+    monkeypatch.setenv('STORYSCRIPT_CACHE_DIR', str(tmpdir))
+    patch.object(ParserCache, 'save')
+    assert App.warm_cache() is None
+
+
+def test_app_clear_cache(patch):
+    patch.init(ParserCache)
+    patch.object(ParserCache, 'clear')
+    assert App.clear_cache() == ParserCache.clear()
+
+
+def test_app_clear_story_cache(patch):
+    patch.init(StoryCache)
+    patch.object(StoryCache, 'clear')
+    assert App.clear_story_cache('stories') == StoryCache.clear()
+    StoryCache.__init__.assert_called_with('stories')
+
+
+def test_app_compile_hub(tmpdir):
+    path = tmpdir.join('hub.spec')
+    path.write('int foo -> int\n')
+    output = tmpdir.join('hub.bin')
+    App.compile_hub(str(path), str(output))
+    hub = Hub.from_file(str(output))
+    assert hub.source() is None
+    assert [m.name() for m in hub.mutations()] == ['foo']
+
+
 def test_app_clean_dict():
     assert AppModule._clean_dict(0) == 0
     assert AppModule._clean_dict('a') == 'a'
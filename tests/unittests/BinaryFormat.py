@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import json
+
+from pytest import mark, raises
+
+from storyscript.BinaryFormat import BinaryFormat
+
+
+@mark.parametrize('value', [
+    None, True, False, 0, -1, 2 ** 63 - 1, -2 ** 63, 2 ** 64, -2 ** 100,
+    1.5, -0.25, '', 'a', 'üñí', [], {}, [1, 'a', None],
+    {'a': {'b': [1, 2.5, {'c': 'a'}]}, 'd': 'b', '': True},
+])
+def test_binaryformat_roundtrip(value):
+    data = BinaryFormat.dumps(value)
+    assert data.startswith(BinaryFormat.magic)
+    result = BinaryFormat.loads(data)
+    assert result == value
+    assert type(result) is type(value)
+
+
+def test_binaryformat_tuple():
+    assert BinaryFormat.loads(BinaryFormat.dumps((1, 2))) == [1, 2]
+
+
+def test_binaryformat_strings_shared():
+    """
+    Ensures that repeated strings and map shapes are only stored once
+    """
+    one = len(BinaryFormat.dumps([{'method': 'method'}]))
+    many = len(BinaryFormat.dumps([{'method': 'method'}] * 10))
+    # map tag, shape index, string tag and string index
+    assert many - one == 9 * (1 + 4 + 1 + 4)
+
+
+def test_binaryformat_shapes():
+    value = [{'a': 1, 'b': 2}, {'b': 3, 'a': 4}, {'a': 5, 'b': 6}, {'a': 7}]
+    result = BinaryFormat.loads(BinaryFormat.dumps(value))
+    assert result == value
+    assert [list(item) for item in result] == [list(item) for item in value]
+
+
+def test_binaryformat_json():
+    value = {'stories': {'a.story': {'tree': {'1': {'ln': '1', 'x': 1.0}}}},
+             'services': ['alpine'], 'entrypoint': ['a.story']}
+    result = BinaryFormat.loads(BinaryFormat.dumps(value))
+    assert result == json.loads(json.dumps(value))
+
+
+def test_binaryformat_dumps_key():
+    with raises(TypeError):
+        BinaryFormat.dumps({1: 'a'})
+
+
+def test_binaryformat_dumps_type():
+    with raises(TypeError):
+        BinaryFormat.dumps({'a': object()})
+
+
+def test_binaryformat_loads_magic():
+    with raises(ValueError, match='not a compiled bundle'):
+        BinaryFormat.loads(b'{"a": 1}')
+
+
+def test_binaryformat_loads_version():
+    data = bytearray(BinaryFormat.dumps(None))
+    data[len(BinaryFormat.magic)] = 0
+    with raises(ValueError, match='unsupported bundle version 0'):
+        BinaryFormat.loads(bytes(data))
+
+
+@mark.parametrize('data', [
+    BinaryFormat.magic,
+    BinaryFormat.dumps(None) + b'N',
+    BinaryFormat.dumps(None)[:-1],
+])
+def test_binaryformat_loads_size(data):
+    with raises(ValueError, match='invalid bundle size'):
+        BinaryFormat.loads(data)
+
+
+def test_binaryformat_loads_tag():
+    data = bytearray(BinaryFormat.dumps(None))
+    data[-1] = ord('x')
+    with raises(ValueError, match='invalid tag 120'):
+        BinaryFormat.loads(bytes(data))
+
+
+def test_binaryformat_loads_truncated():
+    """
+    Ensures that values which are missing from a column are an error
+    """
+    data = bytearray(BinaryFormat.dumps(None))
+    data[-1] = ord('s')
+    with raises(ValueError, match='truncated bundle'):
+        BinaryFormat.loads(bytes(data))
+
+
+def test_binaryformat_loads_string_index():
+    data = bytearray(BinaryFormat.dumps('a'))
+    data[-4:] = bytes([1, 0, 0, 0])
+    with raises(ValueError, match='invalid string index'):
+        BinaryFormat.loads(bytes(data))
+
+
+def test_binaryformat_loads_trailing():
+    data = bytearray(BinaryFormat.dumps([None]))
+    # the list is empty, but the item is still there
+    assert data.endswith(bytes([1, 0, 0, 0]))
+    data[-4:] = bytes(4)
+    with raises(ValueError, match='trailing data'):
+        BinaryFormat.loads(bytes(data))
@@ -1,14 +1,18 @@
 # -*- coding: utf-8 -*-
 import os
 import subprocess
-from unittest.mock import ANY
+from unittest.mock import ANY, call
 
-from pytest import fixture
+from pytest import fixture, mark, raises
 
 from storyscript.Bundle import Bundle
 from storyscript.Features import Features
 from storyscript.Story import Story
-from storyscript.parser import Parser
+from storyscript.StoryCache import CachedStory
+from storyscript.StoryPool import StoryPool
+from storyscript.compiler.lowering import TemplateCache
+from storyscript.exceptions import StoryError
+from storyscript.parser import Parser, Tree, TreePickler
 
 
 @fixture
@@ -19,6 +23,8 @@ def bundle(patch):
 def test_bundle_init(bundle):
     assert bundle.stories == {}
     assert bundle.story_files == {}
+    assert bundle.cache is None
+    assert isinstance(bundle.templates, TemplateCache)
 
 
 def test_bundle_init_files():
@@ -147,6 +153,13 @@ def test_bundle_from_path_directory_ignored(patch):
     Bundle.parse_directory.assert_called_with('path', ignored_path='ignored')
 
 
+def test_bundle_from_path_cache(patch):
+    patch.object(os.path, 'isdir', return_value=False)
+    patch.object(Bundle, 'load_story')
+    result = Bundle.from_path('path', cache='cache')
+    assert result.cache == 'cache'
+
+
 def test_bundle_load_story(patch, bundle):
     """
     Ensures Bundle.load_story can load a story
@@ -155,7 +168,8 @@ def test_bundle_load_story(patch, bundle):
     patch.init(Features)
     bundle.story_files['one.story'] = 'hello'
     result = bundle.load_story('one.story')
-    Story.__init__.assert_called_with('hello', features=ANY)
+    Story.__init__.assert_called_with('hello', features=ANY,
+                                      templates=bundle.templates)
     assert isinstance(Story.__init__.call_args[1]['features'], Features)
     assert isinstance(result, Story)
 
@@ -192,28 +206,289 @@ def test_bundle_services_no_duplicates(bundle):
     assert result == ['one']
 
 
-def test_bundle_parse(patch, bundle):
-    parse = bundle.parse
-    patch.many(Bundle, ['parse', 'load_story'])
-    parse(['one.story'], None, lower=False)
-    Bundle.load_story.assert_called_with('one.story')
-    story = Bundle.load_story()
-    Bundle.parse.assert_called_with(story.modules(), parser=None, lower=False)
-    assert bundle.stories['one.story'] == story.tree
+@fixture
+def imports(patch, magic):
+    """
+    Makes stories with the modules of `imports`.
+    """
+    def load_story(path):
+        if path not in stories:
+            story = magic(spec=Story, path=path, tree=magic(),
+                          compiled=magic())
+            story.modules.return_value = graph.get(path, [])
+            stories[path] = story
+        return stories[path]
+    graph = {}
+    stories = {}
+    patch.object(Bundle, 'load_story', side_effect=load_story)
+    return graph
 
 
-def test_bundle_compile(mocker, patch, bundle):
-    compile = bundle.compile
-    patch.many(Bundle, ['compile', 'load_story'])
-    patch.many(Story, ['parse'])
+def loaded():
+    return [args[0] for args, kwargs in Bundle.load_story.call_args_list]
+
+
+def load(imports):
+    """
+    Loads the upper case path of a story and its modules from `imports`.
+    """
+    def load(storypath):
+        loads.append(storypath)
+        return storypath.upper(), imports.get(storypath, [])
+    loads = []
+    load.loads = loads
+    return load
+
+
+def test_bundle_parsed_story(bundle, imports):
+    imports['one.story'] = ['two.story']
+    story, modules = bundle.parsed_story('one.story', 'parser', lower=True)
+    assert story == Bundle.load_story('one.story')
+    story.parse.assert_called_with(parser='parser', lower=True)
+    assert modules == ['two.story']
+
+
+def test_bundle_import_graph(bundle):
+    loader = load({'one.story': ['two.story', 'three.story'],
+                   'two.story': ['three.story']})
+    graph = bundle.import_graph(['one.story'], loader)
+    assert graph == {'three.story': 'THREE.STORY', 'two.story': 'TWO.STORY',
+                     'one.story': 'ONE.STORY'}
+    assert list(graph) == ['three.story', 'two.story', 'one.story']
+    assert loader.loads == ['one.story', 'two.story', 'three.story']
+
+
+def test_bundle_import_graph_diamond(bundle):
+    """
+    Ensures that stories which are imported several times are loaded once
+    """
+    loader = load({'one.story': ['left.story', 'right.story'],
+                   'left.story': ['base.story'],
+                   'right.story': ['base.story']})
+    graph = bundle.import_graph(['one.story', 'right.story'], loader)
+    assert list(graph) == ['base.story', 'left.story', 'right.story',
+                           'one.story']
+    assert sorted(loader.loads) == sorted(graph)
+
+
+@mark.parametrize('stories, cycle', [
+    ({'one.story': ['one.story']}, 'one.story -> one.story'),
+    ({'one.story': ['two.story'], 'two.story': ['three.story'],
+      'three.story': ['two.story']},
+     'two.story -> three.story -> two.story'),
+])
+def test_bundle_import_graph_cycle(bundle, stories, cycle):
+    with raises(StoryError) as e:
+        bundle.import_graph(['one.story'], load(stories))
+    assert e.value.error.error == 'import_cycle'
+    assert e.value.message().endswith(
+        f'Stories can not import each other in a cycle: {cycle}')
+
+
+def test_bundle_story_pool(patch, bundle):
+    patch.init(StoryPool)
+    assert bundle.story_pool(['one.story', 'two.story'], None) is None
+    bundle.features = Features({'jobs': 2})
+    assert bundle.story_pool(['one.story'], None) is None
+    pool = bundle.story_pool(['one.story', 'two.story'], 'parser')
+    assert isinstance(pool, StoryPool)
+    StoryPool.__init__.assert_called_with(2, 'parser', bundle.features)
+
+
+def test_bundle_parse(patch, bundle, imports):
+    imports['one.story'] = ['two.story']
+    bundle.parse(['one.story'], 'parser', lower=True)
+    assert loaded() == ['one.story', 'two.story']
+    assert bundle.stories == {
+        'two.story': Bundle.load_story('two.story').tree,
+        'one.story': Bundle.load_story('one.story').tree,
+    }
+    Bundle.load_story('two.story').parse.assert_called_with(parser='parser',
+                                                            lower=True)
+
+
+def test_bundle_parse_pool(patch, magic, bundle, imports):
+    """
+    Ensures that stories which can't be parsed by the pool are parsed again
+    """
+    pool = magic()
+    pool.__enter__.return_value = pool
+    pool.parse.return_value = {
+        'one.story': (['two.story'], TreePickler.dumps(Tree('start', []))),
+        'two.story': None,
+    }
+    patch.object(Bundle, 'story_pool', return_value=pool)
+    bundle.parse(['one.story'], 'parser', lower=True)
+    Bundle.story_pool.assert_called_with(['one.story'], 'parser')
+    pool.parse.assert_called_with(bundle, ['one.story'], lower=True)
+    assert pool.__exit__.call_count == 1
+    assert loaded() == ['two.story']
+    assert bundle.stories == {
+        'two.story': Bundle.load_story('two.story').tree,
+        'one.story': Tree('start', []),
+    }
+
+
+def test_bundle_compiled_stories(bundle, imports):
+    imports['one.story'] = ['two.story']
+    result = bundle.compiled_stories(['one.story'], parser='parser')
+    two = Bundle.load_story('two.story')
+    assert next(result) == ('two.story', two.compiled)
+    two.compile.assert_called()
+    one = Bundle.load_story('one.story')
+    assert one.compile.call_count == 0
+    assert list(result) == [('one.story', one.compiled)]
+    one.parse.assert_called_with(parser='parser', lower=False)
+
+
+def test_bundle_compiled_stories_pool(patch, magic, bundle, imports):
+    """
+    Ensures that stories which can't be compiled by the pool are compiled
+    again, s.t. they raise their errors
+    """
+    pool = magic()
+    pool.__enter__.return_value = pool
+    pool.compile.return_value = {
+        'one.story': (['two.story', 'three.story'], 'one'),
+        'two.story': (['three.story'], None),
+        'three.story': None,
+    }
+    patch.object(Bundle, 'story_pool', return_value=pool)
+    result = list(bundle.compiled_stories(['one.story'], parser=None))
+    pool.compile.assert_called_with(bundle, ['one.story'], cached=None)
+    assert result == [
+        ('three.story', Bundle.load_story('three.story').compiled),
+        ('two.story', Bundle.load_story('two.story').compiled),
+        ('one.story', 'one'),
+    ]
+    assert Bundle.load_story('two.story').compile.call_count == 1
+
+
+@fixture
+def cache(magic, bundle):
+    """
+    A cache whose keys are readable.
+    """
+    cache = magic()
+    cache.features_key.return_value = 'features'
+    cache.source_key.side_effect = lambda source, features: source.upper()
+    cache.key.side_effect = lambda key, modules: '+'.join([key] + modules)
+    cache.load.return_value = None
+    bundle.cache = cache
+    return cache
 
-    compile(['one.story'], parser=None)
-    Bundle.load_story.assert_called_with('one.story')
 
-    story = Bundle.load_story()
-    Bundle.compile.assert_called_with(story.modules(), parser=None)
-    story.compile.assert_called()
-    assert bundle.stories['one.story'] == story.compiled
+def test_bundle_source_key(magic, bundle, cache):
+    bundle.story_files['one.story'] = 'one'
+    assert bundle.source_key('one.story') == 'ONE'
+    assert bundle.source_key('one.story') == 'ONE'
+    cache.features_key.assert_called_once_with(bundle.features)
+    cache.source_key.assert_called_once_with('one', 'features')
+
+
+def test_bundle_caches(bundle, cache):
+    assert bundle.caches(None) is True
+    assert bundle.caches('parser') is False
+
+
+def test_bundle_caches_no_cache(bundle):
+    assert bundle.caches(None) is False
+
+
+def test_bundle_cached_story(bundle, cache):
+    bundle.story_files['one.story'] = 'one'
+    assert bundle.cached_story('one.story') == cache.load.return_value
+    cache.load.assert_called_with('ONE')
+
+
+def test_bundle_cached_story_no_cache(bundle):
+    assert bundle.cached_story('one.story') is None
+
+
+def test_bundle_cache_keys(bundle, cache):
+    bundle.story_files.update({'one.story': 'one', 'two.story': 'two'})
+    graph = {'two.story': None, 'one.story': None}
+    imports = {'two.story': [], 'one.story': ['two.story']}
+    assert bundle.cache_keys(graph, imports) == {'two.story': 'TWO',
+                                                 'one.story': 'ONE+TWO'}
+
+
+def test_bundle_cache_keys_no_cache(bundle):
+    assert bundle.cache_keys({'one.story': None}, {'one.story': []}) == {}
+
+
+def test_bundle_outdated():
+    graph = {'one.story': CachedStory('one', [], 'one'),
+             'two.story': CachedStory('old', [], 'two'),
+             'three.story': 'three'}
+    keys = {'one.story': 'one', 'two.story': 'two', 'three.story': 'three'}
+    assert Bundle.outdated(graph, keys) == ['two.story']
+
+
+def test_bundle_compiled_stories_cache(patch, bundle, imports, cache):
+    """
+    Ensures that cached stories are used unless a module has changed, and
+    that compiled stories are saved
+    """
+    imports['one.story'] = ['two.story']
+    imports['three.story'] = ['two.story']
+    patch.object(Bundle, 'source_key', side_effect=lambda path: path[:-6])
+    entries = {
+        'one': CachedStory('one+two', ['two.story'], 'one'),
+        'three': CachedStory('three', ['two.story'], 'three'),
+    }
+    cache.load.side_effect = entries.get
+    stories = ['one.story', 'three.story']
+    result = list(bundle.compiled_stories(stories, parser=None))
+    two = Bundle.load_story('two.story')
+    three = Bundle.load_story('three.story')
+    assert result == [('two.story', two.compiled), ('one.story', 'one'),
+                      ('three.story', three.compiled)]
+    assert Bundle.load_story('one.story').compile.call_count == 0
+    assert cache.save.call_args_list == [
+        call('two', 'two', [], two.compiled),
+        call('three', 'three+two', ['two.story'], three.compiled),
+    ]
+    cache.evict.assert_called()
+
+
+def test_bundle_compiled_stories_cache_pool(patch, magic, bundle, imports,
+                                            cache):
+    """
+    Ensures that the pool compiles outdated stories again
+    """
+    pool = magic()
+    pool.__enter__.return_value = pool
+    pool.compile.side_effect = [
+        {'one.story': (['two.story'], CachedStory('one', ['two.story'], 'a')),
+         'two.story': ([], 'two')},
+        {'one.story': (['two.story'], 'one')},
+    ]
+    patch.object(Bundle, 'story_pool', return_value=pool)
+    patch.object(Bundle, 'source_key', side_effect=lambda path: path[:-6])
+    result = list(bundle.compiled_stories(['one.story'], parser=None))
+    pool.compile.assert_called_with(bundle, ['one.story'], imports=False)
+    assert result == [('two.story', 'two'), ('one.story', 'one')]
+    assert cache.save.call_count == 2
+
+
+def test_bundle_compiled_stories_cache_ebnf(bundle, imports, cache):
+    """
+    Ensures that stories parsed with a custom grammar aren't cached
+    """
+    result = list(bundle.compiled_stories(['one.story'], parser='parser'))
+    assert result == [('one.story', Bundle.load_story('one.story').compiled)]
+    assert cache.load.call_count == 0
+    assert cache.save.call_count == 0
+    assert cache.evict.call_count == 0
+
+
+def test_bundle_compile(patch, bundle):
+    patch.object(Bundle, 'compiled_stories',
+                 return_value=[('one.story', 'one'), ('two.story', 'two')])
+    bundle.compile(['one.story'], parser=None)
+    Bundle.compiled_stories.assert_called_with(['one.story'], None)
+    assert bundle.stories == {'one.story': 'one', 'two.story': 'two'}
 
 
 def test_bundle_bundle(patch, bundle):
@@ -309,3 +584,12 @@ def test_bundle_parser_ebnf(patch, bundle):
     result = bundle.parser(ebnf='ebnf')
     Parser.__init__.assert_called_with(ebnf='ebnf')
     assert isinstance(result, Parser)
+
+
+def test_bundle_parser_ebnf_once(patch, bundle):
+    """
+    Ensures Bundle.parser builds the parser of a grammar only once
+    """
+    patch.init(Parser)
+    assert bundle.parser(ebnf='ebnf') is bundle.parser(ebnf='ebnf')
+    assert Parser.__init__.call_count == 1
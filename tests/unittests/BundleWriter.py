@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+from pytest import mark, raises
+
+from storyscript.Bundle import Bundle
+from storyscript.BundleWriter import BundleWriter, _clean_dict
+from storyscript.exceptions import StoryError
+
+
+story_files = {
+    'one.story': ('x = alpine echo message: "a\\nb"\n'
+                  'if x\n    y = [] as List[int]\n'),
+    'two.story': 'function f returns int\n    return 1\nz = {}\n',
+}
+
+
+def write(bundle, **kwargs):
+    out = io.StringIO()
+    BundleWriter(out, **kwargs).write(bundle)
+    return out.getvalue()
+
+
+@mark.parametrize('files', [story_files, {}])
+@mark.parametrize('concise', [False, True])
+def test_bundlewriter_json(files, concise):
+    result = Bundle(story_files=dict(files)).bundle()
+    if concise:
+        result = _clean_dict(result)
+    expected = json.dumps(result, indent=2)
+    assert write(Bundle(story_files=dict(files)), concise=concise) == expected
+
+
+@mark.parametrize('files', [story_files, {}])
+@mark.parametrize('concise', [False, True])
+def test_bundlewriter_compact(files, concise):
+    result = Bundle(story_files=dict(files)).bundle()
+    if concise:
+        result = _clean_dict(result)
+    expected = json.dumps(result, separators=(',', ':'))
+    bundle = Bundle(story_files=dict(files))
+    assert write(bundle, concise=concise, compact=True) == expected
+
+
+def test_bundlewriter_services(patch, magic):
+    bundle = magic()
+    bundle.find_stories.return_value = ['a.story', 'c.story']
+    bundle.compiled_stories.return_value = iter([
+        ('b.story', {'services': ['b', 'a']}),
+        ('a.story', {'services': ['a']}),
+        ('c.story', {'services': []}),
+    ])
+    expected = {
+        'stories': {'b.story': {'services': ['b', 'a']},
+                    'a.story': {'services': ['a']},
+                    'c.story': {'services': []}},
+        'services': ['a', 'b'],
+        'entrypoint': ['a.story', 'c.story'],
+    }
+    assert json.loads(write(bundle)) == expected
+    bundle.compiled_stories.assert_called_with(['a.story', 'c.story'],
+                                               bundle.parser())
+
+
+def test_bundlewriter_object_nested():
+    out = io.StringIO()
+    writer = BundleWriter(out)
+    writer.object(iter([('a', iter([('b', [1, {'c': 'd'}])])), ('e', {})]),
+                  0)
+    expected = {'a': {'b': [1, {'c': 'd'}]}, 'e': {}}
+    assert out.getvalue() == json.dumps(expected, indent=2)
+
+
+def test_bundlewriter_error():
+    """
+    Ensures that nothing is written when the bundle can't be parsed
+    """
+    out = io.StringIO()
+    bundle = Bundle(story_files={'one.story': 'x = = 1\n'})
+    with raises(StoryError):
+        BundleWriter(out).write(bundle)
+    assert out.getvalue() == ''
+
+
+@mark.parametrize('compact', [False, True])
+@mark.parametrize('concise', [False, True])
+def test_bundlewriter_memo(patch, compact, concise):
+    """
+    Ensures that stories which are still the same objects are written from
+    the memo and that removed stories are dropped from it
+    """
+    bundle = Bundle(story_files=dict(story_files))
+    expected = write(bundle, concise=concise, compact=compact)
+    stories = list(bundle.compiled_stories(bundle.find_stories(), None))
+    patch.object(Bundle, 'compiled_stories', return_value=stories)
+    memo = {}
+    options = dict(concise=concise, compact=compact, memo=memo)
+    assert write(bundle, **options) == expected
+    assert sorted(memo) == ['one.story', 'two.story']
+    patch.object(BundleWriter, 'encode', side_effect=BundleWriter.encode,
+                 autospec=True)
+    assert write(bundle, **options) == expected
+    encoded = [args[1] for args, kwargs in BundleWriter.encode.call_args_list]
+    assert stories[0][1] not in encoded
+    assert stories[1][1] not in encoded
+    Bundle.compiled_stories.return_value = stories[:1]
+    write(bundle, **options)
+    assert list(memo) == [stories[0][0]]
+
+
+def test_bundlewriter_memo_changed():
+    """
+    Ensures that stories are encoded again once they have changed
+    """
+    memo = {}
+    writer = BundleWriter(io.StringIO(), compact=True, memo=memo)
+    assert writer.story('a.story', {'tree': {'a': 1}}) == '{"tree":{"a":1}}'
+    changed = {'tree': {'a': 2}}
+    assert writer.story('a.story', changed) == '{"tree":{"a":2}}'
+    assert memo['a.story'][0] is changed
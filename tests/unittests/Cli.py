@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
-import io
 import os
+import stat
+from unittest.mock import ANY, call
 
 import click
 from click.testing import CliRunner
@@ -10,6 +11,7 @@ from pytest import fixture, mark
 from storyscript.App import App
 from storyscript.Cli import Cli
 from storyscript.Project import Project
+from storyscript.StoryCache import StoryCache
 from storyscript.Version import version
 from storyscript.exceptions.CompilerError import CompilerError
 from storyscript.exceptions.StoryError import StoryError
@@ -98,7 +100,8 @@ def test_cli_compile_with_ignore_option(runner, app):
                                 '--ignore', 'path/sub_dir/my_fake.story'])
     App.compile.assert_called_with('path/fake.story', ebnf=None,
                                    ignored_path='path/sub_dir/my_fake.story',
-                                   concise=False, first=False, features={})
+                                   concise=False, first=False, features={},
+                                   format='json', cache=ANY)
 
 
 def test_cli_parse_with_ignore_option(runner, app):
@@ -159,6 +162,13 @@ def test_cli_parse_lower(runner, echo, app):
                                  ignored_path=None, lower=True, features={})
 
 
+def test_cli_parse_jobs(runner, echo, app):
+    runner.invoke(Cli.parse, ['--jobs=4'])
+    App.parse.assert_called_with(os.getcwd(), ebnf=None,
+                                 ignored_path=None, lower=False,
+                                 features={'jobs': 4})
+
+
 def test_cli_parse_features(runner, echo, app):
     """
     Ensures the parse command accepts features
@@ -212,6 +222,23 @@ def test_cli_parse_features_unknown(runner, echo, app):
     )
 
 
+@mark.parametrize('flag,name', [
+    ('jobs', 'jobs'), ('+jobs', 'jobs'), ('-jobs', 'jobs'),
+    ('hub', 'hub'), ('-hub', 'hub'),
+])
+def test_cli_parse_features_setting(runner, echo, app, flag, name):
+    """
+    Ensures features which take a value aren't preview flags
+    """
+    e = runner.invoke(Cli.parse, [f'--preview={flag}'])
+    App.parse.assert_not_called()
+    assert e.exit_code == 1
+    click.echo.assert_called_with(
+        'E0078: Invalid preview flag. '
+        f'`{name}` is not a valid preview feature.'
+    )
+
+
 def test_cli_parse_debug(runner, echo, app):
     """
     Ensures the parse command supports raises errors with debug=True
@@ -268,7 +295,8 @@ def test_cli_compile(patch, runner, echo, app):
     runner.invoke(Cli.compile, [])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
     click.style.assert_called_with('Script syntax passed!', fg='green')
     click.echo.assert_called_with(click.style())
 
@@ -280,17 +308,121 @@ def test_cli_compile_path(patch, runner, app):
     runner.invoke(Cli.compile, ['/path'])
     App.compile.assert_called_with('/path', ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
+
+
+def test_cli_compile_cache(runner, app):
+    """
+    Ensures the compile command uses the story cache when asked to
+    """
+    runner.invoke(Cli.compile, ['/path', '--cache'])
+    cache = App.compile.call_args[1]['cache']
+    assert isinstance(cache, StoryCache)
+    assert cache.directory == StoryCache.default_directory()
+
+
+def test_cli_compile_cache_dir(runner, app):
+    runner.invoke(Cli.compile, ['/path', '--cache-dir', 'stories'])
+    assert App.compile.call_args[1]['cache'].directory == 'stories'
+
+
+def test_cli_compile_no_cache(runner, app):
+    runner.invoke(Cli.compile, ['/path'])
+    assert App.compile.call_args[1]['cache'] is None
 
 
-def test_cli_compile_output_file(patch, runner, app):
+def test_cli_compile_output_file(runner, app, tmpdir):
     """
     Ensures the compile command supports specifying an output file.
     """
-    patch.object(io, 'open')
-    runner.invoke(Cli.compile, ['/path', 'hello.story', '-j'])
-    io.open.assert_called_with('hello.story', 'w')
-    io.open().__enter__().write.assert_called_with(App.compile())
+    def compile(*args, out, **kwargs):
+        out.write('{}')
+
+    App.compile.side_effect = compile
+    output = tmpdir.join('hello.json')
+    runner.invoke(Cli.compile, ['/path', str(output), '-j'])
+    App.compile.assert_called_with('/path', out=ANY, ebnf=None,
+                                   ignored_path=None, concise=False,
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
+    assert output.read() == '{}'
+    assert tmpdir.listdir() == [output]
+
+
+def test_cli_compile_output_file_mode(runner, app, tmpdir):
+    """
+    Ensures that the permissions of a previous output file are kept
+    """
+    output = tmpdir.join('hello.json')
+    output.write('old')
+    output.chmod(0o640)
+    runner.invoke(Cli.compile, ['/path', str(output), '-j'])
+    assert stat.S_IMODE(output.stat().mode) == 0o640
+
+
+def test_cli_compile_output_file_error(runner, app, tmpdir):
+    """
+    Ensures that a previous output file is kept on errors and that the
+    partially written output is removed
+    """
+    def compile(*args, out, **kwargs):
+        out.write('{"stories": {')
+        raise Exception('ICE')
+
+    App.compile.side_effect = compile
+    output = tmpdir.join('hello.json')
+    output.write('old')
+    e = runner.invoke(Cli.compile, ['/path', str(output), '-j'])
+    assert e.exit_code == 1
+    assert output.read() == 'old'
+    assert tmpdir.listdir() == [output]
+
+
+@mark.parametrize('option', ['--watch', '-w'])
+def test_cli_compile_watch(patch, runner, echo, app, option):
+    """
+    Ensures --watch compiles the bundle whenever it changes
+    """
+    patch.object(App, 'watch', return_value=iter(['one', 'two']))
+    patch.object(App, 'compile_bundle')
+    patch.object(click, 'style')
+    runner.invoke(Cli.compile, ['/path', option])
+    App.watch.assert_called_with('/path', ignored_path=None, features={},
+                                 cache=None)
+    memo = App.compile_bundle.call_args[1]['memo']
+    assert App.compile_bundle.call_args_list == [
+        call(bundle, memo=memo, ebnf=None, concise=False, first=False,
+             format='json') for bundle in ['one', 'two']
+    ]
+    assert App.compile.call_count == 0
+    assert click.echo.call_count == 2
+
+
+def test_cli_compile_watch_json(patch, runner, app):
+    patch.object(App, 'watch', return_value=iter(['one']))
+    patch.object(App, 'compile_bundle')
+    patch.object(click, 'get_text_stream')
+    runner.invoke(Cli.compile, ['--watch', '-j'])
+    App.compile_bundle.assert_called_with('one', out=ANY, memo={},
+                                          ebnf=None, concise=False,
+                                          first=False, format='json')
+    click.get_text_stream().write.assert_called_with('\n')
+
+
+def test_cli_compile_watch_error(patch, runner, app):
+    """
+    Ensures that errors are shown until the stories change again
+    """
+    patch.object(App, 'watch', return_value=iter(['one', 'two']))
+    patch.object(App, 'compile_bundle')
+    patch.object(StoryError, 'echo')
+    error = StoryError.create_error('first_option_more_stories')
+    App.compile_bundle.side_effect = [error, None]
+    result = runner.invoke(Cli.compile, ['--watch'])
+    assert result.exit_code == 0
+    assert StoryError.echo.call_count == 1
+    assert App.compile_bundle.call_count == 2
 
 
 @mark.parametrize('option', ['--silent', '-s'])
@@ -301,7 +433,8 @@ def test_cli_compile_silent(runner, echo, app, option):
     result = runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
     assert result.output == ''
     assert click.echo.call_count == 0
 
@@ -314,7 +447,8 @@ def test_cli_compile_concise(runner, echo, app, option):
     runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=True,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
 
 
 @mark.parametrize('option', ['--first', '-f'])
@@ -325,40 +459,122 @@ def test_cli_compile_first(runner, echo, app, option):
     runner.invoke(Cli.compile, [option])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=True, features={})
+                                   first=True, features={}, format='json',
+                                   cache=ANY)
 
 
 def test_cli_compile_debug(runner, echo, app):
     runner.invoke(Cli.compile, ['--debug'])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
 
 
 def test_cli_compile_features(runner, echo, app):
     runner.invoke(Cli.compile, ['--preview=globals'])
     App.compile.assert_called_with(os.getcwd(), ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={'globals': True})
+                                   first=False, features={'globals': True},
+                                   format='json', cache=ANY)
+
+
+def test_cli_compile_jobs(runner, echo, app):
+    runner.invoke(Cli.compile, ['--jobs=4'])
+    App.compile.assert_called_with(os.getcwd(), ebnf=None,
+                                   ignored_path=None, concise=False,
+                                   first=False, features={'jobs': 4},
+                                   format='json', cache=ANY)
+
+
+def test_cli_compile_hub(runner, echo, app):
+    runner.invoke(Cli.compile, ['--hub=hub.spec'])
+    App.compile.assert_called_with(os.getcwd(), ebnf=None,
+                                   ignored_path=None, concise=False,
+                                   first=False, features={'hub': 'hub.spec'},
+                                   format='json', cache=ANY)
 
 
 @mark.parametrize('option', ['--json', '-j'])
-def test_cli_compile_json(runner, echo, app, option):
+def test_cli_compile_json(patch, runner, echo, app, option):
     """
     Ensures --json outputs json
     """
+    patch.object(click, 'get_text_stream')
+
+    def compile(*args, out, **kwargs):
+        out.write('{}')
+
+    App.compile.side_effect = compile
     runner.invoke(Cli.compile, [option])
-    App.compile.assert_called_with(os.getcwd(), ebnf=None,
+    App.compile.assert_called_with(os.getcwd(), out=ANY, ebnf=None,
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
-    click.echo.assert_called_with(App.compile())
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
+    click.get_text_stream.assert_called_with('stdout')
+    stdout = click.get_text_stream()
+    assert App.compile.call_args[1]['out'] == stdout
+    assert stdout.write.call_args_list == [call('{}'), call('\n')]
+    stdout.flush.assert_called()
+
+
+def test_cli_compile_json_error(patch, runner, echo, app):
+    """
+    Ensures that the output isn't completed when a story fails to compile
+    after others have been written
+    """
+    patch.object(click, 'get_text_stream')
+
+    def compile(*args, out, **kwargs):
+        out.write('{"stories": {')
+        raise StoryError(None, None)
+
+    App.compile.side_effect = compile
+    e = runner.invoke(Cli.compile, ['-j'])
+    assert e.exit_code == 1
+    stdout = click.get_text_stream()
+    stdout.write.assert_called_once_with('{"stories": {')
+
+
+@mark.parametrize('format', ['json', 'compact', 'binary'])
+def test_cli_compile_format(patch, runner, echo, app, format):
+    patch.many(click, ['get_text_stream', 'get_binary_stream'])
+    runner.invoke(Cli.compile, ['--format', format])
+    App.compile.assert_called_with(os.getcwd(), out=ANY, ebnf=None,
+                                   ignored_path=None, concise=False,
+                                   first=False, features={}, format=format,
+                                   cache=ANY)
+    out = App.compile.call_args[1]['out']
+    if format == 'binary':
+        click.get_binary_stream.assert_called_with('stdout')
+        assert out == click.get_binary_stream()
+        click.get_binary_stream().write.assert_not_called()
+    else:
+        click.get_text_stream.assert_called_with('stdout')
+        assert out == click.get_text_stream()
+        click.get_text_stream().write.assert_called_with('\n')
+
+
+def test_cli_compile_format_binary_output_file(runner, app, tmpdir):
+    def compile(*args, out, **kwargs):
+        out.write(b'\x00')
+
+    App.compile.side_effect = compile
+    output = tmpdir.join('hello.bin')
+    runner.invoke(Cli.compile, ['/path', str(output), '--format=binary'])
+    assert output.read_binary() == b'\x00'
+    App.compile.assert_called_with('/path', out=ANY, ebnf=None,
+                                   ignored_path=None, concise=False,
+                                   first=False, features={}, format='binary',
+                                   cache=ANY)
 
 
 def test_cli_compile_ebnf(runner, echo, app):
     runner.invoke(Cli.compile, ['--ebnf', 'test.ebnf'])
     App.compile.assert_called_with(os.getcwd(), ebnf='test.ebnf',
                                    ignored_path=None, concise=False,
-                                   first=False, features={})
+                                   first=False, features={}, format='json',
+                                   cache=ANY)
 
 
 def test_cli_compile_ice(runner, echo, app):
@@ -503,6 +719,50 @@ def test_cli_grammar(patch, runner, app, echo):
     click.echo.assert_called_with(app.grammar())
 
 
+def test_cli_cache(patch, runner, echo):
+    patch.object(App, 'warm_cache', return_value='cache')
+    runner.invoke(Cli.cache, [])
+    App.warm_cache.assert_called_with(ebnf=None)
+    click.echo.assert_called_with('Parser cached in cache')
+
+
+def test_cli_cache_not_written(patch, runner, echo):
+    patch.object(App, 'warm_cache', return_value=None)
+    e = runner.invoke(Cli.cache, [])
+    assert e.exit_code == 1
+    message = click.style('The parser could not be cached', fg='red')
+    click.echo.assert_called_with(message)
+
+
+def test_cli_cache_ebnf(patch, runner, echo):
+    patch.object(App, 'warm_cache')
+    runner.invoke(Cli.cache, ['--ebnf', 'my.ebnf'])
+    App.warm_cache.assert_called_with(ebnf='my.ebnf')
+
+
+def test_cli_cache_clear(patch, runner, echo):
+    patch.object(App, 'clear_cache', return_value=1)
+    patch.object(App, 'clear_story_cache', return_value=2)
+    runner.invoke(Cli.cache, ['--clear'])
+    assert App.clear_cache.call_count == 1
+    App.clear_story_cache.assert_called_with(None)
+    message = 'Removed 1 cached parser(s) and 2 cached story(s)'
+    click.echo.assert_called_with(message)
+
+
+def test_cli_cache_clear_cache_dir(patch, runner, echo):
+    patch.many(App, ['clear_cache', 'clear_story_cache'])
+    runner.invoke(Cli.cache, ['--clear', '--cache-dir', 'stories'])
+    App.clear_story_cache.assert_called_with('stories')
+
+
+def test_cli_hub(patch, runner, echo):
+    patch.object(App, 'compile_hub')
+    runner.invoke(Cli.hub, ['hub.spec', 'hub.bin'])
+    App.compile_hub.assert_called_with('hub.spec', 'hub.bin')
+    click.echo.assert_called_with('Hub compiled to hub.bin')
+
+
 def test_cli_new(patch, runner):
     """
     Ensures Cli.new uses Project.new
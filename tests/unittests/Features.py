@@ -1,5 +1,31 @@
+import os
+
 from storyscript.Features import Features
 
 
 def test_features_str():
     assert str(Features(None)).startswith('Features(')
+
+
+def test_features_cpus(patch):
+    patch.object(os, 'sched_getaffinity', return_value={0, 1, 2})
+    assert Features.cpus() == 3
+
+
+def test_features_cpus_count(monkeypatch):
+    monkeypatch.delattr(os, 'sched_getaffinity', raising=False)
+    monkeypatch.setattr(os, 'cpu_count', lambda: None)
+    assert Features.cpus() == 1
+
+
+def test_features_processes(patch):
+    patch.object(Features, 'cpus', return_value=4)
+    assert Features({'jobs': 2}).processes() == 2
+    assert Features({'jobs': 8}).processes() == 4
+    assert Features({'jobs': 0}).processes() == 1
+    Features.cpus.return_value = 1
+    assert Features({'jobs': 2}).processes() == 1
+
+
+def test_features_preview_names():
+    assert Features.preview_names() == ['globals', 'debug']
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from pytest import mark, raises
+
+from storyscript.LineIndex import LineIndex
+
+
+def test_lineindex_init():
+    index = LineIndex('a\nbc\n')
+    assert index.source == 'a\nbc\n'
+    assert list(index.offsets) == [0, 2, 5]
+    assert len(index) == 2
+
+
+def test_lineindex_init_unterminated():
+    index = LineIndex('a\nbc')
+    assert list(index.offsets) == [0, 2, 4]
+    assert len(index) == 2
+
+
+def test_lineindex_empty():
+    assert len(LineIndex('')) == 0
+
+
+def test_lineindex_line():
+    index = LineIndex('a = 1\n\nb = 2')
+    assert index.line(1) == 'a = 1'
+    assert index.line(2) == ''
+    assert index.line(3) == 'b = 2'
+
+
+@mark.parametrize('source', [
+    'a\r\nb\rc\n',
+    'a\x0bb\x0cc\x1cd\x1de\x1ef',
+    'a\x85b c d',
+    '\n\r\n\r\n\n',
+])
+def test_lineindex_splitlines(source):
+    index = LineIndex(source)
+    lines = source.splitlines()
+    assert len(index) == len(lines)
+    assert [index.line(i + 1) for i in range(len(index))] == lines
+
+
+@mark.parametrize('line', [0, 3])
+def test_lineindex_line_invalid(line):
+    with raises(AssertionError):
+        LineIndex('a\nb\n').line(line)
@@ -10,7 +10,7 @@ from storyscript.Story import Story
 from storyscript.compiler import Compiler
 from storyscript.compiler.lowering.Lowering import Lowering
 from storyscript.exceptions import CompilerError, StoryError, StorySyntaxError
-from storyscript.parser import Parser
+from storyscript.parser import Parser, ParserPool
 
 
 @fixture
@@ -34,6 +34,28 @@ def compiler(patch, story):
 def test_story_init(story):
     assert story.story == 'story'
     assert story.path is None
+    assert story.templates is None
+
+
+def test_story_line():
+    story = Story('a = 1\nb = 2\n', features=None)
+    assert story.line(2) == 'b = 2'
+    assert story.line('1') == 'a = 1'
+    assert story.line_index() is story.line_index()
+
+
+def test_story_lines():
+    source = 'a = 1\r\nb = 2\n\nc = 3'
+    story = Story(source, features=None)
+    assert story.lines == source.splitlines()
+    assert Story('', features=None).lines == []
+    with raises(AttributeError):
+        story.lines = []
+
+
+def test_story_line_fake():
+    story = Story('a = 1\n', features=None)
+    assert story.line('1.1') is None
 
 
 def test_story_init_path():
@@ -41,6 +63,11 @@ def test_story_init_path():
     assert story.path == 'path'
 
 
+def test_story_init_templates():
+    story = Story('story', features=None, templates='templates')
+    assert story.templates == 'templates'
+
+
 def test_story_read(patch):
     """
     Ensures Story.read can read a story
@@ -138,7 +165,8 @@ def test_story_modules_no_extension(magic, story):
 
 def test_story_compile(patch, story, compiler):
     story.compile()
-    Compiler.compile.assert_called_with(story.tree, story=story, features=None)
+    Compiler.compile.assert_called_with(story.tree, story=story, features=None,
+                                        templates=None)
     assert story.compiled == Compiler.compile()
 
 
@@ -172,6 +200,12 @@ def test_story_lex_parser_cached(patch, story, magic):
     my_parser.lex.assert_called_with(story.story)
 
 
+def test_story_parser(story):
+    result = story._parser()
+    assert isinstance(result, ParserPool)
+    assert story._parser() is result
+
+
 def test_story_process(patch, story):
     patch.many(Story, ['parse', 'compile'])
     story.compiled = 'compiled'
@@ -179,7 +213,7 @@ def test_story_process(patch, story):
     assert story.parse.call_args_list[0][0] == ()
     kw_args = story.parse.call_args_list[0][1]
     assert len(kw_args) == 1
-    assert isinstance(kw_args['parser'], Parser)
+    assert isinstance(kw_args['parser'], ParserPool)
     story.parse.assert_called()
     story.compile.assert_called_with()
     assert result == story.compiled
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import os
+
+from lark.lexer import Token
+
+from pytest import fixture, raises
+
+from storyscript.Features import Features
+from storyscript.StoryCache import CachedStory, MemoryCache, StoryCache, \
+    _plain
+from storyscript.exceptions import StoryError
+from storyscript.parser import ParserCache
+
+
+@fixture
+def cache(tmpdir):
+    return StoryCache(directory=str(tmpdir))
+
+
+def test_story_cache_plain():
+    value = {Token('NAME', 'a'): [Token('NAME', 'b'), (1, 'c')], 'd': None}
+    result = _plain(value)
+    assert result == value
+    assert [type(k) for k in result] == [str, str]
+    assert type(result['a'][0]) is str
+
+
+def test_story_cache_init(patch):
+    patch.object(StoryCache, 'default_directory')
+    cache = StoryCache()
+    assert cache.directory == StoryCache.default_directory()
+    assert cache.max_size == StoryCache.max_size
+
+
+def test_story_cache_init_max_size():
+    assert StoryCache(directory='cache', max_size=10).max_size == 10
+
+
+def test_story_cache_default_directory(patch):
+    patch.object(ParserCache, 'default_directory', return_value='/cache')
+    assert StoryCache.default_directory() == '/cache/stories'
+
+
+def test_story_cache_compiler():
+    assert StoryCache.compiler() == StoryCache.compiler()
+
+
+def test_story_cache_features_key():
+    key = StoryCache.features_key(Features({'globals': True}))
+    assert key == 'debug=False,globals=True,hub=None'
+    assert key == StoryCache.features_key(Features({'globals': True,
+                                                    'jobs': 4}))
+
+
+def test_story_cache_features_key_hub(tmpdir):
+    hub = tmpdir.join('hub.bin')
+    hub.write('hub')
+    key = StoryCache.features_key(Features({'hub': str(hub)}))
+    hub.write('changed')
+    assert key != StoryCache.features_key(Features({'hub': str(hub)}))
+
+
+def test_story_cache_features_key_hub_missing(tmpdir):
+    hub = str(tmpdir.join('hub.bin'))
+    with raises(StoryError) as e:
+        StoryCache.features_key(Features({'hub': hub}))
+    assert e.value.message().endswith(f'File `{hub}` not found at `{hub}`')
+
+
+def test_story_cache_source_key():
+    key = StoryCache.source_key('a = 1', 'features')
+    assert key == StoryCache.source_key('a = 1', 'features')
+    assert key != StoryCache.source_key('a = 2', 'features')
+    assert key != StoryCache.source_key('a = 1', 'globals=True')
+
+
+def test_story_cache_key():
+    key = StoryCache.key('one', ['two'])
+    assert key != StoryCache.key('one', [])
+    assert key != StoryCache.key('one', ['three'])
+
+
+def test_story_cache_path():
+    cache = StoryCache(directory='cache')
+    assert cache.path('abc') == 'cache/story-abc.marshal'
+
+
+def test_story_cache_save_load(cache):
+    cache.save('abc', 'key', ['two.story'],
+               {'tree': {'1': {'command': Token('NAME', 'echo')}}})
+    result = cache.load('abc')
+    assert isinstance(result, CachedStory)
+    assert result.key == 'key'
+    assert result.modules == ['two.story']
+    assert result.compiled == {'tree': {'1': {'command': 'echo'}}}
+    assert cache.entries() == [cache.path('abc')]
+
+
+def test_story_cache_load_missing(cache):
+    assert cache.load('abc') is None
+
+
+def test_story_cache_load_invalid(cache):
+    with open(cache.path('abc'), 'wb') as f:
+        f.write(b'invalid')
+    assert cache.load('abc') is None
+
+
+def test_story_cache_save_error(patch, cache):
+    patch.object(os, 'makedirs', side_effect=PermissionError())
+    cache.save('abc', 'key', [], {})
+    assert cache.load('abc') is None
+
+
+def test_story_cache_evict(cache):
+    for i, name in enumerate(['old', 'used', 'new']):
+        cache.save(name, 'key', [], {'data': 'x' * 100})
+        os.utime(cache.path(name), ns=(i, i))
+    cache.load('used')
+    cache.max_size = os.path.getsize(cache.path('new')) * 2
+    assert cache.evict() == 1
+    assert sorted(cache.entries()) == [cache.path('new'), cache.path('used')]
+
+
+def test_story_cache_evict_fits(cache):
+    cache.save('abc', 'key', [], {})
+    assert cache.evict() == 0
+
+
+def test_story_cache_clear(cache):
+    cache.save('abc', 'key', [], {})
+    cache.save('def', 'key', [], {})
+    assert cache.clear() == 2
+    assert cache.entries() == []
+
+
+def test_memory_cache_keys():
+    assert MemoryCache.source_key('a', 'b') == StoryCache.source_key('a', 'b')
+    assert MemoryCache().key('a', ['b']) == StoryCache.key('a', ['b'])
+
+
+def test_memory_cache_save_load():
+    memory = MemoryCache()
+    memory.save('abc', 'key', ['two.story'], 'compiled')
+    story = memory.load('abc')
+    assert (story.key, story.modules, story.compiled) == \
+        ('key', ['two.story'], 'compiled')
+    assert memory.load('abc') is story
+    assert memory.load('def') is None
+
+
+def test_memory_cache_underlying(magic):
+    cache = magic()
+    memory = MemoryCache(cache)
+    assert memory.load('abc') == cache.load.return_value
+    cache.load.assert_called_with('abc')
+    memory.load('abc')
+    assert cache.load.call_count == 1
+    memory.save('def', 'key', [], 'compiled')
+    cache.save.assert_called_with('def', 'key', [], 'compiled')
+    memory.evict()
+    cache.evict.assert_called()
+
+
+def test_memory_cache_evict():
+    memory = MemoryCache()
+    memory.save('old', 'key', [], 'compiled')
+    memory.save('used', 'key', [], 'compiled')
+    assert memory.evict() == 0
+    memory.load('used')
+    assert memory.evict() == 1
+    assert list(memory.stories) == ['used']
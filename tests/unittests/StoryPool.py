@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest import fixture, raises
+
+from storyscript import StoryPool as StoryPoolModule
+from storyscript.Bundle import Bundle
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.StoryCache import CachedStory
+from storyscript.StoryPool import StoryPool, compile_story, parse_story
+from storyscript.compiler.lowering import TemplateCache
+
+
+@fixture
+def worker(monkeypatch):
+    monkeypatch.setattr(StoryPoolModule, '_worker_features',
+                        Features({'jobs': 1}))
+    monkeypatch.setattr(StoryPoolModule, '_worker_templates',
+                        TemplateCache())
+
+
+@fixture
+def pool():
+    """
+    A pool whose tasks run in threads of this process.
+    """
+    pool = StoryPool(2, None, Features(None))
+    pool.executor = ThreadPoolExecutor(2)
+    yield pool
+    pool.close()
+
+
+def test_story_pool_init_parser(magic):
+    pool = StoryPool(2, magic(ebnf='grammar.ebnf'), Features({'jobs': 2}))
+    assert pool.executor._initargs == ('grammar.ebnf', {
+        'globals': False, 'debug': False, 'jobs': 2, 'hub': None})
+    pool.close()
+
+
+def test_story_pool_compile_story(worker):
+    source = 'a = 1\nb = a + 1\n'
+    modules, compiled = compile_story(source)
+    assert modules == []
+    assert compiled == Story(source, Features(None)).process()
+
+
+def test_story_pool_compile_story_syntax_error(worker):
+    assert compile_story('a = = 1\n') is None
+
+
+def test_story_pool_compile_story_error(worker):
+    assert compile_story('a = 1\na = "b"\n') == ([], None)
+
+
+def test_story_pool_parse_story(worker):
+    modules, tree = parse_story('a = 1\n', True)
+    assert modules == []
+    tree = pickle.loads(tree)
+    story = Story('a = 1\n', Features(None))
+    story.parse(None, lower=True)
+    assert tree == story.tree
+    assert 'parser' not in tree.__dict__
+
+
+def test_story_pool_parse_story_templates(worker):
+    """
+    Ensures the stories of a worker share their string templates
+    """
+    parse_story('a = 1\nb = "{a + 1}"\n', True)
+    assert len(StoryPoolModule._worker_templates.templates) == 1
+
+
+def test_story_pool_parse_story_error(worker):
+    assert parse_story('a = = 1\n', False) is None
+
+
+def test_story_pool_map(pool):
+    """
+    Ensures that the imported modules are processed once
+    """
+    imports = {'one': ['two.story', 'three.story'], 'two': ['three.story'],
+               'three': []}
+    calls = []
+
+    def task(source, suffix):
+        calls.append(source)
+        return imports[source], source + suffix
+
+    bundle = Bundle(story_files={'one.story': 'one', 'two.story': 'two',
+                                 'three.story': 'three'})
+    results = pool.map(bundle, ['one.story', 'two.story'], task, '!')
+    assert results == {
+        'one.story': (imports['one'], 'one!'),
+        'two.story': (imports['two'], 'two!'),
+        'three.story': ([], 'three!'),
+    }
+    assert sorted(calls) == ['one', 'three', 'two']
+
+
+def test_story_pool_map_errors(pool):
+    def task(source):
+        if source == 'error':
+            raise RecursionError()
+        return ['missing.story'], source
+
+    bundle = Bundle(story_files={'one.story': 'one', 'two.story': 'error'})
+    results = pool.map(bundle, ['one.story', 'two.story'], task)
+    assert results == {'one.story': (['missing.story'], 'one'),
+                       'two.story': None, 'missing.story': None}
+
+
+def test_story_pool_map_cached(pool):
+    """
+    Ensures that cached stories aren't processed, but their modules are
+    """
+    cached = {'one.story': CachedStory('key', ['two.story'], 'compiled')}
+    calls = []
+
+    def task(source):
+        calls.append(source)
+        return [], source
+
+    bundle = Bundle(story_files={'one.story': 'one', 'two.story': 'two'})
+    results = pool.map(bundle, ['one.story'], task, cached=cached.get)
+    assert results == {'one.story': (['two.story'], cached['one.story']),
+                       'two.story': ([], 'two')}
+    assert calls == ['two']
+
+
+def test_story_pool_map_interrupted(magic, pool):
+    """
+    Ensures that pending tasks are cancelled when the results aren't awaited
+    """
+    future = magic()
+    pool.executor = magic()
+    pool.executor.submit.return_value = future
+    bundle = Bundle(story_files={'one.story': 'one'})
+    pool.completed = magic(side_effect=KeyboardInterrupt())
+    with raises(KeyboardInterrupt):
+        pool.map(bundle, ['one.story'], 'task')
+    future.cancel.assert_called()
+
+
+def test_story_pool_map_no_imports(pool):
+    def task(source):
+        return ['two.story'], source
+
+    bundle = Bundle(story_files={'one.story': 'one', 'two.story': 'two'})
+    results = pool.map(bundle, ['one.story'], task, imports=False)
+    assert results == {'one.story': (['two.story'], 'one')}
+
+
+def test_story_pool_completed(pool):
+    """
+    Ensures that futures added while the results are consumed are waited for
+    """
+    executor = pool.executor
+    futures = {executor.submit(str, 'one'): 'one.story'}
+    results = []
+    for storypath, result in StoryPool.completed(futures):
+        results.append((storypath, result))
+        if storypath == 'one.story':
+            futures[executor.submit(int, 'error')] = 'two.story'
+    assert results == [('one.story', 'one'), ('two.story', None)]
+    assert futures == {}
+
+
+def test_story_pool_parse(patch, pool):
+    patch.object(StoryPool, 'map')
+    result = pool.parse('bundle', ['a.story'], lower=True)
+    StoryPool.map.assert_called_with('bundle', ['a.story'], parse_story,
+                                     True)
+    assert result == StoryPool.map.return_value
+
+
+def test_story_pool_compile(patch, pool):
+    patch.object(StoryPool, 'map')
+    result = pool.compile('bundle', ['a.story'], cached='cached',
+                          imports=False)
+    StoryPool.map.assert_called_with('bundle', ['a.story'], compile_story,
+                                     cached='cached', imports=False)
+    assert result == StoryPool.map.return_value
+
+
+def test_story_pool_close(magic, pool):
+    pool.executor = magic()
+    executor = pool.executor
+    pool.close()
+    executor.shutdown.assert_called_with()
+    assert pool.executor is None
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+from pytest import fixture
+
+from storyscript.Bundle import Bundle
+from storyscript.Story import Story
+from storyscript.StoryCache import MemoryCache
+from storyscript.Watcher import Watcher
+
+
+@fixture
+def stories(tmpdir):
+    """
+    A directory of stories, which is the working directory.
+    """
+    tmpdir.join('one.story').write('a = 1\n')
+    tmpdir.join('two.story').write('b = 2\n')
+    with tmpdir.as_cwd():
+        yield tmpdir
+
+
+@fixture
+def watcher(stories):
+    return Watcher('.')
+
+
+def touch(story, source):
+    """
+    Changes a story, s.t. its size changes as well.
+    """
+    story.write(source)
+    os.utime(str(story), ns=(0, 0))
+
+
+def test_watcher_init():
+    watcher = Watcher('path', ignored_path='ignored', features={'jobs': 2},
+                      cache='cache')
+    assert watcher.path == 'path'
+    assert watcher.ignored_path == 'ignored'
+    assert watcher.bundle.features.jobs == 2
+    assert isinstance(watcher.bundle.cache, MemoryCache)
+    assert watcher.bundle.cache.cache == 'cache'
+    assert watcher.stories is None
+    assert watcher.stats == {}
+    assert watcher.hub_stat is None
+
+
+def test_watcher_files(patch, watcher):
+    patch.object(Bundle, 'parse_directory')
+    watcher.ignored_path = 'ignored'
+    assert watcher.files() == Bundle.parse_directory.return_value
+    Bundle.parse_directory.assert_called_with('.', ignored_path='ignored')
+
+
+def test_watcher_files_story(stories):
+    assert Watcher('one.story').files() == ['one.story']
+
+
+def test_watcher_stat(stories):
+    stat = os.stat('one.story')
+    assert Watcher.stat('one.story') == (stat.st_mtime_ns, stat.st_size)
+
+
+def test_watcher_stat_missing(stories):
+    assert Watcher.stat('missing.story') is None
+
+
+def test_watcher_update_hub(stories, watcher):
+    assert watcher.update_hub() is False
+    assert watcher.hub_stat is None
+
+
+def test_watcher_update_hub_changed(stories):
+    hub = stories.join('hub.spec')
+    hub.write('int foo -> int\n')
+    watcher = Watcher('.', features={'hub': 'hub.spec'})
+    watcher.bundle.features_key = 'features'
+    watcher.bundle.source_keys = {'one.story': 'one'}
+    assert watcher.update_hub() is False
+    assert watcher.hub_stat == Watcher.stat('hub.spec')
+    assert watcher.update_hub() is False
+    assert watcher.bundle.features_key == 'features'
+    touch(hub, 'int foo -> int\nint bar -> int\n')
+    assert watcher.update_hub() is True
+    assert watcher.bundle.features_key is None
+    assert watcher.bundle.source_keys == {}
+
+
+def test_watcher_update(watcher):
+    assert watcher.update() is True
+    assert watcher.bundle.story_files == {'one.story': 'a = 1\n',
+                                          'two.story': 'b = 2\n'}
+    assert sorted(watcher.stats) == ['one.story', 'two.story']
+
+
+def test_watcher_update_empty(tmpdir):
+    watcher = Watcher(str(tmpdir))
+    assert watcher.update() is True
+    assert watcher.update() is False
+
+
+def test_watcher_update_added(stories, watcher):
+    watcher.update()
+    stories.join('three.story').write('c = 3\n')
+    assert watcher.update() is True
+    assert watcher.bundle.story_files['three.story'] == 'c = 3\n'
+
+
+def test_watcher_update_unchanged(watcher):
+    watcher.update()
+    watcher.bundle.stories = {'one.story': 'compiled'}
+    assert watcher.update() is False
+    assert watcher.bundle.stories == {'one.story': 'compiled'}
+
+
+def test_watcher_update_changed(patch, stories, watcher):
+    """
+    Ensures that only changed stories are read again
+    """
+    watcher.update()
+    watcher.bundle.source_keys = {'one.story': 'one', 'two.story': 'two'}
+    watcher.bundle.stories = {'one.story': 'compiled'}
+    touch(stories.join('two.story'), 'b = 22\n')
+    patch.object(Story, 'read', return_value='b = 22\n')
+    assert watcher.update() is True
+    Story.read.assert_called_once_with('two.story')
+    assert watcher.bundle.story_files == {'one.story': 'a = 1\n',
+                                          'two.story': 'b = 22\n'}
+    assert watcher.bundle.source_keys == {'one.story': 'one'}
+    assert watcher.bundle.stories == {}
+
+
+def test_watcher_update_removed(stories, watcher):
+    watcher.update()
+    stories.join('two.story').remove()
+    assert watcher.update() is True
+    assert watcher.bundle.story_files == {'one.story': 'a = 1\n'}
+    assert watcher.update() is False
+
+
+def test_watcher_update_modules(stories):
+    """
+    Ensures that modules from outside the path are watched, but aren't
+    stories of the bundle
+    """
+    stories.mkdir('sub').join('three.story').write('c = 3\n')
+    watcher = Watcher('sub')
+    watcher.update()
+    watcher.bundle.load_story('one.story')
+    assert watcher.update() is False
+    touch(stories.join('one.story'), 'a = 11\n')
+    assert watcher.update() is True
+    assert watcher.bundle.story_files == {'sub/three.story': 'c = 3\n'}
+
+
+def test_watcher_watch(patch, watcher):
+    patch.object(time, 'sleep')
+    patch.object(Watcher, 'update', side_effect=[True, False, True])
+    bundles = watcher.watch(interval=1)
+    assert next(bundles) is watcher.bundle
+    assert next(bundles) is watcher.bundle
+    assert Watcher.update.call_count == 3
+    time.sleep.assert_called_with(1)
+
+
+def test_watcher_watch_interval(patch, watcher):
+    patch.object(time, 'sleep')
+    patch.object(Watcher, 'update', side_effect=[False, True])
+    next(watcher.watch())
+    time.sleep.assert_called_with(Watcher.interval)
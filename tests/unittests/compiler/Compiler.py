@@ -12,8 +12,9 @@ def test_compiler_generate(patch, magic):
     patch.object(Semantics, 'process')
     patch.many(JSONCompiler, ['compile'])
     tree = magic()
-    result = Compiler.generate(tree, features=None)
-    Lowering.__init__.assert_called_with(parser=tree.parser, features=None)
+    result = Compiler.generate(tree, features=None, templates='templates')
+    Lowering.__init__.assert_called_with(parser=tree.parser, features=None,
+                                         templates='templates')
     Lowering.process.assert_called_with(tree)
     Semantics.process.assert_called_with(Lowering.process())
     assert result == Semantics.process()
@@ -23,7 +24,8 @@ def test_compiler_compile(patch, magic):
     patch.object(Compiler, 'generate')
     patch.object(JSONCompiler, 'compile')
     tree = magic()
-    result = Compiler.compile(tree, story=None, features=None)
-    Compiler.generate.assert_called_with(tree, None)
+    result = Compiler.compile(tree, story=None, features=None,
+                              templates='templates')
+    Compiler.generate.assert_called_with(tree, None, 'templates')
     JSONCompiler.compile.assert_called_with(Compiler.generate())
     assert result == JSONCompiler.compile()
@@ -5,6 +5,7 @@ from pytest import fixture, mark, raises
 
 from storyscript.Version import version
 from storyscript.compiler.json import JSONCompiler, Lines, Objects
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
 from storyscript.exceptions import StorySyntaxError
 from storyscript.parser import Tree
 
@@ -374,13 +375,12 @@ def test_compiler_find_parent_with_output(patch, compiler, lines, tree, magic):
     """
     patch.object(Tree, 'expect')
     parent = magic()
-    lines.lines = {parent: {'parent': '0', 'output': None}}
-    # only do the recursion once
-    orig_method = compiler.find_parent_with_output
-    patch.object(compiler, 'find_parent_with_output')
-    result = orig_method(tree, parent)
-    compiler.find_parent_with_output.assert_called_with(tree, '0')
-    assert result == compiler.find_parent_with_output()
+    lines.lines = {
+        parent: {'parent': '0', 'output': None},
+        '0': {'output': ['.output.'], 'service': 'my_service'},
+    }
+    result = compiler.find_parent_with_output(tree, parent)
+    assert result == ['.output.']
 
 
 def test_compiler_find_parent_with_output_empty(patch, compiler, lines, tree,
@@ -390,13 +390,12 @@ def test_compiler_find_parent_with_output_empty(patch, compiler, lines, tree,
     """
     patch.object(Tree, 'expect')
     parent = '1'
-    lines.lines = {'1': {'output': [], 'parent': '0'}}
-    # only do the recursion once
-    orig_method = compiler.find_parent_with_output
-    patch.object(compiler, 'find_parent_with_output')
-    result = orig_method(tree, parent)
-    compiler.find_parent_with_output.assert_called_with(tree, '0')
-    assert result == compiler.find_parent_with_output()
+    lines.lines = {
+        '1': {'output': [], 'parent': '0'},
+        '0': {'output': ['.output.'], 'service': 'my_service'},
+    }
+    result = compiler.find_parent_with_output(tree, parent)
+    assert result == ['.output.']
 
 
 def test_compiler_find_parent_with_no_service(patch, compiler, lines, tree,
@@ -406,15 +405,12 @@ def test_compiler_find_parent_with_no_service(patch, compiler, lines, tree,
     """
     patch.object(Tree, 'expect')
     parent = '1'
-    lines.lines = {'1': {
-        'output': ['.output.'], 'parent': '0', 'service': None}
+    lines.lines = {
+        '1': {'output': ['.output.'], 'parent': '0', 'service': None},
+        '0': {'output': ['.parent.'], 'service': 'my_service'},
     }
-    # only do the recursion once
-    orig_method = compiler.find_parent_with_output
-    patch.object(compiler, 'find_parent_with_output')
-    result = orig_method(tree, parent)
-    compiler.find_parent_with_output.assert_called_with(tree, '0')
-    assert result == compiler.find_parent_with_output()
+    result = compiler.find_parent_with_output(tree, parent)
+    assert result == ['.parent.']
 
 
 def test_compiler_when(patch, compiler, lines, tree):
@@ -489,7 +485,7 @@ def test_compiler_if_block(patch, compiler, lines, tree):
     tree.elseif_block = None
     tree.else_block = None
     tree.extract.return_value = []
-    compiler.if_block(tree, '1')
+    StackVisitor.run(compiler.if_block(tree, '1'))
     exp = tree.if_statement.base_expression
     JSONCompiler.fake_base_expression.assert_called_with(exp, '1')
     nested_block = tree.nested_block
@@ -505,7 +501,7 @@ def test_compiler_if_block_with_elseif(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'subtrees', 'fake_base_expression'])
     tree.else_block = None
     tree.extract.return_value = ['one']
-    compiler.if_block(tree, '1')
+    StackVisitor.run(compiler.if_block(tree, '1'))
     tree.extract.assert_called_with('elseif_block')
     compiler.subtrees.assert_called_with('one', parent='1')
 
@@ -513,13 +509,13 @@ def test_compiler_if_block_with_elseif(patch, compiler, tree):
 def test_compiler_if_block_with_else(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'subtrees', 'fake_base_expression'])
     tree.extract.return_value = []
-    compiler.if_block(tree, '1')
+    StackVisitor.run(compiler.if_block(tree, '1'))
     compiler.subtrees.assert_called_with(tree.else_block, parent='1')
 
 
 def test_compiler_elseif_block(patch, compiler, lines, tree):
     patch.many(JSONCompiler, ['subtree', 'fake_base_expression'])
-    compiler.elseif_block(tree, '1')
+    StackVisitor.run(compiler.elseif_block(tree, '1'))
     lines.set_exit.assert_called_with(tree.line())
     exp = tree.elseif_statement.base_expression
     JSONCompiler.fake_base_expression.assert_called_with(exp, '1')
@@ -534,7 +530,7 @@ def test_compiler_elseif_block(patch, compiler, lines, tree):
 
 def test_compiler_else_block(patch, compiler, lines, tree):
     patch.object(JSONCompiler, 'subtree')
-    compiler.else_block(tree, '1')
+    StackVisitor.run(compiler.else_block(tree, '1'))
     lines.set_exit.assert_called_with(tree.line())
     lines.set_scope.assert_called_with(tree.line(), '1')
     lines.finish_scope.assert_called_with(tree.line())
@@ -546,7 +542,7 @@ def test_compiler_else_block(patch, compiler, lines, tree):
 def test_compiler_foreach_block(patch, compiler, lines, tree):
     patch.init(Tree)
     patch.many(JSONCompiler, ['subtree', 'output', 'fake_base_expression'])
-    compiler.foreach_block(tree, '1')
+    StackVisitor.run(compiler.foreach_block(tree, '1'))
     compiler.output.assert_called_with(tree.foreach_statement.output)
     args = [compiler.fake_base_expression()]
     lines.set_scope.assert_called_with(tree.line(), '1', JSONCompiler.output())
@@ -560,7 +556,7 @@ def test_compiler_foreach_block(patch, compiler, lines, tree):
 def test_compiler_while_block(patch, compiler, lines, tree):
     patch.init(Tree)
     patch.many(JSONCompiler, ['subtree', 'fake_base_expression'])
-    compiler.while_block(tree, '1')
+    StackVisitor.run(compiler.while_block(tree, '1'))
     args = [compiler.fake_base_expression()]
     lines.set_scope.assert_called_with(tree.line(), '1')
     lines.finish_scope.assert_called_with(tree.line())
@@ -573,7 +569,7 @@ def test_compiler_while_block(patch, compiler, lines, tree):
 def test_compiler_function_block(patch, compiler, lines, tree):
     patch.object(Objects, 'function_arguments')
     patch.many(JSONCompiler, ['subtree', 'function_output'])
-    compiler.function_block(tree, '1')
+    StackVisitor.run(compiler.function_block(tree, '1'))
     statement = tree.function_statement
     Objects.function_arguments.assert_called_with(statement)
     compiler.function_output.assert_called_with(statement)
@@ -592,7 +588,7 @@ def test_compiler_function_block_redeclared(patch, compiler, lines, tree):
     compiler.lines.functions = {'.function.': '0'}
     statement = tree.function_statement
     statement.child(1).value = '.function.'
-    compiler.function_block(tree, '1')
+    StackVisitor.run(compiler.function_block(tree, '1'))
 
 
 def test_compiler_throw_statement(patch, compiler, lines, tree):
@@ -692,20 +688,20 @@ def test_compiler_service_block(patch, compiler, tree):
     patch.object(JSONCompiler, 'service')
     tree.node.return_value = None
     tree.mutation = None
-    compiler.service_block(tree, '1')
+    StackVisitor.run(compiler.service_block(tree, '1'))
     compiler.service.assert_called_with(tree.service, tree.nested_block, '1')
 
 
 def test_compiler_service_block_nested_block(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'service'])
     tree.mutation = None
-    compiler.service_block(tree, '1')
+    StackVisitor.run(compiler.service_block(tree, '1'))
     compiler.subtree.assert_called_with(tree.nested_block, parent=tree.line())
 
 
 def test_compiler_service_block_mutation(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'service', 'mutation_block'])
-    compiler.service_block(tree, '1')
+    StackVisitor.run(compiler.service_block(tree, '1'))
     compiler.mutation_block.assert_called_with(tree.mutation,
                                                parent='1')
     compiler.subtree.assert_not_called()
@@ -714,13 +710,13 @@ def test_compiler_service_block_mutation(patch, compiler, tree):
 
 def test_compiler_when_block(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'when'])
-    compiler.when_block(tree, '1')
+    StackVisitor.run(compiler.when_block(tree, '1'))
     JSONCompiler.when.assert_called_with(tree, tree.nested_block, '1')
 
 
 def test_compiler_when_block_nested_block(patch, compiler, tree):
     patch.many(JSONCompiler, ['subtree', 'when'])
-    compiler.when_block(tree, '1')
+    StackVisitor.run(compiler.when_block(tree, '1'))
     compiler.subtree.assert_called_with(tree.nested_block, parent=tree.line())
 
 
@@ -731,7 +727,7 @@ def test_compiler_try_block(patch, compiler, lines, tree):
     patch.object(JSONCompiler, 'subtree')
     tree.catch_block = None
     tree.finally_block = None
-    compiler.try_block(tree, '1')
+    StackVisitor.run(compiler.try_block(tree, '1'))
     kwargs = {'enter': tree.nested_block.line(), 'parent': '1'}
     lines.set_scope.assert_called_with(tree.line(), '1')
     lines.finish_scope.assert_called_with(tree.line())
@@ -742,14 +738,14 @@ def test_compiler_try_block(patch, compiler, lines, tree):
 def test_compiler_try_block_catch(patch, compiler, lines, tree):
     patch.many(JSONCompiler, ['subtree', 'catch_block'])
     tree.finally_block = None
-    compiler.try_block(tree, '1')
+    StackVisitor.run(compiler.try_block(tree, '1'))
     compiler.catch_block.assert_called_with(tree.catch_block, parent='1')
 
 
 def test_compiler_try_block_finally(patch, compiler, lines, tree):
     patch.many(JSONCompiler, ['subtree', 'finally_block'])
     tree.catch_block = None
-    compiler.try_block(tree, '1')
+    StackVisitor.run(compiler.try_block(tree, '1'))
     compiler.finally_block.assert_called_with(tree.finally_block, parent='1')
 
 
@@ -759,7 +755,7 @@ def test_compiler_catch_block(patch, compiler, lines, tree):
     """
     patch.object(Objects, 'names')
     patch.object(JSONCompiler, 'subtree')
-    compiler.catch_block(tree, '1')
+    StackVisitor.run(compiler.catch_block(tree, '1'))
     lines.set_exit.assert_called_with(tree.line())
     Objects.names.assert_called_with(tree.catch_statement)
     lines.set_scope.assert_called_with(tree.line(), '1', Objects.names())
@@ -775,7 +771,7 @@ def test_compiler_finally_block(patch, compiler, lines, tree):
     Ensures that finally blocks are compiled correctly.
     """
     patch.object(JSONCompiler, 'subtree')
-    compiler.finally_block(tree, '1')
+    StackVisitor.run(compiler.finally_block(tree, '1'))
     lines.set_exit.assert_called_with(tree.line())
     lines.set_scope.assert_called_with(tree.line(), '1')
     lines.finish_scope.assert_called_with(tree.line())
@@ -817,13 +813,13 @@ def test_compiler_subtree_parent(patch, compiler):
 
 def test_compiler_subtrees(patch, compiler, tree):
     patch.object(JSONCompiler, 'subtree', return_value={'tree': 'sub'})
-    compiler.subtrees(tree, tree)
+    StackVisitor.run(compiler.subtrees(tree, tree))
     compiler.subtree.assert_called_with(tree, parent=None)
 
 
 def test_compiler_subtrees_parent(patch, compiler, tree):
     patch.object(JSONCompiler, 'subtree', return_value={'tree': 'sub'})
-    compiler.subtrees(tree, tree, parent='1')
+    StackVisitor.run(compiler.subtrees(tree, tree, parent='1'))
     compiler.subtree.assert_called_with(tree, parent='1')
 
 
@@ -833,7 +829,7 @@ def test_compiler_parse_tree(compiler, patch):
     """
     patch.object(JSONCompiler, 'subtree')
     tree = Tree('start', [Tree('command', ['token'])])
-    compiler.parse_tree(tree)
+    StackVisitor.run(compiler.parse_tree(tree))
     compiler.subtree.assert_called_with(Tree('command', ['token']),
                                         parent=None)
 
@@ -841,7 +837,7 @@ def test_compiler_parse_tree(compiler, patch):
 def test_compiler_parse_tree_parent(compiler, patch):
     patch.object(JSONCompiler, 'subtree')
     tree = Tree('start', [Tree('command', ['token'])])
-    compiler.parse_tree(tree, parent='1')
+    StackVisitor.run(compiler.parse_tree(tree, parent='1'))
     compiler.subtree.assert_called_with(Tree('command', ['token']), parent='1')
 
 
@@ -56,14 +56,46 @@ def test_lines_set_next(patch, lines):
 
 @mark.parametrize('method', ['if', 'elif', 'try', 'catch'])
 def test_lines_set_exit(patch, lines, method):
+    lines.make('method', '1')
+    lines.make(method, '2')
+    lines.make('method', '3')
     lines.finished_scopes = ['1']
-    lines.lines = {'1': {}, '2': {'method': method}}
-    lines._lines = ['1', '2']
-    lines.set_exit('3')
-    assert lines.lines['2']['exit'] == '3'
+    lines.set_exit('4')
+    assert lines.lines['2']['exit'] == '4'
+    assert lines.lines['1']['exit'] is None
+    assert lines.lines['3']['exit'] is None
     assert lines.finished_scopes == []
 
 
+def test_lines_set_exit_none(lines):
+    lines.make('else', '1')
+    lines.finished_scopes = ['1']
+    lines.set_exit('2')
+    assert lines.lines['1']['exit'] is None
+    assert lines.finished_scopes == ['1']
+
+
+def test_lines_set_exit_last(lines):
+    lines.make('if', '1')
+    lines.make('try', '2')
+    lines.make('when', '3')
+    lines.set_exit('4')
+    assert lines.lines['1']['exit'] is None
+    assert lines.lines['2']['exit'] == '4'
+
+
+def test_lines_set_exit_many(lines):
+    """
+    Ensures that setting exits doesn't scan all lines
+    """
+    for i in range(0, 60000, 3):
+        lines.make('if', i)
+        lines.make('expression', i + 1)
+        lines.set_exit(i + 2)
+        lines.make('else', i + 2)
+        assert lines.lines[i]['exit'] == i + 2
+
+
 def test_lines_set_scope(patch, lines):
     lines.set_scope('2', '1')
     assert lines.output_scopes['2'] == {'parent': '1', 'output': []}
@@ -222,8 +254,32 @@ def test_lines_is_variable_defined(patch, lines):
     """
     Ensures that the check for previously seen variables works
     """
-    lines.variables = [['one', 'two'], ['three']]
+    lines.set_name(['one', 'two'])
+    lines.set_name(['three'])
+    assert lines.variables == [['one', 'two'], ['three']]
     assert lines.is_variable_defined('one')
     assert lines.is_variable_defined('two')
     assert lines.is_variable_defined('three')
     assert not lines.is_variable_defined('four')
+
+
+def test_lines_is_variable_defined_objects(lines):
+    dot = {'$OBJECT': 'dot', 'dot': 'b'}
+    path = {'$OBJECT': 'path', 'paths': ['a', dot]}
+    lines.set_name(['a', dot, path])
+    assert lines.is_variable_defined({'dot': 'b', '$OBJECT': 'dot'})
+    assert lines.is_variable_defined({'$OBJECT': 'path',
+                                      'paths': ['a', dot]})
+    assert not lines.is_variable_defined({'$OBJECT': 'dot', 'dot': 'c'})
+    assert not lines.is_variable_defined(['a'])
+    assert not lines.is_variable_defined(('a',))
+
+
+def test_lines_is_variable_defined_many(lines):
+    """
+    Ensures that the check doesn't scan all variables
+    """
+    for i in range(20000):
+        lines.set_name([f'a{i}'])
+        assert not lines.is_variable_defined([f'a{i}'])
+        assert lines.is_variable_defined(f'a{i}')
@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 from unittest import mock
 
-from pytest import fixture
+from lark.exceptions import UnexpectedInput
 
-from storyscript.compiler.lowering import FakeTree, Lowering
-from storyscript.parser import Tree
+from pytest import fixture, mark
+
+from storyscript.Story import Story
+from storyscript.compiler.lowering import FakeTree, Lowering, TemplateCache
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
+from storyscript.exceptions import CompilerError, StorySyntaxError
+from storyscript.parser import Transformer, Tree
 
 
 @fixture
@@ -28,6 +33,81 @@ def test_preprocessor_fake_tree(patch):
     assert isinstance(result, FakeTree)
 
 
+def test_preprocessor_init(magic):
+    templates = magic()
+    lowering = Lowering(parser='parser', features='features',
+                        templates=templates)
+    assert lowering.parser == 'parser'
+    assert lowering.features == 'features'
+    assert lowering.templates == templates
+
+
+def test_preprocessor_init_templates():
+    assert isinstance(Lowering(None, None).templates, TemplateCache)
+
+
+def test_preprocessor_parse_template(magic, preprocessor):
+    """
+    Ensures template code is parsed once and moved to its column
+    """
+    preprocessor.parser = magic()
+    node = magic()
+    preprocessor.parser.parse_template.return_value.children = [node]
+    result = preprocessor.parse_template('code', 5)
+    assert preprocessor.parse_template('code', 5) == result
+    preprocessor.parser.parse_template.assert_called_once_with('code')
+    node.clone.assert_called_with(5)
+    assert result == node.clone()
+    assert preprocessor.templates.load((preprocessor.parser, 'code')) == node
+
+
+def test_preprocessor_parse_template_no_parser(preprocessor):
+    assert preprocessor.parse_template('code', 5) is None
+
+
+def test_preprocessor_parse_template_no_rule(magic, preprocessor):
+    preprocessor.parser = magic()
+    preprocessor.parser.parse_template.return_value = None
+    assert preprocessor.parse_template('code', 5) is None
+
+
+@mark.parametrize('error', [
+    UnexpectedInput(),
+    StorySyntaxError('error'),
+    CompilerError('error'),
+])
+def test_preprocessor_parse_template_error(magic, preprocessor, error):
+    """
+    Ensures code which the template rule can't parse isn't cached
+    """
+    preprocessor.parser = magic()
+    preprocessor.parser.parse_template.side_effect = error
+    assert preprocessor.parse_template('code', 5) is None
+    assert preprocessor.templates.templates == {}
+
+
+def test_preprocessor_parse_statement(magic, preprocessor):
+    """
+    Ensures template code is parsed as a padded story, which keeps its
+    features
+    """
+    def parse(story, parser):
+        story.tree = Tree('start', [block])
+
+    statement = Tree('service', [])
+    block = Tree('block', [Tree('service_block', [statement])])
+    preprocessor.features = 'features'
+    node = magic()
+    with mock.patch.object(Story, 'parse', autospec=True,
+                           side_effect=parse):
+        result = preprocessor.parse_statement(node, 'code', 2)
+        story, parser = Story.parse.call_args[0]
+    assert story.story == '  code'
+    assert story.features == 'features'
+    assert parser == preprocessor.parser
+    assert result == statement
+
+
 def test_preprocessor_replace_expression(magic, preprocessor, entity):
     """
     Check that the new assignment is inserted above the tree
@@ -72,6 +152,49 @@ def test_preprocessor_process(patch, magic, preprocessor):
         preprocessor.replace_expression, parent=None)
 
 
+def test_preprocessor_process_rewrites(patch, magic, preprocessor):
+    """
+    Check that process applies all rewrites in a single walk
+    """
+    patch.many(Lowering, ['visit', 'visit_concise_when', 'visit_rewrites',
+                          'visit_string_templates'])
+    tree = magic()
+    preprocessor.process(tree)
+    preprocessor.visit_rewrites.assert_called_once_with(
+        tree, block=None, output_block=None, parent=None)
+
+
+def test_preprocessor_visit_rewrites(patch, preprocessor):
+    """
+    Check that visit_rewrites dispatches every node once
+    """
+    patch.many(Lowering, ['lower_cmp_expr', 'lower_as_expr',
+                          'lower_assignment'])
+    patch.object(Transformer, 'argument_shorthand')
+    args = Tree('arguments', [Tree('path', ['a'])])
+    pow_expr = Tree('pow_expression', [args])
+    cmp_expr = Tree('cmp_expression', [pow_expr])
+    assignment = Tree('assignment', [cmp_expr])
+    block = Tree('block', [assignment])
+    StackVisitor.run(preprocessor.visit_rewrites(block, block=None,
+                                                 output_block=None,
+                                                 parent=None))
+    Lowering.lower_cmp_expr.assert_called_once_with(cmp_expr)
+    Lowering.lower_as_expr.assert_called_once_with(pow_expr, None)
+    Transformer.argument_shorthand.assert_called_once_with(args)
+    Lowering.lower_assignment.assert_called_once_with(assignment, block,
+                                                      block)
+
+
+def test_preprocessor_lower_assignment_path(patch, preprocessor):
+    """
+    Check that a plain path assignment doesn't create a fake tree
+    """
+    assignment = Tree('assignment', [Tree('path', ['a'])])
+    preprocessor.lower_assignment(assignment, block=None, parent=None)
+    assert Lowering.fake_tree.call_count == 0
+
+
 def test_preprocessor_is_inline_expression(magic):
     """
     Check that inline_expressions are correctly detected
@@ -118,8 +241,8 @@ def test_preprocessor_visit_one_children(patch, magic, preprocessor, entity):
     def is_inline(n):
         return n == c1
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     preprocessor.fake_tree.assert_called_with('.block.')
     replace.assert_called_with(c1, preprocessor.fake_tree(), entity.path)
     assert replace.call_count == 1
@@ -138,8 +261,8 @@ def test_preprocessor_visit_two_children(patch, magic, preprocessor, entity):
     def is_inline(n):
         return n == cs[0] or n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     replace.mock_calls = [
         mock.call(cs[0], preprocessor.fake_tree(), entity),
         mock.call(cs[1], preprocessor.fake_tree(), entity),
@@ -163,8 +286,8 @@ def test_preprocessor_visit_nested_multiple(patch, magic, preprocessor,
     def is_inline(n):
         return n == cs[0] or n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     replace.mock_calls = [
         mock.call(cs[1], preprocessor.fake_tree(), entity),
         mock.call(cs[0], preprocessor.fake_tree(), entity),
@@ -187,8 +310,8 @@ def test_preprocessor_visit_nested_inner(patch, magic, preprocessor, entity):
     def is_inline(n):
         return n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     replace.mock_calls = [
         mock.call(cs[1], preprocessor.fake_tree(), entity),
     ]
@@ -212,8 +335,8 @@ def test_preprocessor_visit_nested_multiple_block(patch, magic, preprocessor,
     def is_inline(n):
         return n == cs[0] or n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     preprocessor.fake_tree.mock_calls = [
         mock.call(tree),
         mock.call(tree),
@@ -245,8 +368,8 @@ def test_preprocessor_visit_nested_multiple_block_nearest(patch,
     def is_inline(n):
         return n == cs[0] or n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     replace.mock_calls = [
         mock.call(cs[1], preprocessor.fake_tree(cs[0]), entity),
         mock.call(cs[0], preprocessor.fake_tree(cs[1]), entity),
@@ -271,8 +394,8 @@ def test_preprocessor_visit_nested_parent(patch, magic, preprocessor, entity):
     def is_inline(n):
         return n == cs[0] or n == cs[1]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     preprocessor.fake_tree.mock_calls = [
         mock.call(tree),
         mock.call(tree),
@@ -302,17 +425,17 @@ def test_preprocessor_service_mut(patch, magic, preprocessor, entity):
     def is_inline(n):
         return n == cs[0]
 
-    preprocessor.visit(tree, '.block.', entity, is_inline,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        is_inline, replace, parent=None))
     preprocessor.fake_tree.mock_calls = [
         mock.call(tree),
     ]
     replace.mock_calls = [
         mock.call(cs[0], preprocessor.fake_tree(), tree),
     ]
-    assert tree.data == 'mutation'
+    tree.rename.assert_called_with('mutation')
     assert tree.entity == Tree('entity', [tree.path])
-    assert tree.service_fragment.data == 'mutation_fragment'
+    tree.service_fragment.rename.assert_called_with('mutation_fragment')
 
 
 def test_preprocessor_visit_base_expression(patch, magic, preprocessor,
@@ -332,8 +455,8 @@ def test_preprocessor_visit_base_expression(patch, magic, preprocessor,
     c1.children = [base_expression]
     tree.children = [c1]
 
-    preprocessor.visit(tree, '.block.', entity, lambda x: False,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        lambda x: False, replace, parent=None))
     preprocessor.fake_tree.assert_called_with(c1)
     replace.assert_called_with(base_expression, preprocessor.fake_tree(),
                                base_expression)
@@ -358,8 +481,8 @@ def test_preprocessor_visit_base_expression_ignore(patch, magic, preprocessor,
     c1.children = [base_expression]
     tree.children = [c1]
 
-    preprocessor.visit(tree, '.block.', entity, lambda x: False,
-                       replace, parent=None)
+    StackVisitor.run(preprocessor.visit(tree, '.block.', entity,
+                                        lambda x: False, replace, parent=None))
     preprocessor.fake_tree.assert_not_called()
     replace.assert_not_called()
 
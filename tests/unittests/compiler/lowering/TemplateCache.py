@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from storyscript.compiler.lowering import TemplateCache
+
+
+def test_template_cache_init():
+    cache = TemplateCache()
+    assert cache.max_entries == TemplateCache.max_entries
+    assert cache.templates == {}
+
+
+def test_template_cache_init_max_entries():
+    assert TemplateCache(max_entries=2).max_entries == 2
+
+
+def test_template_cache_save_load():
+    cache = TemplateCache()
+    cache.save('code', 'tree')
+    assert cache.load('code') == 'tree'
+    assert cache.load('other') is None
+
+
+def test_template_cache_evict():
+    cache = TemplateCache(max_entries=2)
+    cache.save('old', 'tree')
+    cache.save('used', 'tree')
+    cache.load('old')
+    cache.save('new', 'tree')
+    assert list(cache.templates) == ['old', 'new']
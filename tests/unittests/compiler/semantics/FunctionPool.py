@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+from lark.lexer import Token
+
+from pytest import fixture, raises
+
+from storyscript.Features import Features
+from storyscript.Story import Story
+from storyscript.compiler.semantics import FunctionPool as FunctionPoolModule
+from storyscript.compiler.semantics.FunctionPool import FunctionPool, \
+    check_function, outline
+from storyscript.compiler.semantics.FunctionResolver import FunctionResolver
+from storyscript.compiler.semantics.functions.FunctionTable import \
+    FunctionTable
+from storyscript.compiler.semantics.functions.MutationTable import \
+    MutationTable
+from storyscript.compiler.semantics.types.Types import IntType
+from storyscript.exceptions import CompilerError
+from storyscript.parser import Tree, TreePickler
+
+
+@fixture
+def pool():
+    return FunctionPool(2)
+
+
+def resolve(source):
+    """
+    Returns the tree and tables of a story after resolving its functions.
+    """
+    story = Story(source, Features(None))
+    story.parse(None, lower=True)
+    function_table = FunctionTable()
+    mutation_table = MutationTable.init()
+    FunctionResolver(function_table=function_table,
+                     mutation_table=mutation_table,
+                     features=Features(None)).run(story.tree)
+    return story.tree, (function_table, mutation_table, {})
+
+
+def test_function_pool_outline():
+    tree = Tree('path', [Token('NAME', 'a'), Tree('path_fragment', [])])
+    assert outline(tree) == ('path', (('NAME', 'a', 'a'),
+                                      ('path_fragment', ())))
+
+
+def test_function_pool_function_blocks():
+    tree, tables = resolve('function a\n  x = 1\nb = 2\n'
+                           'function c\n  y = 1\n')
+    blocks = FunctionPool.function_blocks(tree)
+    assert len(blocks) == 2
+    assert [b.function_statement.child(1).value for b in blocks] == ['a', 'c']
+
+
+def test_function_pool_check_function(patch):
+    tree, tables = resolve('function a returns int\n  x = 1\n  return x\n')
+    patch.object(FunctionPoolModule, '_worker_tables', tables)
+    block = FunctionPool.function_blocks(tree)[0]
+    changed, scope, error = pickle.loads(
+        check_function(TreePickler.dumps(block)))
+    assert error is None
+    assert isinstance(changed, dict)
+    assert scope.resolve('x').type() == IntType.instance()
+
+
+def test_function_pool_check_function_error(patch):
+    tree, tables = resolve('function a returns int\n  return "a"\n')
+    patch.object(FunctionPoolModule, '_worker_tables', tables)
+    block = FunctionPool.function_blocks(tree)[0]
+    changed, scope, error = pickle.loads(
+        check_function(TreePickler.dumps(block)))
+    assert changed is None
+    assert scope is None
+    assert error.error == 'return_type_differs'
+
+
+def test_function_pool_check_none(pool):
+    assert pool.check(Tree('function_block', [])) is False
+
+
+def test_function_pool_check(magic, pool):
+    statement = Tree('return_statement', [])
+    tree = Tree('function_block', [Tree('nested_block', [Tree('a', [])])])
+    check = magic()
+    check.result.return_value = TreePickler.dumps(({0: statement},
+                                                   'scope', None))
+    pool.checks[id(tree)] = check
+    assert pool.check(tree) is True
+    assert tree.nested_block.children == [statement]
+    assert tree.scope == 'scope'
+    assert pool.checks == {}
+
+
+def test_function_pool_check_error(magic, pool):
+    tree = Tree('function_block', [])
+    check = magic()
+    error = CompilerError('return_type_differs')
+    check.result.return_value = TreePickler.dumps((None, None, error))
+    pool.checks[id(tree)] = check
+    with raises(CompilerError) as e:
+        pool.check(tree)
+    assert e.value.error == 'return_type_differs'
+
+
+def test_function_pool_check_recursion(magic, pool):
+    tree = Tree('function_block', [])
+    check = magic()
+    check.result.side_effect = RecursionError()
+    pool.checks[id(tree)] = check
+    assert pool.check(tree) is False
+
+
+def test_function_pool_close(magic, pool):
+    pool.executor = magic()
+    executor = pool.executor
+    check = magic()
+    pool.checks = {1: check}
+    pool.close()
+    check.cancel.assert_called()
+    executor.shutdown.assert_called_with()
+    assert pool.executor is None
+    assert pool.checks == {}
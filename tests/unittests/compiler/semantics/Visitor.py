@@ -16,7 +16,7 @@ def test_a_selective_visitor():
 
         def node(self, tree):
             self._node = self._node + 1
-            self.visit_children(tree)
+            yield self.visit_children(tree)
 
     tree = Tree('node', [
         Tree('node', []),
@@ -24,5 +24,5 @@ def test_a_selective_visitor():
         Tree('unknown', [])
     ])
     visitor = TestVisitor()
-    visitor.visit(tree)
+    visitor.run(tree)
     assert visitor._node == 2
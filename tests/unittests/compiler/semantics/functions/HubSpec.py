@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import marshal
+
+from pytest import mark, raises
+
+from storyscript.compiler.semantics.functions.HubMutations import hub
+from storyscript.compiler.semantics.functions.HubSpec import HubSpec
+from storyscript.compiler.semantics.functions.MutationBuilder import \
+    mutation_builder
+from storyscript.compiler.semantics.types.GenericTypes import \
+    ListGenericType, MapGenericType, TypeSymbol
+from storyscript.compiler.semantics.types.Types import AnyType, IntType
+
+
+def test_hubspec_fingerprint():
+    assert HubSpec.fingerprint('a') == HubSpec.fingerprint('a')
+    assert HubSpec.fingerprint('a') != HubSpec.fingerprint('b')
+
+
+def test_hubspec_encode_type():
+    assert HubSpec.encode_type(IntType.instance()) == ('type', 'IntType')
+    assert HubSpec.encode_type(TypeSymbol('A')) == ('symbol', 'A')
+    t = MapGenericType([TypeSymbol('K'),
+                        ListGenericType([AnyType.instance()])])
+    assert HubSpec.encode_type(t) == \
+        ('Map', (('symbol', 'K'), ('List', (('type', 'AnyType'),))))
+
+
+def test_hubspec_decode_type():
+    assert HubSpec.decode_type(('type', 'IntType')) is IntType.instance()
+    assert HubSpec.decode_type(('symbol', 'A')) == TypeSymbol('A')
+    t = HubSpec.decode_type(('List', (('symbol', 'A'),)))
+    assert isinstance(t, ListGenericType)
+    assert t.symbols == [TypeSymbol('A')]
+
+
+def test_hubspec_encode():
+    m = mutation_builder('Map[K,V] get key:K default:V -> V')
+    assert HubSpec.encode([m]) == ((
+        ('Map', (('symbol', 'K'), ('symbol', 'V'))), 'get',
+        (('key', ('symbol', 'K')), ('default', ('symbol', 'V'))),
+        ('symbol', 'V'),
+    ),)
+
+
+def test_hubspec_decode():
+    mutations = hub.parse()
+    spec = HubSpec.encode(mutations)
+    decoded = HubSpec.decode(spec)
+    assert len(decoded) == len(mutations)
+    for a, b in zip(decoded, mutations):
+        assert a.name() == b.name()
+        assert a.base_type() == b.base_type()
+        assert a.arg_names_hash() == b.arg_names_hash()
+    assert HubSpec.encode(decoded) == spec
+
+
+def test_hubspec_dumps_loads():
+    m = mutation_builder('int foo a:int -> List[int]')
+    data = HubSpec.dumps([m])
+    assert data.startswith(HubSpec.magic)
+    assert HubSpec.loads(data) == HubSpec.encode([m])
+
+
+def test_hubspec_loads_source():
+    assert HubSpec.loads(b'int foo -> int') is None
+
+
+def test_hubspec_loads_version():
+    data = HubSpec.magic + marshal.dumps((0, ()))
+    with raises(ValueError, match='another version'):
+        HubSpec.loads(data)
+
+
+@mark.parametrize('data', [b'', b'invalid', marshal.dumps(1)])
+def test_hubspec_loads_invalid(data):
+    with raises(ValueError, match='invalid hub specification'):
+        HubSpec.loads(HubSpec.magic + data)
+
+
+def test_hubspec_generate():
+    m = mutation_builder('int foo -> int')
+    module = {}
+    exec(HubSpec.generate('int foo -> int', [m]), module)
+    assert module['FINGERPRINT'] == HubSpec.fingerprint('int foo -> int')
+    assert module['MUTATIONS'] == HubSpec.encode([m])
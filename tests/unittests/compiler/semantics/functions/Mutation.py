@@ -0,0 +1,45 @@
+from storyscript.compiler.semantics.functions.MutationBuilder import \
+    mutation_builder
+from storyscript.compiler.semantics.types.Types import AnyType, FloatType, \
+    IntType, ListType, MapType, StringType
+
+
+def test_mutation_instantiate_cached():
+    m = mutation_builder('List[A] append item:A -> List[A]')
+    fn = m.instantiate(ListType(IntType.instance()))
+    assert m.instantiate(ListType(IntType())) is fn
+    assert fn.output() == ListType(IntType.instance())
+    assert fn._args['item'].type() == IntType.instance()
+
+
+def test_mutation_instantiate_inner_types():
+    m = mutation_builder('List[A] append item:A -> List[A]')
+    ints = m.instantiate(ListType(IntType.instance()))
+    strings = m.instantiate(ListType(StringType.instance()))
+    nested = m.instantiate(ListType(ListType(IntType.instance())))
+    any_ = m.instantiate(AnyType.instance())
+    assert len({id(ints), id(strings), id(nested), id(any_)}) == 4
+    assert strings.output() == ListType(StringType.instance())
+    assert strings._args['item'].type() == StringType.instance()
+    assert nested._args['item'].type() == ListType(IntType.instance())
+    assert any_._args['item'].type() == AnyType.instance()
+    assert m.instantiate(ListType(IntType.instance())) is ints
+
+
+def test_mutation_instantiate_map_types():
+    m = mutation_builder('Map[K,V] get key:K default:V -> V')
+    a = m.instantiate(MapType(StringType.instance(), IntType.instance()))
+    b = m.instantiate(MapType(StringType.instance(), FloatType.instance()))
+    c = m.instantiate(MapType(IntType.instance(), IntType.instance()))
+    assert a is not b and a is not c
+    assert a.output() == IntType.instance()
+    assert b.output() == FloatType.instance()
+    assert c._args['key'].type() == IntType.instance()
+
+
+def test_mutation_instantiate_not_generic():
+    m = mutation_builder('string length -> int')
+    fn = m.instantiate(StringType.instance())
+    assert m.instantiate(StringType.instance()) is fn
+    assert m.instantiate(AnyType.instance()) is fn
+    assert fn.output() == IntType.instance()
@@ -0,0 +1,180 @@
+import importlib
+import pickle
+
+from pytest import raises
+
+from storyscript.compiler.semantics.functions.HubMutations import Hub
+from storyscript.compiler.semantics.functions.HubSpec import HubSpec
+from storyscript.compiler.semantics.functions.MutationBuilder import \
+    mutation_builder
+from storyscript.compiler.semantics.functions.MutationTable import \
+    MutationTable
+from storyscript.compiler.semantics.types.Types import AnyType, IntType, \
+    ListType, StringType
+
+
+def test_mutation_table_hub_table_shared():
+    table = MutationTable.hub_table()
+    assert table.frozen
+    assert MutationTable.hub_table() is table
+
+
+def test_mutation_table_init_overlay():
+    table = MutationTable.init()
+    assert table.parent is MutationTable.hub_table()
+    assert table.mutations == {}
+    assert MutationTable.init() is not table
+
+
+def test_mutation_table_frozen_insert():
+    with raises(AssertionError):
+        MutationTable.hub_table().insert(mutation_builder('int foo -> int'))
+
+
+def test_mutation_table_overlay_resolve():
+    table = MutationTable.init()
+    table.insert(mutation_builder('string foo -> int'))
+    table.insert(mutation_builder('string length a:int -> int'))
+    foo = table.resolve(StringType.instance(), 'foo')
+    assert foo.single().name() == 'foo'
+    length = table.resolve(StringType.instance(), 'length')
+    assert [m.cmp_name() for m in length.all()] == ['length', 'lengtha']
+    assert table.resolve(IntType.instance(), 'foo') is None
+    assert table.resolve(StringType.instance(), 'bar') is None
+    # the shared table is left untouched
+    assert MutationTable.hub_table().resolve(StringType.instance(),
+                                             'foo') is None
+    assert MutationTable.init().resolve(StringType.instance(), 'foo') is None
+
+
+def test_mutation_table_overlay_resolve_any():
+    table = MutationTable.init()
+    table.insert(mutation_builder('int length -> int'))
+    length = table.resolve(AnyType.instance(), 'length')
+    types = {str(m.type()) for m in length.all()}
+    assert 'int' in types and 'string' in types
+
+
+def test_mutation_table_overlay_duplicate():
+    table = MutationTable.init()
+    with raises(AssertionError):
+        table.insert(mutation_builder('string length -> int'))
+
+
+def test_hub_mutations_lazy():
+    hub = Hub('int foo -> int\n# int bar -> int\n\nint baz -> int')
+    assert hub._mutations is None
+    mutations = hub.mutations()
+    assert [m.name() for m in mutations] == ['foo', 'baz']
+    assert hub.mutations() is mutations
+
+
+def test_mutation_table_resolve_cached():
+    table = MutationTable.hub_table()
+    t = ListType(IntType.instance())
+    mo = table.resolve(t, 'append')
+    assert mo.type() == t
+    other = table.resolve(ListType(StringType.instance()), 'append')
+    assert other.type() == ListType(StringType.instance())
+    assert other._obj is mo._obj
+    assert other.all() is mo.all()
+    assert table.resolved[('ListType', 'append')] is not None
+
+
+def test_mutation_table_resolve_cached_none():
+    table = MutationTable.hub_table()
+    assert table.resolve(IntType.instance(), 'append') is None
+    assert table.resolved[('IntType', 'append')] is None
+
+
+def test_mutation_table_resolve_insert_clears():
+    table = MutationTable.init()
+    table.insert(mutation_builder('string foo -> int'))
+    assert table.resolve(StringType.instance(), 'foo') is not None
+    assert table.resolve(IntType.instance(), 'foo') is None
+    table.insert(mutation_builder('int foo -> int'))
+    assert table.resolve(IntType.instance(), 'foo').single().name() == 'foo'
+
+
+def test_mutation_table_pickle_hub_table():
+    table = MutationTable.hub_table()
+    assert pickle.loads(pickle.dumps(table)) is table
+
+
+def test_mutation_table_pickle_overlay():
+    table = MutationTable.init()
+    table.insert(mutation_builder('string foo -> int'))
+    result = pickle.loads(pickle.dumps(table))
+    assert result.parent is MutationTable.hub_table()
+    assert not result.frozen
+    assert result.resolve(StringType.instance(), 'foo').single().name() == \
+        'foo'
+
+
+def test_hub_from_file_source(tmpdir):
+    path = tmpdir.join('hub.spec')
+    path.write('int foo -> int\n')
+    hub = Hub.from_file(str(path))
+    assert hub.source() == 'int foo -> int\n'
+    assert [m.name() for m in hub.mutations()] == ['foo']
+
+
+def test_hub_from_file_compiled(tmpdir):
+    path = tmpdir.join('hub.bin')
+    path.write_binary(Hub('int foo a:int -> int').compile())
+    hub = Hub.from_file(str(path))
+    assert hub.source() is None
+    assert hub.precompiled() is not None
+    mutation = hub.mutations()[0]
+    assert mutation.name() == 'foo'
+    assert mutation.args() == {'a': IntType.instance()}
+
+
+def test_hub_precompiled(patch, magic):
+    source = 'int foo -> int'
+    module = magic(FINGERPRINT=HubSpec.fingerprint(source),
+                   MUTATIONS=HubSpec.encode([mutation_builder(source)]))
+    patch.object(importlib, 'import_module', return_value=module)
+    hub = Hub(source)
+    assert hub.precompiled() is module.MUTATIONS
+    importlib.import_module.assert_called_with(Hub.spec_module)
+    assert [m.name() for m in hub.mutations()] == ['foo']
+
+
+def test_hub_precompiled_outdated(patch, magic):
+    module = magic(FINGERPRINT='outdated')
+    patch.object(importlib, 'import_module', return_value=module)
+    assert Hub('int foo -> int').precompiled() is None
+
+
+def test_hub_precompiled_missing(patch):
+    patch.object(importlib, 'import_module', side_effect=ImportError())
+    hub = Hub('int foo -> int')
+    assert hub.precompiled() is None
+    assert [m.name() for m in hub.mutations()] == ['foo']
+
+
+def test_mutation_table_hub_table_path(tmpdir):
+    path = tmpdir.join('hub.spec')
+    path.write('string length -> int\nint foo -> int\n')
+    table = MutationTable.init(str(path))
+    assert table.parent is MutationTable.hub_table(str(path))
+    assert table.parent is not MutationTable.hub_table()
+    assert table.resolve(IntType.instance(), 'foo') is not None
+    assert table.resolve(IntType.instance(), 'increment') is None
+    assert pickle.loads(pickle.dumps(table.parent)) is table.parent
+
+
+def test_mutation_table_hub_table_changed(tmpdir):
+    """
+    Ensures a changed hub specification isn't resolved from a stale table
+    """
+    path = tmpdir.join('hub.spec')
+    path.write('int foo -> int\n')
+    table = MutationTable.hub_table(str(path))
+    assert MutationTable.hub_table(str(path)) is table
+    path.write('int bar -> int\nint foo -> int\n')
+    changed = MutationTable.hub_table(str(path))
+    assert changed is not table
+    assert changed.resolve(IntType.instance(), 'bar') is not None
+    assert MutationTable.hub_table(str(path)) is changed
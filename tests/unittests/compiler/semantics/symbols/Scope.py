@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 from storyscript.compiler.semantics.symbols.Scope import Scope
-from storyscript.compiler.semantics.symbols.Symbols import Symbols
+from storyscript.compiler.semantics.symbols.Symbols import Symbol, Symbols
+from storyscript.compiler.semantics.types.Types import IntType, StringType
 
 
 def test_scope_pretty_none(patch):
@@ -13,7 +14,8 @@ Symbols:
 
 
 def test_scope_pretty(patch, magic):
-    root_scope = '.parent.'
+    root_scope = magic()
+    root_scope.__str__.return_value = '.parent.'
     scope = Scope(parent=root_scope)
     patch.object(Symbols, 'pretty', return_value='.symbols.')
     assert scope.pretty() == """Parent: .parent.
@@ -22,20 +24,67 @@ Symbols:
     Symbols.pretty.assert_called_with(indent='\t')
 
 
-def test_scope_resolve_fail(patch, magic):
-    patch.object(Symbols, 'resolve', return_value=False)
-    patch.object(Scope, 'scopes', return_value=[Scope(), Scope()])
-    scope = Scope()
-    assert scope.resolve('.p.') is None
-    Symbols.resolve.call_count == 2
+def test_scope_resolve_fail():
+    root = Scope()
+    root.insert(Symbol('a', IntType.instance()))
+    scope = Scope(parent=Scope(parent=root))
+    assert scope.resolve('b') is None
+    assert Scope(parent=root).resolve('a') is root.resolve('a')
 
 
-def test_scope_resolve_sucess(patch, magic):
-    patch.object(Symbols, 'resolve', return_value=True)
-    patch.object(Scope, 'scopes', return_value=[Scope(), Scope()])
-    scope = Scope()
-    assert scope.resolve('.p.') == Symbols.resolve()
-    Symbols.resolve.call_count == 1
+def test_scope_resolve_sucess():
+    root = Scope()
+    a = Symbol('a', IntType.instance())
+    root.insert(a)
+    scope = Scope(parent=Scope(parent=root))
+    assert scope.resolve('a') is a
+    assert scope.resolve('a') is a
+
+
+def test_scope_resolve_shadow():
+    root = Scope()
+    outer = Symbol('a', IntType.instance())
+    root.insert(outer)
+    middle = Scope(parent=root)
+    scope = Scope(parent=middle)
+    assert scope.resolve('a') is outer
+    inner = Symbol('a', StringType.instance())
+    middle.insert(inner)
+    assert scope.resolve('a') is inner
+    assert middle.resolve('a') is inner
+    assert root.resolve('a') is outer
+
+
+def test_scope_resolve_late_insert():
+    root = Scope()
+    scope = Scope(parent=Scope(parent=root))
+    assert scope.resolve('a') is None
+    a = Symbol('a', IntType.instance())
+    root.symbols().insert(a)
+    assert scope.resolve('a') is a
+
+
+def test_scope_resolve_siblings():
+    root = Scope()
+    left = Scope(parent=root)
+    right = Scope(parent=root)
+    a = Symbol('a', IntType.instance())
+    left.insert(a)
+    assert left.resolve('a') is a
+    assert right.resolve('a') is None
+    assert root.resolve('a') is None
+
+
+def test_scope_resolve_deep():
+    root = Scope()
+    a = Symbol('a', IntType.instance())
+    root.insert(a)
+    scope = root
+    for i in range(10000):
+        scope = Scope(parent=scope)
+        assert scope.resolve('a') is a
+        assert scope.resolve(f'b{i}') is None
+        scope.insert(Symbol(f'b{i}', IntType.instance()))
 
 
 def test_scope_scopes_single():
@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import copy
+import pickle
+
 from lark.lexer import Token
 
 from pytest import mark, raises
@@ -64,3 +67,58 @@ def test_none_explicit_from():
 def test_base_type_not_implemented():
     with raises(NotImplementedError):
         BaseType().op(None)
+
+
+@mark.parametrize('type_,other', [
+    (IntType.instance(), IntType()),
+    (AnyType.instance(), AnyType()),
+    (ListType(IntType.instance()), ListType(IntType())),
+    (ListType(ListType(StringType.instance())),
+        ListType(ListType(StringType()))),
+    (MapType(IntType.instance(), StringType.instance()),
+        MapType(IntType(), StringType())),
+])
+def test_hash_eq(type_, other):
+    assert type_ == other
+    assert hash(type_) == hash(other)
+    assert {type_: 1}[other] == 1
+
+
+@mark.parametrize('type_,other', [
+    (IntType.instance(), FloatType.instance()),
+    (ListType(IntType.instance()), ListType(StringType.instance())),
+    (ListType(IntType.instance()), ListType(AnyType.instance())),
+    (MapType(IntType.instance(), StringType.instance()),
+        MapType(StringType.instance(), IntType.instance())),
+])
+def test_hash_ne(type_, other):
+    assert type_ != other
+    assert other not in {type_: 1}
+
+
+def test_interned():
+    assert IntType() is IntType.instance()
+    assert ListType(IntType()) is ListType(IntType.instance())
+    assert MapType(StringType(), ListType(IntType())) is \
+        MapType(StringType.instance(), ListType(IntType.instance()))
+    assert ListType(IntType()) is not ListType(FloatType())
+
+
+def test_immutable():
+    t = ListType(IntType.instance())
+    with raises(AttributeError):
+        t.inner = StringType.instance()
+    with raises(AttributeError):
+        IntType.instance().foo = 1
+    assert t.inner is IntType.instance()
+
+
+@mark.parametrize('type_', [
+    IntType.instance(),
+    ListType(ListType(StringType.instance())),
+    MapType(IntType.instance(), ListType(AnyType.instance())),
+])
+def test_interned_copy(type_):
+    assert copy.copy(type_) is type_
+    assert copy.deepcopy(type_) is type_
+    assert pickle.loads(pickle.dumps(type_)) is type_
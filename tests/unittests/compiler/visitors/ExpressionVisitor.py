@@ -1,7 +1,10 @@
 # -*- coding: utf-8 -*-
+from lark.lexer import Token
+
 from pytest import raises
 
 from storyscript.compiler.visitors.ExpressionVisitor import ExpressionVisitor
+from storyscript.parser import Tree
 
 
 def test_objects_primary_expression_entity(patch, tree):
@@ -97,20 +100,21 @@ def test_objects_mul_expression_one(patch, tree):
     assert r == ExpressionVisitor.unary_expression()
 
 
-def test_objects_mul_expression_two(patch, tree):
+def test_objects_mul_expression_two(patch):
     """
     Ensures ExpressionVisitor.mul_expression works with two nodes
     """
     patch.many(ExpressionVisitor, ['nary_expression',
                                    'unary_expression'])
-    tree.child(1).data = 'mul_operator'
-    tree.children = [1, '*', 2]
-    mul_expression = ExpressionVisitor().mul_expression
-    patch.object(ExpressionVisitor, 'mul_expression')
-    r = mul_expression(tree)
+    tree = Tree('mul_expression', [
+        Tree('mul_expression', [Tree('unary_expression', [1])]),
+        Tree('mul_operator', ['*']),
+        Tree('unary_expression', [2]),
+    ])
+    r = ExpressionVisitor().mul_expression(tree)
     ExpressionVisitor.nary_expression.assert_called_with(
-        tree, tree.child(1).child(0), [
-            ExpressionVisitor.mul_expression(tree.child(0)),
+        tree, '*', [
+            ExpressionVisitor.unary_expression(tree.child(0).child(0)),
             ExpressionVisitor.unary_expression(tree.child(2))
         ])
     assert r == ExpressionVisitor.nary_expression()
@@ -128,25 +132,46 @@ def test_objects_arith_expression_one(patch, tree):
     assert r == ExpressionVisitor.mul_expression()
 
 
-def test_objects_arith_expression_two(patch, tree):
+def test_objects_arith_expression_two(patch):
     """
     Ensures ExpressionVisitor.arith_expression works with two nodes
     """
     patch.many(ExpressionVisitor, ['mul_expression', 'nary_expression'])
-    tree.child(1).data = 'arith_operator'
-    tree.children = [1, '+', 2]
-    arith_expression = ExpressionVisitor().arith_expression
-    patch.object(ExpressionVisitor, 'arith_expression')
-    r = arith_expression(tree)
-    op_type = tree.child(1).child(0)
+    tree = Tree('arith_expression', [
+        Tree('arith_expression', [Tree('mul_expression', [1])]),
+        Tree('arith_operator', ['+']),
+        Tree('mul_expression', [2]),
+    ])
+    r = ExpressionVisitor().arith_expression(tree)
     ExpressionVisitor.nary_expression.assert_called_with(
-        tree, op_type, values=[
-            ExpressionVisitor.arith_expression(tree.child(0)),
+        tree, '+', values=[
+            ExpressionVisitor.mul_expression(tree.child(0).child(0)),
             ExpressionVisitor.mul_expression(tree.children[2])
         ])
     assert r == ExpressionVisitor.nary_expression()
 
 
+def test_objects_arith_expression_chain(patch):
+    """
+    Ensures ExpressionVisitor.arith_expression folds a chain from its
+    innermost expression
+    """
+    patch.object(ExpressionVisitor, 'mul_expression',
+                 side_effect=lambda t: t.child(0))
+    patch.object(ExpressionVisitor, 'nary_expression',
+                 side_effect=lambda t, op, values: [op, *values])
+    tree = Tree('arith_expression', [Tree('mul_expression', [1])])
+    for i in range(2, 5000):
+        tree = Tree('arith_expression', [
+            tree,
+            Tree('arith_operator', ['+']),
+            Tree('mul_expression', [i]),
+        ])
+    r = ExpressionVisitor().arith_expression(tree)
+    assert r[0] == '+' and r[2] == 4999
+    assert r[1][0] == '+' and r[1][2] == 4998
+
+
 def test_objects_or_expression_one(patch, tree):
     """
     Ensures ExpressionVisitor.or_expression works with one node
@@ -159,20 +184,22 @@ def test_objects_or_expression_one(patch, tree):
     assert r == ExpressionVisitor.and_expression()
 
 
-def test_objects_or_expression_two(patch, tree):
+def test_objects_or_expression_two(patch):
     """
     Ensures ExpressionVisitor.or_expression works with two nodes
     """
     patch.many(ExpressionVisitor, ['nary_expression',
                                    'and_expression'])
-    tree.child(1).type = 'OR'
-    tree.children = [1, 'or', 2]
-    or_expression = ExpressionVisitor().or_expression
-    patch.object(ExpressionVisitor, 'or_expression')
-    r = or_expression(tree)
+    op = Token('OR', 'or')
+    tree = Tree('or_expression', [
+        Tree('or_expression', [Tree('and_expression', [1])]),
+        op,
+        Tree('and_expression', [2]),
+    ])
+    r = ExpressionVisitor().or_expression(tree)
     ExpressionVisitor.nary_expression.assert_called_with(
-        tree, tree.child(1), [
-            ExpressionVisitor.or_expression(tree.child(0)),
+        tree, op, [
+            ExpressionVisitor.and_expression(tree.child(0).child(0)),
             ExpressionVisitor.and_expression(tree.child(2))
         ])
     assert r == ExpressionVisitor.nary_expression()
@@ -190,20 +217,22 @@ def test_objects_and_expression_one(patch, tree):
     assert r == ExpressionVisitor.cmp_expression()
 
 
-def test_objects_and_expression_two(patch, tree):
+def test_objects_and_expression_two(patch):
     """
     Ensures ExpressionVisitor.and_expression works with two nodes
     """
     patch.many(ExpressionVisitor, ['nary_expression',
                                    'cmp_expression'])
-    tree.child(1).type = 'AND'
-    tree.children = [1, 'and', 2]
-    and_expression = ExpressionVisitor().and_expression
-    patch.object(ExpressionVisitor, 'and_expression')
-    r = and_expression(tree)
+    op = Token('AND', 'and')
+    tree = Tree('and_expression', [
+        Tree('and_expression', [Tree('cmp_expression', [1])]),
+        op,
+        Tree('cmp_expression', [2]),
+    ])
+    r = ExpressionVisitor().and_expression(tree)
     ExpressionVisitor.nary_expression.assert_called_with(
-        tree, tree.child(1), [
-            ExpressionVisitor.and_expression(tree.child(0)),
+        tree, op, [
+            ExpressionVisitor.cmp_expression(tree.child(0).child(0)),
             ExpressionVisitor.cmp_expression(tree.child(2)),
         ])
     assert r == ExpressionVisitor.nary_expression()
@@ -221,20 +250,21 @@ def test_objects_cmp_expression_one(patch, tree):
     assert r == ExpressionVisitor.arith_expression()
 
 
-def test_objects_cmp_expression_two(patch, tree):
+def test_objects_cmp_expression_two(patch):
     """
-    Ensures ExpressionVisitor.and_expression works with two nodes
+    Ensures ExpressionVisitor.cmp_expression works with two nodes
     """
     patch.many(ExpressionVisitor, ['nary_expression',
                                    'arith_expression'])
-    tree.child(1).data = 'cmp_operator'
-    tree.children = [1, '==', 2]
-    cmp_expression = ExpressionVisitor().cmp_expression
-    patch.object(ExpressionVisitor, 'cmp_expression')
-    r = cmp_expression(tree)
+    tree = Tree('cmp_expression', [
+        Tree('cmp_expression', [Tree('arith_expression', [1])]),
+        Tree('cmp_operator', ['==']),
+        Tree('arith_expression', [2]),
+    ])
+    r = ExpressionVisitor().cmp_expression(tree)
     ExpressionVisitor.nary_expression.assert_called_with(
-        tree, tree.child(1).child(0), [
-            ExpressionVisitor.cmp_expression(tree.child(0)),
+        tree, '==', [
+            ExpressionVisitor.arith_expression(tree.child(0).child(0)),
             ExpressionVisitor.arith_expression(tree.child(2)),
         ])
     assert r == ExpressionVisitor.nary_expression()
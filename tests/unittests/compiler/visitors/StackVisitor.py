@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from pytest import raises
+
+from storyscript.compiler.visitors.StackVisitor import StackVisitor
+
+
+def test_stack_visitor_run_plain():
+    """
+    Ensures values which aren't visits are returned as they are
+    """
+    assert StackVisitor.run(42) == 42
+
+
+def test_stack_visitor_run_results():
+    """
+    Ensures visits are sent the results of the visits they yield
+    """
+    def visit(n):
+        if n == 0:
+            return 0
+        left = yield visit(n - 1)
+        right = yield n
+        return left + right
+
+    assert StackVisitor.run(visit(10)) == 55
+
+
+def test_stack_visitor_run_deep():
+    """
+    Ensures deep visits don't hit the recursion limit
+    """
+    def visit(n):
+        if n == 0:
+            return 0
+        return (yield visit(n - 1)) + 1
+
+    assert StackVisitor.run(visit(100000)) == 100000
+
+
+def test_stack_visitor_run_error():
+    """
+    Ensures errors are thrown into the waiting visits
+    """
+    exits = []
+
+    def visit(n):
+        try:
+            if n == 0:
+                raise ValueError('.error.')
+            yield visit(n - 1)
+        finally:
+            exits.append(n)
+
+    with raises(ValueError) as e:
+        StackVisitor.run(visit(2))
+    assert str(e.value) == '.error.'
+    assert exits == [0, 1, 2]
+
+
+def test_stack_visitor_run_error_handled():
+    """
+    Ensures visits can handle the errors of the visits they yield
+    """
+    def fail():
+        raise ValueError('.error.')
+        yield
+
+    def visit():
+        try:
+            yield fail()
+        except ValueError:
+            return 'handled'
+
+    assert StackVisitor.run(visit()) == 'handled'
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import pickle
+
 from pytest import fixture, raises
 
 from storyscript.exceptions.ProcessingError import ConstDict, ProcessingError
@@ -78,3 +80,8 @@ def test_const_dict():
     assert d.f2 == 'b2'
     with raises(Exception):
         d.bar
+
+
+def test_constdict_pickle():
+    d = pickle.loads(pickle.dumps(ConstDict({'foo': 'bar'})))
+    assert d.foo == 'bar'
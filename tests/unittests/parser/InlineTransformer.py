@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from pytest import fixture, raises
+
+from storyscript.parser import InlineTransformer, Transformer, Tree
+from storyscript.parser.InlineTransformer import InlineCallback
+
+
+@fixture
+def inline(magic):
+    return InlineTransformer(transformer=magic())
+
+
+def test_inline_transformer_init(patch):
+    patch.init(Transformer)
+    inline = InlineTransformer()
+    assert isinstance(inline.transformer, Transformer)
+    assert inline.error is None
+
+
+def test_inline_transformer_init_transformer(inline):
+    assert inline.transformer is not None
+
+
+def test_inline_transformer_reset(inline):
+    inline.error = Exception()
+    inline.reset()
+    assert inline.error is None
+
+
+def test_inline_transformer_check(inline):
+    inline.check()
+
+
+def test_inline_transformer_check_error(inline):
+    error = Exception()
+    inline.error = error
+    with raises(Exception) as e:
+        inline.check()
+    assert e.value == error
+    assert inline.error is None
+
+
+def test_inline_transformer_getattr(inline):
+    result = inline.path
+    assert isinstance(result, InlineCallback)
+    assert result.transformer == inline
+    assert result.rule == 'path'
+    assert result.callback == inline.transformer.path
+
+
+def test_inline_transformer_getattr_dunder(inline):
+    with raises(AttributeError):
+        inline.__setstate__
+
+
+def test_inline_callback(inline):
+    result = inline.path(['matches'])
+    inline.transformer.path.assert_called_with(['matches'])
+    assert result == inline.transformer.path()
+
+
+def test_inline_callback_error(inline):
+    """
+    Ensures errors are deferred and the parse continues with plain trees
+    """
+    error = Exception()
+    inline.transformer.path.side_effect = error
+    assert inline.path(['matches']) == Tree('path', ['matches'])
+    assert inline.error == error
+
+
+def test_inline_callback_after_error(inline):
+    inline.error = Exception()
+    assert inline.block(['matches']) == Tree('block', ['matches'])
+    assert inline.transformer.block.call_count == 0
@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
+import importlib
 import io
 
+import lark
 from lark import Lark
 
 from pytest import fixture
 
-from storyscript.parser import (CustomIndenter, Grammar, Parser, Transformer,
-                                Tree)
+from storyscript.parser import (CustomIndenter, Grammar, InlineTransformer,
+                                Parser, ParserCache, ParserGenerator,
+                                StandaloneLark, Transformer, Tree)
 
 
 @fixture
@@ -15,29 +18,88 @@ def parser(magic, patch):
     parser = Parser()
     parser.algo = 'lalr'
     parser.ebnf = None
+    parser.cache = magic()
+    parser.standalone = True
+    parser.start = 'start'
+    parser.template = None
     parser.lark = magic()
     return parser
 
 
+@fixture
+def tables(patch, magic):
+    patch.object(importlib, 'import_module')
+    patch.object(ParserGenerator, 'fingerprint')
+    importlib.import_module().LARK_VERSION = lark.__version__
+    importlib.import_module().FINGERPRINT = ParserGenerator.fingerprint()
+    importlib.import_module().START = 'start'
+    return importlib.import_module()
+
+
 def test_parser_init(patch):
-    patch.object(Parser, '_lark')
+    patch.many(Parser, ['_lark', '_cache'])
     parser = Parser()
     assert parser.algo == 'lalr'
     assert parser.ebnf is None
+    Parser._cache.assert_called_with(True)
+    assert parser.cache == Parser._cache()
+    assert parser.standalone is True
+    assert parser.start == 'start'
+    assert parser.template is None
+
+
+def test_parser_init_child_attributes(patch, magic):
+    patch.many(Parser, ['_lark', '_cache'])
+    patch.object(Tree, 'child_attributes')
+    rule = magic()
+    Parser._lark.return_value.rules = [rule]
+    Parser()
+    names = Tree.child_attributes.call_args[0][0]
+    assert list(names) == [rule.origin.name]
+
+
+def test_parser_init_standalone(patch):
+    patch.many(Parser, ['_lark', '_cache'])
+    parser = Parser(standalone=False)
+    assert parser.standalone is False
 
 
 def test_parser_init_algo(patch):
-    patch.object(Parser, '_lark')
+    patch.many(Parser, ['_lark', '_cache'])
     parser = Parser(algo='algo')
     assert parser.algo == 'algo'
 
 
+def test_parser_init_start(patch):
+    patch.many(Parser, ['_lark', '_cache'])
+    assert Parser(start='template').start == 'template'
+
+
 def test_parser_init_ebnf(patch):
-    patch.object(Parser, '_lark')
+    patch.many(Parser, ['_lark', '_cache'])
     parser = Parser(ebnf='grammar.ebnf')
     assert parser.ebnf == 'grammar.ebnf'
 
 
+def test_parser_cache(patch, parser):
+    patch.init(ParserCache)
+    assert isinstance(parser._cache(True), ParserCache)
+
+
+def test_parser_cache_disabled(parser):
+    assert parser._cache(False) is None
+
+
+def test_parser_cache_custom(parser, magic):
+    cache = magic()
+    assert parser._cache(cache) == cache
+
+
+def test_parser_cache_not_lalr(parser):
+    parser.algo = 'earley'
+    assert parser._cache(True) is None
+
+
 def test_parser_indenter(patch):
     patch.init(CustomIndenter)
     assert isinstance(Parser.indenter(), CustomIndenter)
@@ -65,23 +127,190 @@ def test_parser_grammar_ebnf(patch, parser):
     assert result == io.open().__enter__().read()
 
 
-def test_parser_lark(patch, parser):
+def test_parser_grammar_key(patch, parser):
+    patch.object(Grammar, 'sources')
+    assert parser.grammar_key() == Grammar.sources()
+
+
+def test_parser_grammar_key_ebnf(patch, parser):
+    patch.object(Parser, 'grammar')
+    parser.ebnf = 'test.ebnf'
+    assert parser.grammar_key() == Parser.grammar()
+
+
+def test_parser_inline(parser):
+    assert parser.inline() is True
+
+
+def test_parser_inline_earley(parser):
+    parser.algo = 'earley'
+    assert parser.inline() is False
+
+
+def test_parser_build_lark(patch, parser):
     """
-    Ensures Parser.lark can produce the correct Lark instance.
+    Ensures Parser._build_lark can produce the correct Lark instance.
     """
     patch.init(Lark)
-    patch.many(Parser, ['indenter', 'grammar'])
-    result = parser._lark()
-    kwargs = {'parser': parser.algo, 'postlex': Parser.indenter()}
-    Lark.__init__.assert_called_with(parser.grammar(), **kwargs)
+    patch.init(InlineTransformer)
+    patch.object(Parser, 'indenter')
+    result = parser._build_lark('grammar')
+    kwargs = Lark.__init__.call_args[1]
+    assert kwargs['parser'] == parser.algo
+    assert kwargs['postlex'] == Parser.indenter()
+    assert kwargs['tree_class'] == Tree
+    assert isinstance(kwargs['transformer'], InlineTransformer)
+    assert kwargs['start'] == 'start'
     assert isinstance(result, Lark)
 
 
-def test_parser_parse(patch, parser):
+def test_parser_build_lark_earley(patch, parser):
+    patch.init(Lark)
+    patch.object(Parser, 'indenter')
+    parser.algo = 'earley'
+    result = parser._build_lark('grammar')
+    kwargs = {'parser': parser.algo, 'postlex': Parser.indenter(),
+              'start': 'start'}
+    Lark.__init__.assert_called_with('grammar', **kwargs)
+    assert isinstance(result, Lark)
+
+
+def test_parser_tables(parser, tables):
+    result = parser.tables('grammar')
+    importlib.import_module.assert_called_with('storyscript.parser.tables')
+    ParserGenerator.fingerprint.assert_called_with('grammar')
+    assert result == tables
+
+
+def test_parser_tables_not_generated(patch, parser):
+    patch.object(importlib, 'import_module', side_effect=ImportError)
+    assert parser.tables('grammar') is None
+
+
+def test_parser_tables_lark_version(parser, tables):
+    tables.LARK_VERSION = '0.0.1'
+    assert parser.tables('grammar') is None
+
+
+def test_parser_tables_stale(parser, tables):
+    tables.FINGERPRINT = 'stale'
+    assert parser.tables('grammar') is None
+
+
+def test_parser_tables_start(parser, tables):
+    parser.start = 'template'
+    assert parser.tables('grammar') is None
+
+
+def test_parser_tables_template(parser, tables):
+    parser.start = 'template'
+    tables.START = 'template'
+    assert parser.tables('grammar') == tables
+    module = 'storyscript.parser.template_tables'
+    importlib.import_module.assert_called_with(module)
+
+
+def test_parser_tables_unknown_start(parser, tables):
+    parser.start = 'block'
+    importlib.import_module.reset_mock()
+    assert parser.tables('grammar') is None
+    assert importlib.import_module.call_count == 0
+
+
+def test_parser_tables_disabled(parser, tables):
+    parser.standalone = False
+    importlib.import_module.reset_mock()
+    assert parser.tables('grammar') is None
+    assert importlib.import_module.call_count == 0
+
+
+def test_parser_tables_ebnf(parser, tables):
+    parser.ebnf = 'grammar.ebnf'
+    assert parser.tables('grammar') is None
+
+
+def test_parser_tables_not_lalr(parser, tables):
+    parser.algo = 'earley'
+    assert parser.tables('grammar') is None
+
+
+def test_parser_lark_standalone(patch, parser):
+    """
+    Ensures Parser._lark prefers the generated parser tables
+    """
+    patch.init(StandaloneLark)
+    patch.init(InlineTransformer)
+    patch.many(Parser, ['grammar', 'grammar_key', 'tables', 'indenter',
+                        '_build_lark'])
+    result = parser._lark()
+    Parser.tables.assert_called_with(Parser.grammar_key())
+    assert Parser.grammar.call_count == 0
+    args = StandaloneLark.__init__.call_args
+    assert args[0] == (Parser.tables(),)
+    assert args[1]['postlex'] == Parser.indenter()
+    assert isinstance(args[1]['transformer'], InlineTransformer)
+    assert parser.cache.load.call_count == 0
+    assert Parser._build_lark.call_count == 0
+    assert isinstance(result, StandaloneLark)
+
+
+def test_parser_lark(patch, parser):
     """
-    Ensures the build method can build the grammar
+    Ensures Parser._lark loads the parser from the cache
+    """
+    patch.many(Parser, ['grammar', 'grammar_key', '_build_lark'])
+    patch.object(Parser, 'tables', return_value=None)
+    result = parser._lark()
+    parser.cache.fingerprint.assert_called_with(Parser.grammar_key(), 'lalr',
+                                                'start')
+    parser.cache.load.assert_called_with(parser.cache.fingerprint())
+    assert Parser.grammar.call_count == 0
+    assert Parser._build_lark.call_count == 0
+    assert result == parser.cache.load()
+
+
+def test_parser_lark_cache_miss(patch, parser):
+    """
+    Ensures Parser._lark builds and caches the parser on a cache miss
+    """
+    patch.many(Parser, ['grammar', 'grammar_key', '_build_lark'])
+    patch.object(Parser, 'tables', return_value=None)
+    parser.cache.load.return_value = None
+    result = parser._lark()
+    Parser._build_lark.assert_called_with(Parser.grammar())
+    fingerprint = parser.cache.fingerprint()
+    parser.cache.save.assert_called_with(fingerprint, Parser._build_lark())
+    assert result == Parser._build_lark()
+
+
+def test_parser_lark_no_cache(patch, parser):
+    patch.many(Parser, ['grammar', 'grammar_key', '_build_lark'])
+    patch.object(Parser, 'tables', return_value=None)
+    parser.cache = None
+    result = parser._lark()
+    Parser._build_lark.assert_called_with(Parser.grammar())
+    assert result == Parser._build_lark()
+
+
+def test_parser_parse(parser):
+    """
+    Ensures the source is parsed and transformed in one pass
+    """
+    result = parser.parse('source')
+    transformer = parser.lark.options.transformer
+    assert transformer.reset.call_count == 1
+    parser.lark.parse.assert_called_with('source\n')
+    assert transformer.check.call_count == 1
+    assert result == parser.lark.parse()
+    assert result.parser == parser
+
+
+def test_parser_parse_earley(patch, parser):
+    """
+    Ensures trees of the Earley parser are transformed afterwards
     """
     patch.many(Parser, ['transformer'])
+    parser.algo = 'earley'
     result = parser.parse('source')
     parser.lark.parse.assert_called_with('source\n')
     Parser.transformer().transform.assert_called_with(parser.lark.parse())
@@ -95,6 +324,39 @@ def test_parser_parse_empty(patch, parser, magic):
     assert parser.parse('') == Tree('empty', [])
 
 
+def test_parser_template_parser(patch, parser, magic):
+    patch.init(Parser)
+    rule = magic()
+    rule.origin.name = 'template'
+    parser.lark.rules = [rule]
+    result = parser.template_parser()
+    Parser.__init__.assert_called_with(algo='lalr', ebnf=None,
+                                       cache=parser.cache, standalone=True,
+                                       start='template')
+    assert isinstance(result, Parser)
+    assert parser.template_parser() is result
+
+
+def test_parser_template_parser_no_rule(patch, parser):
+    patch.init(Parser)
+    parser.lark.rules = []
+    assert parser.template_parser() is None
+    assert parser.template is False
+    assert Parser.__init__.call_count == 0
+
+
+def test_parser_parse_template(patch, parser):
+    patch.object(Parser, 'template_parser')
+    result = parser.parse_template('code')
+    Parser.template_parser().parse.assert_called_with('code')
+    assert result == Parser.template_parser().parse()
+
+
+def test_parser_parse_template_no_rule(patch, parser):
+    patch.object(Parser, 'template_parser', return_value=None)
+    assert parser.parse_template('code') is None
+
+
 def test_parser_lex(patch, parser):
     patch.many(Parser, ['indenter'])
     result = parser.lex('source')
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+import glob
+import io
+import os
+import pickle
+import tempfile
+
+from pytest import fixture
+
+from storyscript.parser import ParserCache
+from storyscript.parser.ParserCache import _Pickler, _Unpickler
+
+
+@fixture
+def cache():
+    return ParserCache(directory='cache')
+
+
+def test_parser_cache_init(patch):
+    patch.object(ParserCache, 'default_directory')
+    assert ParserCache().directory == ParserCache.default_directory()
+
+
+def test_parser_cache_init_directory(cache):
+    assert cache.directory == 'cache'
+
+
+def test_parser_cache_default_directory(patch):
+    patch.object(os, 'getenv', side_effect=[None, None])
+    patch.object(os.path, 'expanduser', return_value='/home')
+    assert ParserCache.default_directory() == '/home/.cache/storyscript'
+    os.path.expanduser.assert_called_with('~')
+
+
+def test_parser_cache_default_directory_env(patch):
+    patch.object(os, 'getenv', return_value='/cache')
+    assert ParserCache.default_directory() == '/cache'
+    os.getenv.assert_called_with('STORYSCRIPT_CACHE_DIR')
+
+
+def test_parser_cache_default_directory_xdg(patch):
+    patch.object(os, 'getenv', side_effect=[None, '/xdg'])
+    assert ParserCache.default_directory() == '/xdg/storyscript'
+
+
+def test_parser_cache_fingerprint():
+    fingerprint = ParserCache.fingerprint('grammar', 'lalr', 'start')
+    assert fingerprint == ParserCache.fingerprint('grammar', 'lalr', 'start')
+    assert fingerprint != ParserCache.fingerprint('grammar2', 'lalr', 'start')
+    assert fingerprint != ParserCache.fingerprint('grammar', 'earley', 'start')
+    assert fingerprint != ParserCache.fingerprint('grammar', 'lalr', 'other')
+
+
+def test_parser_cache_path(cache):
+    assert cache.path('abc') == 'cache/parser-abc.pickle'
+
+
+def test_parser_cache_entries(patch, cache):
+    patch.object(glob, 'glob')
+    result = cache.entries()
+    glob.glob.assert_called_with('cache/parser-*.pickle')
+    assert result == glob.glob()
+
+
+def test_parser_cache_load_missing(patch, cache):
+    patch.object(os.path, 'join', return_value='/unknown/file.pickle')
+    assert cache.load('abc') is None
+
+
+def test_parser_cache_save(patch, cache):
+    patch.many(os, ['makedirs', 'replace'])
+    patch.object(tempfile, 'mkstemp', return_value=(3, 'cache/tmp'))
+    patch.object(io, 'open')
+    patch.object(pickle, 'Pickler')
+    patch.object(ParserCache, 'evict')
+    cache.save('abc', 'parser')
+    os.makedirs.assert_called_with('cache', exist_ok=True)
+    tempfile.mkstemp.assert_called_with(dir='cache')
+    io.open.assert_called_with(3, 'wb')
+    os.replace.assert_called_with('cache/tmp', 'cache/parser-abc.pickle')
+    assert ParserCache.evict.call_count == 1
+
+
+def test_parser_cache_save_unpicklable(patch, cache):
+    patch.many(os, ['makedirs', 'replace', 'remove'])
+    patch.object(tempfile, 'mkstemp', return_value=(3, 'cache/tmp'))
+    patch.object(io, 'open')
+    patch.object(ParserCache, 'evict')
+    cache.save('abc', lambda: None)
+    os.remove.assert_called_with('cache/tmp')
+    assert os.replace.call_count == 0
+    assert ParserCache.evict.call_count == 0
+
+
+def test_parser_cache_save_unwritable(patch, cache):
+    patch.object(os, 'makedirs', side_effect=PermissionError())
+    patch.object(ParserCache, 'evict')
+    cache.save('abc', 'parser')
+    assert ParserCache.evict.call_count == 0
+
+
+def test_parser_cache_evict(tmpdir):
+    """
+    Ensures the least recently used parsers are evicted
+    """
+    cache = ParserCache(directory=str(tmpdir))
+    for i, name in enumerate(['old', 'used', 'new']):
+        cache.save(name, name)
+        os.utime(cache.path(name), ns=(i, i))
+    assert cache.load('used') == 'used'
+    cache.max_entries = 2
+    assert cache.evict() == 1
+    assert sorted(cache.entries()) == [cache.path('new'), cache.path('used')]
+
+
+def test_parser_cache_evict_fits(tmpdir):
+    cache = ParserCache(directory=str(tmpdir))
+    cache.save('abc', 'parser')
+    cache.save('def', 'parser')
+    assert cache.evict() == 0
+    assert len(cache.entries()) == 2
+
+
+def test_parser_cache_remove(patch):
+    patch.object(os, 'remove')
+    assert ParserCache.remove('file') is True
+    os.remove.assert_called_with('file')
+
+
+def test_parser_cache_remove_missing(patch):
+    patch.object(os, 'remove', side_effect=FileNotFoundError())
+    assert ParserCache.remove('file') is False
+
+
+def test_parser_cache_clear(patch, cache):
+    patch.many(ParserCache, ['entries', 'remove'])
+    ParserCache.entries.return_value = ['one', 'two']
+    assert cache.clear() == 2
+    ParserCache.remove.assert_called_with('two')
+
+
+def test_parser_cache_unpickler_actions(magic):
+    from lark.parsers.lalr_analysis import Reduce, Shift
+    assert _Unpickler(magic()).persistent_load('Shift') is Shift
+    assert _Unpickler(magic()).persistent_load('Reduce') is Reduce
+
+
+def test_parser_cache_pickler_actions(magic):
+    from lark.parsers.lalr_analysis import Reduce, Shift
+    pickler = _Pickler(magic())
+    assert pickler.persistent_id(Shift) == 'Shift'
+    assert pickler.persistent_id(Reduce) == 'Reduce'
+    assert pickler.persistent_id('other') is None
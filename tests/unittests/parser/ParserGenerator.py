@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+import io
+import re
+
+import lark
+from lark.parsers.lalr_analysis import Reduce, Shift
+
+from pytest import fixture
+
+from storyscript.parser import Grammar, Parser, ParserGenerator
+
+
+@fixture
+def generator(magic):
+    return ParserGenerator(magic())
+
+
+def test_parser_generator_init(magic):
+    instance = magic()
+    generator = ParserGenerator(instance)
+    assert generator.lark == instance
+    assert generator.frontend == instance.parser
+
+
+def test_parser_generator_fingerprint():
+    fingerprint = ParserGenerator.fingerprint('grammar')
+    assert fingerprint == ParserGenerator.fingerprint('grammar')
+    assert fingerprint != ParserGenerator.fingerprint('grammar2')
+
+
+def test_parser_generator_symbol_terminal(magic):
+    symbol = magic(is_term=True, filter_out=True)
+    symbol.name = 'NAME'
+    assert ParserGenerator.symbol(symbol) == ('NAME', True, True)
+
+
+def test_parser_generator_symbol_rule(magic):
+    symbol = magic(is_term=False)
+    symbol.name = 'rule'
+    assert ParserGenerator.symbol(symbol) == ('rule', False, False)
+
+
+def test_parser_generator_rules(patch, magic, generator):
+    patch.object(ParserGenerator, 'symbol', return_value='symbol')
+    rule = magic(expansion=['a'], options=None)
+    rule.origin.name = 'origin'
+    generator.lark.rules = [rule]
+    generator.lark._parse_tree_builder.user_aliases = {rule: 'alias'}
+    result = generator.rules()
+    assert result == (('origin', ('symbol',), 'alias', None),)
+
+
+def test_parser_generator_rules_options(patch, magic, generator):
+    patch.object(ParserGenerator, 'symbol')
+    rule = magic(expansion=[])
+    rule.options.keep_all_tokens = True
+    rule.options.expand1 = False
+    rule.options.priority = None
+    generator.lark.rules = [rule]
+    generator.lark._parse_tree_builder.user_aliases = {rule: None}
+    assert generator.rules()[0][3] == (True, False, None)
+
+
+def test_parser_generator_states(magic, generator):
+    rule = magic()
+    generator.lark.rules = [magic(), rule]
+    table = {0: {'A': (Shift, 1)}, 1: {'B': (Reduce, rule), 'A': (Shift, 0)}}
+    generator.frontend.parser._parse_table.states = table
+    tokens, states = generator.states()
+    assert tokens == ('A', 'B')
+    assert states == ((0, 0, 1), (1, 1, 1, 0, 0, 0))
+
+
+def test_parser_generator_mres():
+    mres = [(re.compile('(?P<A>a)', re.M), {1: 'A'})]
+    result = ParserGenerator.mres(mres)
+    assert result == (('(?P<A>a)', re.compile('', re.M).flags, ((1, 'A'),)),)
+
+
+def test_parser_generator_lexer(patch, magic, generator):
+    patch.object(ParserGenerator, 'mres')
+    lexer = magic(newline_types=['NL'], ignore_types=['WS'])
+    lexer.callback = {'NAME': magic()}
+    result = generator.lexer(lexer)
+    mres = ParserGenerator.mres()
+    assert result == (mres, (('NAME', mres),), ('NL',), ('WS',))
+
+
+def test_parser_generator_lexers(patch, magic, generator):
+    patch.object(ParserGenerator, 'lexer', side_effect=['l1', 'l2', 'root'])
+    first = magic()
+    second = magic()
+    contextual = generator.frontend.lexer
+    contextual.lexers = {0: first, 1: second, 2: first}
+    result = generator.lexers()
+    assert result == (('l1', 'l2', 'root'), (0, 1, 0), 2)
+
+
+def test_parser_generator_assign():
+    assert ParserGenerator.assign('A', (1, 'a')) == "A = (1, 'a')\n"
+
+
+def test_parser_generator_generate(patch, generator):
+    patch.many(ParserGenerator, ['rules', 'fingerprint'])
+    patch.object(ParserGenerator, 'states', return_value=((), ()))
+    patch.object(ParserGenerator, 'lexers', return_value=((), (), 0))
+    result = generator.generate('grammar')
+    ParserGenerator.fingerprint.assert_called_with('grammar')
+    assert result.startswith(ParserGenerator.header)
+    assert f"LARK_VERSION = '{lark.__version__}'\n" in result
+    assert 'STATES = ()\n' in result
+
+
+def test_parser_generator_build(patch):
+    patch.init(Parser)
+    patch.object(Parser, 'lark', create=True)
+    assert ParserGenerator.build() == Parser.lark
+    Parser.__init__.assert_called_with(cache=False, standalone=False,
+                                       start='start')
+
+
+def test_parser_generator_build_start(patch):
+    patch.init(Parser)
+    patch.object(Parser, 'lark', create=True)
+    assert ParserGenerator.build('template') == Parser.lark
+    Parser.__init__.assert_called_with(cache=False, standalone=False,
+                                       start='template')
+
+
+def test_parser_generator_write(patch):
+    patch.many(Grammar, ['sources'])
+    patch.many(ParserGenerator, ['build', 'generate'])
+    patch.object(io, 'open')
+    ParserGenerator.write('tables.py')
+    ParserGenerator.build.assert_called_with('start')
+    ParserGenerator.generate.assert_called_with(Grammar.sources())
+    io.open.assert_called_with('tables.py', 'w', encoding='utf8')
+    io.open().__enter__().write.assert_called_with(
+        ParserGenerator.generate())
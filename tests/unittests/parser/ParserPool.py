@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+
+from pytest import fixture, raises
+
+from storyscript.parser import Parser, ParserPool
+
+
+@fixture
+def pool(magic):
+    return ParserPool(size=2, factory=magic())
+
+
+def test_parser_pool_init(patch):
+    patch.object(os, 'cpu_count', return_value=4)
+    pool = ParserPool()
+    assert pool.size == 4
+    assert pool.factory == Parser
+    assert pool.parsers == []
+    assert pool.created == 0
+
+
+def test_parser_pool_init_no_cpu_count(patch):
+    patch.object(os, 'cpu_count', return_value=None)
+    assert ParserPool().size == 1
+
+
+def test_parser_pool_init_size(magic):
+    factory = magic()
+    pool = ParserPool(size=3, factory=factory)
+    assert pool.size == 3
+    assert pool.factory == factory
+
+
+def test_parser_pool_acquire(pool):
+    result = pool.acquire()
+    assert result == pool.factory()
+    assert pool.created == 1
+
+
+def test_parser_pool_acquire_released(pool, magic):
+    parser = magic()
+    pool.parsers = [parser]
+    assert pool.acquire() == parser
+    assert pool.created == 0
+
+
+def test_parser_pool_acquire_error(pool):
+    pool.factory.side_effect = ValueError()
+    with raises(ValueError):
+        pool.acquire()
+    assert pool.created == 0
+
+
+def test_parser_pool_acquire_blocks(magic):
+    """
+    Ensures callers wait for a parser once the pool is exhausted
+    """
+    pool = ParserPool(size=1, factory=magic())
+    parser = pool.acquire()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(pool.acquire()))
+    thread.start()
+    thread.join(0.05)
+    assert results == []
+    pool.release(parser)
+    thread.join()
+    assert results == [parser]
+    assert pool.created == 1
+
+
+def test_parser_pool_release(pool, magic):
+    parser = magic()
+    pool.release(parser)
+    assert pool.parsers == [parser]
+
+
+def test_parser_pool_parser(pool):
+    with pool.parser() as parser:
+        assert parser == pool.factory()
+        assert pool.parsers == []
+    assert pool.parsers == [parser]
+
+
+def test_parser_pool_parser_error(pool):
+    with raises(ValueError):
+        with pool.parser():
+            raise ValueError()
+    assert pool.parsers == [pool.factory()]
+
+
+def test_parser_pool_parse(pool):
+    result = pool.parse('source')
+    pool.factory().parse.assert_called_with('source')
+    assert result == pool.factory().parse()
+    assert result.parser == pool
+    assert pool.parsers == [pool.factory()]
+
+
+def test_parser_pool_parse_template(pool):
+    result = pool.parse_template('code')
+    pool.factory().parse_template.assert_called_with('code')
+    assert result == pool.factory().parse_template()
+    assert pool.parsers == [pool.factory()]
+
+
+def test_parser_pool_lex(pool):
+    pool.factory().lex.return_value = iter(['token'])
+    result = pool.lex('source')
+    pool.factory().lex.assert_called_with('source')
+    assert result == ['token']
+    assert pool.parsers == [pool.factory()]
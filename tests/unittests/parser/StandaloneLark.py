@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from lark.grammar import NonTerminal, Terminal
+from lark.lexer import TraditionalLexer
+from lark.parsers.lalr_analysis import Reduce, Shift
+
+from pytest import fixture
+
+from storyscript.parser import StandaloneLark
+from storyscript.parser.StandaloneLark import _Lexers
+
+
+@fixture
+def standalone(patch, magic):
+    patch.init(StandaloneLark)
+    standalone = StandaloneLark()
+    standalone.tables = magic()
+    standalone.postlex = magic()
+    standalone.lexer = magic()
+    standalone.parser = magic()
+    return standalone
+
+
+def test_standalone_lark_init(patch, magic):
+    patch.many(StandaloneLark, ['build_rules', 'build_lexer',
+                                'build_frontend'])
+    tables = magic()
+    standalone = StandaloneLark(tables, postlex='postlex',
+                                transformer='transformer')
+    assert standalone.tables == tables
+    assert standalone.postlex == 'postlex'
+    assert standalone.options.parser == 'lalr'
+    assert standalone.options.transformer == 'transformer'
+    assert standalone.rules == StandaloneLark.build_rules()
+    assert standalone.lexer == StandaloneLark.build_lexer()
+    assert standalone.parser == StandaloneLark.build_frontend()
+
+
+def test_standalone_lark_symbol():
+    assert StandaloneLark.symbol('A', True, True) == Terminal('A')
+    assert StandaloneLark.symbol('a', False, False) == NonTerminal('a')
+
+
+def test_standalone_lark_build_rules(standalone):
+    standalone.tables.RULES = (('a', (('A', True, False),), 'alias', None),
+                               ('b', (), None, (True, False, None)))
+    result = standalone.build_rules()
+    assert result[0].origin == NonTerminal('a')
+    assert result[0].expansion == [Terminal('A')]
+    assert result[0].alias == 'alias'
+    assert result[1].options.keep_all_tokens is True
+
+
+def test_standalone_lark_mres():
+    result = StandaloneLark.mres((('(?P<A>a)', 0, ((1, 'A'),)),))
+    assert result[0][0].pattern == '(?P<A>a)'
+    assert result[0][1] == {1: 'A'}
+
+
+def test_standalone_lark_traditional_lexer():
+    callback = (('(?P<B>b)', 0, ((1, 'B'),)),)
+    result = StandaloneLark.traditional_lexer((), (('A', callback),),
+                                              ('NL',), ('WS',))
+    assert isinstance(result, TraditionalLexer)
+    assert result.mres == []
+    assert result.callback['A'].mres[0][1] == {1: 'B'}
+    assert result.newline_types == ['NL']
+    assert result.ignore_types == ['WS']
+
+
+def test_standalone_lark_build_lexer(patch, standalone):
+    patch.object(StandaloneLark, 'traditional_lexer')
+    standalone.tables.LEXERS = (('root',),)
+    standalone.tables.STATE_LEXERS = (0,)
+    standalone.tables.ROOT_LEXER = 0
+    result = standalone.build_lexer()
+    StandaloneLark.traditional_lexer.assert_called_with('root')
+    assert result.root_lexer == StandaloneLark.traditional_lexer()
+    assert isinstance(result.lexers, _Lexers)
+    assert result.parser_state is None
+
+
+def test_standalone_lark_lexers(magic):
+    build = magic(side_effect=['lexer', 'lexer2'])
+    lexers = _Lexers((('a',), ('b',)), (1, 0, 1), build)
+    assert lexers[0] == 'lexer'
+    assert lexers[2] == 'lexer'
+    assert lexers[1] == 'lexer2'
+    assert build.call_count == 2
+
+
+def test_standalone_lark_build_table(magic, standalone):
+    standalone.rules = [magic()]
+    standalone.tables.TOKENS = ('A', 'B')
+    standalone.tables.STATES = ((0, 0, 1), (1, 1, 0))
+    standalone.tables.START_STATE = 0
+    standalone.tables.END_STATE = 1
+    result = standalone.build_table()
+    assert result.states == {0: {'A': (Shift, 1)},
+                             1: {'B': (Reduce, standalone.rules[0])}}
+    assert result.start_state == 0
+    assert result.end_state == 1
+
+
+def test_standalone_lark_parse(standalone):
+    result = standalone.parse('source')
+    standalone.parser.parse.assert_called_with('source')
+    assert result == standalone.parser.parse()
+
+
+def test_standalone_lark_lex(standalone):
+    result = standalone.lex('source')
+    standalone.lexer.root_lexer.lex.assert_called_with('source')
+    stream = standalone.lexer.root_lexer.lex()
+    standalone.postlex.process.assert_called_with(stream)
+    assert result == standalone.postlex.process()
+
+
+def test_standalone_lark_lex_no_postlex(standalone):
+    standalone.postlex = None
+    result = standalone.lex('source')
+    assert result == standalone.lexer.root_lexer.lex()
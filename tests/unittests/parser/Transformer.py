@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import pickle
+
 from lark import Transformer as LarkTransformer
 from lark.lexer import Token
 
@@ -100,7 +102,7 @@ def test_transformer_service_block_indented_args(tree, magic, patch):
     block = magic()
     matches = [block, tree]
     result = Transformer.service_block(matches)
-    block.service_fragment.children.append.assert_called_with('argument')
+    block.service_fragment.append.assert_called_with('argument')
     assert result == Tree('service_block', [block])
 
 
@@ -151,6 +153,11 @@ def test_transformer_rules(rule):
     assert result.children == ['matches']
 
 
+def test_transformer_rules_pickle():
+    callback = pickle.loads(pickle.dumps(Transformer().block))
+    assert callback(['matches']) == Tree('block', ['matches'])
+
+
 def test_transformer_absolute_expression(patch, tree):
     """
     Ensures absolute_expression are untouched when they don't contain
@@ -202,7 +209,7 @@ def test_transformer_function_block(patch, tree, magic):
     m.find_data.return_value = ['.indented.node.']
     r = Transformer.function_block([function_block, m, block])
     m.find_data.assert_called_with('typed_argument')
-    function_block.children.append.assert_called_with('.indented.node.')
+    function_block.append.assert_called_with('.indented.node.')
     assert r.data == 'function_block'
     assert r.children == [
         function_block,
@@ -1,13 +1,14 @@
 # -*- coding: utf-8 -*-
-from unittest.mock import call
+import pickle
 
 from lark.lexer import Token
 from lark.tree import Tree as LarkTree
 
-from pytest import fixture, raises
+from pytest import fixture, mark, raises
 
 from storyscript.exceptions.CompilerError import CompilerError
 from storyscript.parser import Tree
+from storyscript.parser.Tree import _Child, _Children
 
 
 @fixture
@@ -41,22 +42,67 @@ def test_tree_walk_token():
     assert result == inner_tree
 
 
+def test_tree_child_index():
+    first = Tree('inner', [])
+    tree = Tree('rule', [Token('test', 'test'), first, Tree('inner', [])])
+    assert tree.child_index() == {'inner': first}
+    assert tree.child_index() is tree.child_index()
+
+
+@mark.parametrize('change', [
+    lambda tree, item: tree.append(item),
+    lambda tree, item: tree.insert(item),
+    lambda tree, item: tree.replace(0, item),
+    lambda tree, item: setattr(tree, 'children', [item]),
+])
+def test_tree_child_index_changed(change):
+    """
+    Ensures the child index is rebuilt when the children change
+    """
+    tree = Tree('rule', [Tree('old', [])])
+    assert tree.new is None
+    new = Tree('new', [])
+    change(tree, new)
+    assert tree.new == new
+
+
+def test_tree_child_index_renamed():
+    """
+    Ensures the child index is rebuilt when a child is renamed
+    """
+    child = Tree('old', [])
+    tree = Tree('rule', [child])
+    assert tree.old == child
+    child.rename('new')
+    assert tree.old is None
+    assert tree.new == child
+    child.data = 'newer'
+    assert tree.newer == child
+
+
+def test_tree_child_index_in_place():
+    """
+    Ensures the child index is rebuilt when the children change in place
+    """
+    tree = Tree('rule', [Tree('old', [])])
+    assert tree.old is not None
+    tree.children.clear()
+    assert tree.old is None
+
+
 def test_tree_node(patch):
-    patch.object(Tree, 'walk')
+    patch.object(Tree, 'child_index')
     tree = Tree('rule', [])
     result = tree.node('inner')
-    Tree.walk.assert_called_with(tree, 'inner')
-    assert result == Tree.walk()
+    Tree.child_index().get.assert_called_with('inner')
+    assert result == Tree.child_index().get()
 
 
-def test_tree_node_nested(patch):
-    patch.object(Tree, 'walk')
-    tree = Tree('rule', [])
-    result = tree.node('inner.nested')
-    assert len(Tree.walk.call_args_list) == 2
-    assert Tree.walk.call_args_list[0] == call(tree, 'inner')
-    assert Tree.walk.call_args_list[1] == call(Tree.walk(), 'nested')
-    assert result == Tree.walk()
+def test_tree_node_nested():
+    nested = Tree('nested', [])
+    tree = Tree('rule', [Tree('inner', [nested])])
+    assert tree.node('inner.nested') == nested
+    assert tree.node('inner.missing') is None
 
 
 def test_tree_first_child():
@@ -125,10 +171,34 @@ def test_tree_end_column():
     assert tree.end_column() == '1'
 
 
-def test_tree_insert():
+def test_tree_init():
+    children = ['child']
+    tree = Tree('tree', children)
+    assert tree.data == 'tree'
+    assert tree.children == ['child']
+    assert isinstance(tree.children, _Children)
+    # the children aren't shared with other trees
+    assert tree.children is not children
+
+
+def test_tree_setattr_children():
     tree = Tree('tree', [])
-    tree.insert('child')
+    tree.child_index()
+    tree.children = ['child']
     assert tree.children == ['child']
+    assert isinstance(tree.children, _Children)
+
+
+def test_tree_insert():
+    tree = Tree('tree', ['first'])
+    tree.insert('child')
+    assert tree.children == ['child', 'first']
+
+
+def test_tree_append():
+    tree = Tree('tree', ['first'])
+    tree.append('child')
+    assert tree.children == ['first', 'child']
 
 
 def test_tree_rename():
@@ -146,6 +216,50 @@ def test_tree_replace():
     assert tree.children == ['new']
 
 
+def test_tree_children_pickle():
+    tree = Tree('tree', ['child'])
+    tree.child_index()
+    result = pickle.loads(pickle.dumps(tree.children))
+    assert type(result) is list
+    assert result == ['child']
+
+
+def test_tree_clone():
+    token = Token('NAME', 'one', pos_in_stream=3, line=1, column=4)
+    token.end_line = 1
+    token.end_column = 7
+    tree = Tree('path', [Tree('inner', [token, 'raw'])])
+    result = tree.clone()
+    assert result == tree
+    assert result is not tree
+    assert result.inner is not tree.inner
+    clone = result.inner.child(0)
+    assert clone is not token
+    assert clone.type == 'NAME'
+    assert clone.pos_in_stream == 3
+    assert (clone.line, clone.column) == (1, 4)
+    assert (clone.end_line, clone.end_column) == (1, 7)
+    assert result.inner.child(1) == 'raw'
+
+
+def test_tree_clone_columns():
+    first = Token('NAME', 'one', pos_in_stream=0, line=1, column=1)
+    first.end_line = 1
+    first.end_column = 4
+    second = Token('NAME', 'two', pos_in_stream=4, line=2, column=1)
+    second.end_line = 2
+    second.end_column = 4
+    result = Tree('path', [first, Tree('inner', [second])]).clone(5)
+    clone = result.child(0)
+    assert clone.pos_in_stream == 5
+    assert (clone.line, clone.column) == (1, 6)
+    assert (clone.end_line, clone.end_column) == (1, 9)
+    clone = result.inner.child(0)
+    assert clone.pos_in_stream == 4
+    assert (clone.line, clone.column) == (2, 1)
+    assert (clone.end_line, clone.end_column) == (2, 4)
+
+
 def test_tree_extract_path():
     tree = Tree('path', [Token('NAME', 'one')])
     assert tree.extract_path() == 'one'
@@ -157,12 +271,58 @@ def test_tree_extract_path_fragments():
     assert tree.extract_path() == 'one.two.two'
 
 
-def test_tree_attributes(patch):
-    patch.object(Tree, 'node')
-    tree = Tree('master', [])
-    result = tree.branch
-    Tree.node.assert_called_with('branch')
-    assert result == Tree.node()
+def test_tree_attributes():
+    branch = Tree('branch', [])
+    tree = Tree('master', [branch])
+    assert tree.branch == branch
+    assert tree.leaf is None
+
+
+def test_tree_attributes_lookup():
+    """
+    Ensures looking up a rule name doesn't change Tree
+    """
+    assert Tree('master', []).lookup_branch is None
+    assert 'lookup_branch' not in Tree.__dict__
+
+
+def test_tree_child_attributes():
+    """
+    Ensures the rule names are installed as descriptors on Tree
+    """
+    Tree.child_attributes(['descriptor_branch', '_private', 'children',
+                           'anon-rule'])
+    try:
+        assert isinstance(Tree.__dict__['descriptor_branch'], _Child)
+        assert '_private' not in Tree.__dict__
+        assert 'children' not in Tree.__dict__
+        assert 'anon-rule' not in Tree.__dict__
+        branch = Tree('descriptor_branch', [])
+        tree = Tree('master', [branch])
+        assert tree.descriptor_branch is branch
+        assert tree.children == [branch]
+        tree.descriptor_branch = 'value'
+        assert tree.descriptor_branch == 'value'
+    finally:
+        del Tree.descriptor_branch
+
+
+def test_tree_attributes_private():
+    with raises(AttributeError):
+        Tree('master', [])._private
+
+
+def test_tree_pickle():
+    """
+    Ensures extra attributes are pickled, but not the cached indexes
+    """
+    tree = Tree('master', [Tree('branch', [])])
+    tree.parser = 'parser'
+    tree.child_index()
+    result = pickle.loads(pickle.dumps(tree))
+    assert result == tree
+    assert result.parser == 'parser'
+    assert result.children._index is None
 
 
 def test_tree_find():
@@ -215,6 +375,77 @@ def test_tree_find_first_token_none():
     assert tree.find_first_token() is None
 
 
+def test_tree_find_first_token_cached():
+    """
+    Ensures Tree.find_first_token caches the tokens until a tree changes
+    """
+    first = Token('X', 'x')
+    last = Token('Y', 'y')
+    tree = Tree('block', [Tree('line', [first]), Tree('line', [last])])
+    assert tree.find_first_token() == first
+    assert tree.find_first_token(reverse=True) == last
+    assert tree.children._tokens == {False: first, True: last}
+    assert tree.children[0].children._tokens == {False: first}
+    assert tree.find_first_token() is first
+
+
+@mark.parametrize('change', [
+    lambda child: child.replace(0, Token('Z', 'z')),
+    lambda child: child.insert(Token('Z', 'z')),
+    lambda child: setattr(child, 'children', [Token('Z', 'z')]),
+    lambda child: child.children.insert(0, Token('Z', 'z')),
+    lambda child: child.children.__setitem__(0, Token('Z', 'z')),
+    lambda child: child.children.extend([Token('Z', 'z')]),
+    lambda child: child.children.reverse(),
+    lambda child: child.children.sort(key=lambda token: token.type),
+    lambda child: child.children.pop(0),
+    lambda child: child.children.clear(),
+])
+def test_tree_find_first_token_invalidated(change):
+    """
+    Ensures the cached tokens of the ancestors are dropped when a tree
+    changes, also when its children are changed in place
+    """
+    child = Tree('line', [Token('X', 'x'), Token('Y', 'y')])
+    tree = Tree('start', [Tree('block', [child])])
+    assert tree.find_first_token() == 'x'
+    assert child.find_first_token(reverse=True) == 'y'
+    change(child)
+    expected = child.children[0] if child.children else None
+    assert tree.find_first_token() == expected
+    expected = child.children[-1] if child.children else None
+    assert child.find_first_token(reverse=True) == expected
+
+
+def test_tree_find_first_token_unrelated():
+    """
+    Ensures changing a tree keeps the caches of unrelated trees
+    """
+    token = Token('X', 'x')
+    child = Tree('line', [token])
+    tree = Tree('block', [child, Tree('line', [Token('Y', 'y')])])
+    other = Tree('block', [Tree('line', [Token('Z', 'z')])])
+    assert tree.find_first_token() is token
+    assert other.find_first_token() is not None
+    tree.children[1].append(Token('W', 'w'))
+    other.children[0].append(Token('W', 'w'))
+    assert tree.children._tokens == {False: token}
+    assert child.children._tokens == {False: token}
+    assert other.children._tokens is None
+
+
+def test_tree_find_first_token_shared():
+    """
+    Ensures a subtree which is shared by two trees drops the caches of both
+    """
+    child = Tree('line', [Token('X', 'x')])
+    one = Tree('block', [child])
+    two = Tree('block', [child])
+    assert one.find_first_token() == two.find_first_token() == 'x'
+    child.replace(0, Token('Z', 'z'))
+    assert one.find_first_token() == two.find_first_token() == 'z'
+
+
 def test_tree_extract():
     target = Tree('target', [])
     tree = Tree('tree', [target, Tree('more', [target])])
@@ -252,27 +483,28 @@ def test_follow_node_chain_no_children(tree):
     assert tree.follow_node_chain(['foo', 'bar']) is None
 
 
-def test_follow_node_chain_children(patch, tree):
+def test_follow_node_chain_children():
     """
     Ensures we follow a node chain if there are children
     """
-    m = Tree('mock', [])
-    tree.children = [0]
-    patch.object(Tree, 'iter_subtrees')
-    Tree.iter_subtrees.return_value = iter([m])
-    assert tree.follow_node_chain(['foo', 'bar']) is None
-
-    Tree.iter_subtrees.return_value = iter([m])
-    assert tree.follow_node_chain(['mock']) is m
-
-    arr = [m, Tree('m2', []), Tree('m3', [])]
-    Tree.iter_subtrees.side_effect = lambda: iter(arr)
-    assert tree.follow_node_chain(['mock']) is None
-    assert tree.follow_node_chain(['mock', 'm2']) is None
-    assert tree.follow_node_chain(['m2', 'mock']) is None
-    assert tree.follow_node_chain(['m4', 'm2', 'mock']) is None
-    assert tree.follow_node_chain(['m4', 'm3', 'm2', 'mock']) is None
-    assert tree.follow_node_chain(['m3', 'm2', 'mock']) == m
+    m = Tree('mock', [Token('X', 'x')])
+    m2 = Tree('m2', [m])
+    m3 = Tree('m3', [m2])
+    assert m2.follow_node_chain(['m2', 'mock']) is m
+    assert m3.follow_node_chain(['m3', 'm2', 'mock']) is m
+    assert m3.follow_node_chain(['m3', 'm2']) is None
+    assert m3.follow_node_chain(['m3', 'mock', 'm2']) is None
+    assert m3.follow_node_chain(['m4', 'm2', 'mock']) is None
+    assert m3.follow_node_chain(['m3', 'm2', 'mock', 'm4']) is None
+
+
+def test_follow_node_chain_branches():
+    """
+    Ensures we don't follow a node chain with more trees than expected nodes
+    """
+    m = Tree('mock', [Token('X', 'x')])
+    tree = Tree('m3', [Tree('m2', [m, Tree('mock', [])])])
+    assert tree.follow_node_chain(['m3', 'm2', 'mock']) is None
 
 
 def test_follow_empty(patch, tree):
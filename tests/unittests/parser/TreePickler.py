@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+from lark.lexer import Token
+
+from storyscript.parser import Tree, TreePickler
+
+
+def test_treepickler_token():
+    token = Token('NAME', 'foo', 3, line=1, column=4)
+    token.end_line = 1
+    token.end_column = 7
+    result = pickle.loads(TreePickler.dumps(token))
+    assert result == token
+    assert result.type == 'NAME'
+    assert result.pos_in_stream == 3
+    assert result.line == 1
+    assert result.column == 4
+    assert result.end_line == 1
+    assert result.end_column == 7
+
+
+def test_treepickler_token_value():
+    token = Token('INT', '3', line=1)
+    token.value = 3
+    result = pickle.loads(TreePickler.dumps(token))
+    assert str(result) == '3'
+    assert result.value == 3
+
+
+def test_treepickler_tree():
+    token = Token('NAME', 'foo', line=2, column=1)
+    tree = Tree('start', [Tree('path', [token])])
+    assert tree.line() == '2'
+    assert tree.child_index()['path'] is tree.children[0]
+    result = pickle.loads(TreePickler.dumps(tree))
+    assert result == tree
+    assert result.children._tokens is None
+    assert result.children._index is None
+    assert result.path.child(0).line == 2
+    assert result.line() == '2'